@@ -1,7 +1,15 @@
+import json
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
+
+from deadlock_core import (
+    StageTimer, bankers_deadlock, block_sums, load_sparse_state, pack_bits, packed_single_instance_reduction,
+    read_event_log, reduce_snapshot, replay_events, simulate_workload, single_instance_deadlock,
+    sparse_holt_reduction, state_digest,
+)
 
 
 st.set_page_config(
@@ -54,6 +62,44 @@ st.markdown("""
 
 st.title("🛡️ Deadlock Simulation")
 
+# Stage timings survive reruns and are shared with the other pages; see the
+# Diagnostics panel at the bottom.
+timer = st.session_state.setdefault("stage_timer", StageTimer(enabled=False))
+timer.enabled = st.session_state.get("timing_enabled", False)
+timer.count("reruns")
+
+
+# Pure functions of the state, cached on its digest. Arguments with a leading
+# underscore are not hashed by Streamlit, so a rerun with unchanged matrices
+# costs one blake2b pass instead of hashing or recomputing them.
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def check_state(digest, mode, _total, _alloc, _req):
+    """(available, binary_ok) of a state."""
+    binary_ok = mode != "Single Instance" or bool(np.isin(_alloc, [0, 1]).all() and np.isin(_req, [0, 1]).all())
+    return _total - _alloc.sum(axis=0), binary_ok
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def analyze_state(digest, mode, _total, _alloc, _req):
+    """(is_dead, safe_seq, deadlocked, final_avail, cycles) of a state."""
+    if mode == "Single Instance":
+        return single_instance_deadlock(_total, _alloc, _req)
+    return bankers_deadlock(_total, _alloc, _req) + ([],)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def reduce_trace_snapshot(file_id, _trace_file):
+    return reduce_snapshot(_trace_file)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def replay_trace(file_id, total_key, report_every, _trace_file, _total):
+    return pd.DataFrame(
+        replay_events(read_event_log(_trace_file), _total, report_every=report_every),
+        columns=["Events", "Deadlock", "Deadlocked Processes"],
+    )
+
 # -------------------- 1. SYSTEM CONFIG --------------------
 
 with st.container(border=True):
@@ -184,17 +230,18 @@ st.markdown("---")
 
 st.subheader("3️⃣ Automatically Computed Available Resources")
 
-alloc = alloc_df.to_numpy(dtype=int)
-req = req_df.to_numpy(dtype=int)
+with timer.stage("parse"):
+    alloc = alloc_df.to_numpy(dtype=int)
+    req = req_df.to_numpy(dtype=int)
+    digest = state_digest(total, alloc, req)
 
-# Extra safety: ensure binary in Single Instance mode
-if mode == "Single Instance":
-    if not (np.isin(alloc, [0, 1]).all() and np.isin(req, [0, 1]).all()):
-        st.error("In Single Instance mode, Allocation and Request matrices must contain only 0 or 1.")
-        st.stop()
+with timer.stage("validate"):
+    available, binary_ok = check_state(digest, mode, total, alloc, req)
 
-allocated_sum = alloc.sum(axis=0)
-available = total - allocated_sum
+# Extra safety: ensure binary in Single Instance mode
+if not binary_ok:
+    st.error("In Single Instance mode, Allocation and Request matrices must contain only 0 or 1.")
+    st.stop()
 
 avail_cols = st.columns(num_resources)
 for j, col in enumerate(avail_cols):
@@ -212,52 +259,25 @@ st.markdown("---")
 
 # -------------------- 5. SIMULATION ANALYSIS --------------------
 
-st.subheader("4️⃣ Simulation Analysis")
-
-c1, c2, c3 = st.columns([1, 2, 1])
-with c2:
-    run_btn = st.button("🚀 DETECT DEADLOCK", type="primary")
-
-def bankers_deadlock(total_vec, alloc_mat, req_mat):
-    """
-    total_vec : (m,) total capacity of each resource
-    alloc_mat : (n,m) allocation
-    req_mat   : (n,m) remaining need / request
-    returns (is_deadlock, safe_sequence, deadlocked_processes, final_available)
-    """
-    total_vec = np.array(total_vec, dtype=int)
-    alloc_mat = np.array(alloc_mat, dtype=int)
-    req_mat = np.array(req_mat, dtype=int)
-
-    n, m = alloc_mat.shape
-    work = total_vec - alloc_mat.sum(axis=0)
-    finish = np.array([False] * n)
-    safe_seq = []
-
-    changed = True
-    while changed:
-        changed = False
-        for i in range(n):
-            if not finish[i] and np.all(req_mat[i] <= work):
-                work = work + alloc_mat[i]
-                finish[i] = True
-                safe_seq.append(f"P{i}")
-                changed = True
-
-    deadlocked = [f"P{i}" for i in range(n) if not finish[i]]
-    is_deadlock = len(deadlocked) > 0
-    return is_deadlock, safe_seq, deadlocked, work
-
-if run_btn:
+@st.fragment
+def analysis_section(digest, mode, total, alloc, req):
+    """Only this section reruns when the button is pressed."""
+    st.subheader("4️⃣ Simulation Analysis")
+
+    c1, c2, c3 = st.columns([1, 2, 1])
+    with c2:
+        run_btn = st.button("🚀 DETECT DEADLOCK", type="primary")
+
+    if not run_btn:
+        return
     st.session_state["last_state"] = {
         "total": total.tolist(),
         "alloc": alloc.tolist(),
         "req": req.tolist(),
     }
-    with st.status("Running Banker's Algorithm...", expanded=True) as status:
-        time.sleep(0.4)
-
-        is_dead, safe_seq, deadlocked, final_avail = bankers_deadlock(total, alloc, req)
+    status_label = "Searching Wait-For Graph..." if mode == "Single Instance" else "Running Banker's Algorithm..."
+    with st.status(status_label, expanded=True) as status, timer.stage("detect"):
+        is_dead, safe_seq, deadlocked, final_avail, cycles = analyze_state(digest, mode, total, alloc, req)
 
         status.update(label="Analysis Complete", state="complete", expanded=False)
 
@@ -283,3 +303,297 @@ if run_btn:
             <p>Blocked Processes: {", ".join(deadlocked)}</p>
         </div>
         """, unsafe_allow_html=True)
+
+        if cycles:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.caption("Wait-for cycles (each process waits for a resource held by the next):")
+            for cycle in cycles:
+                st.code(" → ".join(cycle))
+            behind = sorted(set(deadlocked) - {p for cycle in cycles for p in cycle}, key=lambda p: int(p[1:]))
+            if behind:
+                st.caption(f"Blocked behind a cycle: {', '.join(behind)}")
+
+
+analysis_section(digest, mode, total, alloc, req)
+
+st.markdown("---")
+
+# -------------------- 6. TRACE FILE ANALYSIS --------------------
+
+@st.fragment
+def trace_section(total):
+    """Uploads and their settings rerun only this section; results are cached per file."""
+    st.subheader("5️⃣ Analyze a Trace File")
+    st.caption(
+        "Upload an allocate/release/request event log (CSV with an op,process,resource,amount header, or JSONL) "
+        "replayed against the Total Resource Capacity above, or an .npz snapshot with total, alloc and req arrays. "
+        "Files are processed in chunks, so their size is not limited by the grids above."
+    )
+
+    trace_file = st.file_uploader("Trace file", type=["csv", "jsonl", "ndjson", "npz"])
+    if trace_file is None:
+        return
+    if trace_file.name.lower().endswith(".npz"):
+        try:
+            with st.status("Reducing snapshot...", expanded=False) as status, timer.stage("snapshot"):
+                order, finish, final_avail = reduce_trace_snapshot(trace_file.file_id, trace_file)
+                status.update(label="Analysis Complete", state="complete")
+        except (ValueError, KeyError, IndexError) as exc:
+            st.error(f"Could not read the snapshot: {exc}")
+            return
+        deadlocked = [f"P{i}" for i in np.flatnonzero(~finish)]
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Processes", len(finish))
+        c2.metric("Can Finish", len(order))
+        c3.metric("Deadlocked", len(deadlocked))
+        if deadlocked:
+            shown = ", ".join(deadlocked[:50]) + (" ..." if len(deadlocked) > 50 else "")
+            st.error(f"💀 Deadlock detected. Blocked processes: {shown}")
+        else:
+            st.success("✅ Safe state: every process can run to completion.")
+    else:
+        report_every = st.number_input("Report a verdict every N events", min_value=1, value=10_000, step=1_000)
+        try:
+            with st.status("Replaying events...", expanded=False) as status, timer.stage("replay"):
+                verdicts = replay_trace(
+                    trace_file.file_id, tuple(total.tolist()), int(report_every), trace_file, total
+                )
+                status.update(label="Analysis Complete", state="complete")
+        except (ValueError, KeyError, IndexError) as exc:
+            st.error(f"Could not replay the event log: {exc}")
+        else:
+            final = verdicts.iloc[-1]
+            c1, c2 = st.columns(2)
+            c1.metric("Events Replayed", int(final["Events"]))
+            c2.metric("Deadlocked Processes", int(final["Deadlocked Processes"]))
+            if final["Deadlock"]:
+                st.error("💀 The system is deadlocked at the end of the log.")
+            else:
+                st.success("✅ No deadlock at the end of the log.")
+            st.line_chart(verdicts.set_index("Events")["Deadlocked Processes"])
+
+
+trace_section(total)
+
+st.markdown("---")
+
+# -------------------- 7. LARGE SYSTEM --------------------
+
+PAGE_ROWS = 100
+PAGE_COLS = 50
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_large_system(source_key, _source):
+    """(total, alloc, req) with CSR matrices; shared, never copied, since they can be large."""
+    return load_sparse_state(_source)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def reduce_large_system(source_key, packed, _total, _alloc, _req):
+    if packed:
+        return packed_single_instance_reduction(pack_bits(_alloc), pack_bits(_req), _alloc.shape[1])
+    return sparse_holt_reduction(_total, _alloc, _req)
+
+
+def heatmap_image(sums):
+    """Block sums as an RGB image, white for empty through to deep blue."""
+    level = sums / sums.max() if sums.max() > 0 else sums
+    rgb = np.stack([1 - 0.85 * level, 1 - 0.6 * level, np.ones_like(level)], axis=-1)
+    return (rgb * 255).astype(np.uint8)
+
+
+def row_entries(mat, i, limit=8):
+    """'R3×2, R17×1, ...' for the non-zeros of row i of a CSR matrix."""
+    row = mat.getrow(i)
+    items = [f"R{j}×{int(v)}" for j, v in zip(row.indices[:limit], row.data[:limit])]
+    return ", ".join(items) + (", ..." if row.nnz > limit else "")
+
+
+@st.fragment
+def large_system_section(mode):
+    st.subheader("6️⃣ Large System")
+    st.caption(
+        "Load total, allocation and request matrices far beyond the grids above: an .npz with dense total/alloc/req "
+        "arrays or sparse COO triples (alloc_row, alloc_col, alloc_val, req_row, ..., shape), or a server "
+        "directory holding total.npy, alloc.npy and req.npy. Matrices are kept sparse, shown a page at a time, "
+        "and summarized as downsampled heatmaps."
+    )
+    c1, c2 = st.columns(2)
+    upload = c1.file_uploader("System file", type=["npz"], key="large_upload")
+    path = c2.text_input("…or a path on the server", key="large_path").strip()
+
+    if upload is not None:
+        source, source_key = upload, f"upload:{upload.file_id}"
+    elif path:
+        if not os.path.exists(path):
+            st.error(f"No such file or directory: {path}")
+            return
+        source, source_key = path, f"path:{os.path.abspath(path)}:{os.path.getmtime(path)}"
+    else:
+        return
+
+    try:
+        with timer.stage("large_load"):
+            total, alloc, req = load_large_system(source_key, source)
+    except (OSError, ValueError, KeyError) as exc:
+        st.error(f"Could not load the system: {exc}")
+        return
+    n, m = alloc.shape
+    single_instance = mode == "Single Instance"
+
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Processes", f"{n:,}")
+    k2.metric("Resources", f"{m:,}")
+    k3.metric("Non-zeros", f"{alloc.nnz + req.nnz:,}")
+    k4.metric("Memory", f"{(alloc.data.nbytes + alloc.indices.nbytes + req.data.nbytes + req.indices.nbytes) / 2**20:.1f} MiB")
+
+    h1, h2 = st.columns(2)
+    h1.caption("Allocation heatmap (block sums, processes down, resources across)")
+    h1.image(heatmap_image(block_sums(alloc)), use_container_width=True)
+    h2.caption("Request heatmap")
+    h2.image(heatmap_image(block_sums(req)), use_container_width=True)
+
+    with st.expander("Browse matrices"):
+        p1, p2, p3 = st.columns(3)
+        which = p1.radio("Matrix", ["Allocation", "Request"], horizontal=True, key="large_which")
+        row_page = p2.number_input("Process page", 1, -(-n // PAGE_ROWS), 1, key="large_row_page") - 1
+        col_page = p3.number_input("Resource page", 1, -(-m // PAGE_COLS), 1, key="large_col_page") - 1
+        rows = slice(row_page * PAGE_ROWS, min((row_page + 1) * PAGE_ROWS, n))
+        cols = slice(col_page * PAGE_COLS, min((col_page + 1) * PAGE_COLS, m))
+        mat = alloc if which == "Allocation" else req
+        st.dataframe(
+            pd.DataFrame(
+                mat[rows, cols].toarray(),
+                index=[f"P{i}" for i in range(rows.start, rows.stop)],
+                columns=[f"R{j}" for j in range(cols.start, cols.stop)],
+            ),
+            use_container_width=True,
+        )
+
+    if single_instance and not ((total == 1).all() and np.isin(alloc.data, [0, 1]).all() and np.isin(req.data, [0, 1]).all()):
+        st.error("In Single Instance mode, every total must be 1 and the matrices must contain only 0 or 1.")
+        return
+    # The bit-packed reduction assumes one holder per resource; an over-allocated
+    # system goes through the general reduction instead.
+    packed = single_instance and bool(np.asarray(alloc.sum(axis=0)).max(initial=0) <= 1)
+    if single_instance and not packed:
+        st.warning("Some resources are held by more than one process; using the general reduction.")
+
+    with st.status("Reducing the system...", expanded=False) as status, timer.stage("large_detect"):
+        order, finish, final_avail = reduce_large_system(source_key, packed, total, alloc, req)
+        status.update(label="Analysis Complete", state="complete")
+    deadlocked = np.flatnonzero(~finish)
+
+    if deadlocked.size == 0:
+        st.success(f"✅ Safe state: all {n:,} processes can run to completion.")
+        return
+    st.error(f"💀 Deadlock detected: {deadlocked.size:,} of {n:,} processes are blocked.")
+    st.caption("Deadlocked processes, what they hold and what they still request:")
+    dead_page = st.number_input("Deadlocked page", 1, -(-deadlocked.size // PAGE_ROWS), 1, key="large_dead_page") - 1
+    shown = deadlocked[dead_page * PAGE_ROWS:(dead_page + 1) * PAGE_ROWS]
+    st.dataframe(
+        pd.DataFrame({
+            "Process": [f"P{i}" for i in shown],
+            "Holds": [row_entries(alloc, i) for i in shown],
+            "Requests": [row_entries(req, i) for i in shown],
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+large_system_section(mode)
+
+st.markdown("---")
+
+# -------------------- 8. WORKLOAD STUDY --------------------
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def run_workload_study(params_json):
+    return simulate_workload(**json.loads(params_json))
+
+
+@st.fragment
+def workload_section():
+    st.subheader("7️⃣ Workload Study")
+    st.caption(
+        "Instead of one snapshot, simulate thousands of independent systems over time. Idle processes start jobs "
+        "at the arrival rate, grab the units they demand one step at a time while holding what they have, and "
+        "release everything after the hold time. Every step is checked for deadlock across all systems at once."
+    )
+    c1, c2, c3 = st.columns(3)
+    n_proc = c1.slider("Processes", 2, 20, 5, key="mc_proc")
+    n_res = c2.slider("Resources", 1, 10, 3, key="mc_res")
+    capacity = c3.slider("Units per resource", 1, 20, 4, key="mc_capacity")
+    c4, c5, c6 = st.columns(3)
+    arrival_rate = c4.slider("Arrival rate (jobs per idle process per step)", 0.01, 1.0, 0.2, 0.01, key="mc_arrival")
+    hold_time = c5.slider("Mean hold time (steps)", 1.0, 50.0, 5.0, 0.5, key="mc_hold")
+    request_size = c6.slider("Max units demanded per resource", 1, 20, 2, key="mc_size")
+    c7, c8, c9 = st.columns(3)
+    n_replicas = c7.select_slider("Replicas", [1_000, 5_000, 10_000, 50_000, 100_000], 10_000, key="mc_replicas")
+    n_steps = c8.select_slider("Steps", [100, 250, 500, 1_000, 2_000], 500, key="mc_steps")
+    seed = c9.number_input("Seed", min_value=0, value=0, step=1, key="mc_seed")
+
+    if not st.button("Run Workload Study"):
+        return
+    params = dict(
+        n_replicas=n_replicas, n_steps=n_steps, n_proc=n_proc, capacity=[capacity] * n_res,
+        arrival_rate=arrival_rate, hold_time=hold_time, request_size=request_size, seed=int(seed),
+    )
+    with st.spinner("Simulating..."), timer.stage("workload_study"):
+        report = run_workload_study(json.dumps(params, sort_keys=True))
+
+    lo, hi = report["probability_ci"]
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Deadlock Probability", f"{report['deadlock_probability']*100:.2f}%", help=f"95% CI {lo*100:.2f}–{hi*100:.2f}%")
+    if report["deadlocks"]:
+        t_lo, t_hi = report["mean_time_ci"]
+        k2.metric("Mean Time to Deadlock", f"{report['mean_time_to_deadlock']:.1f} steps", help=f"95% CI {t_lo:.1f}–{t_hi:.1f}")
+        k3.metric("Median / p90", f"{report['time_quantiles'][50]} / {report['time_quantiles'][90]} steps")
+    else:
+        k2.metric("Mean Time to Deadlock", "—")
+        k3.metric("Median / p90", "—")
+    k4.metric("Replica-steps / s", f"{report['replica_steps'] / report['seconds']:,.0f}")
+
+    steps = np.arange(1, report["steps"] + 1)
+    st.caption("Share of systems still deadlock-free after each step, with its 95% confidence band")
+    st.line_chart(pd.DataFrame({
+        "Deadlock-free": report["survival"],
+        "Lower bound": report["survival_ci"][0],
+        "Upper bound": report["survival_ci"][1],
+    }, index=steps))
+    st.caption("Share of all resource units held, over the systems still running")
+    st.area_chart(pd.DataFrame({"Utilization": report["mean_utilization"]}, index=steps))
+
+
+workload_section()
+
+st.markdown("---")
+
+# -------------------- 9. DIAGNOSTICS --------------------
+
+@st.fragment
+def diagnostics_panel():
+    with st.expander("🩺 Diagnostics"):
+        timer.enabled = st.toggle(
+            "Collect stage timings",
+            key="timing_enabled",
+            help="Times parsing, validation, detection and, on the AI pages, feature extraction and inference "
+                 "on every rerun. Costs next to nothing while off.",
+        )
+        stats = timer.percentiles()
+        if stats:
+            st.caption(f"Latency per stage over the last {len(timer.traces)} timed runs ({timer.counters.get('reruns', 0)} reruns).")
+            st.dataframe(pd.DataFrame.from_dict(stats, orient="index"), use_container_width=True)
+            d1, d2, d3 = st.columns(3)
+            d1.download_button("Export traces (JSON)", timer.export("json"), "stage_traces.json", "application/json")
+            d2.download_button("Export traces (CSV)", timer.export("csv"), "stage_traces.csv", "text/csv")
+            if d3.button("Clear traces"):
+                timer.clear()
+                st.rerun(scope="fragment")
+        else:
+            st.info("No timings yet. Turn collection on and interact with the page.")
+
+
+diagnostics_panel()
@@ -1,9 +1,16 @@
+import json
+import time
+
 import streamlit as st
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, confusion_matrix
+
+from deadlock_core import (
+    ModelRegistry, config_key, grow_random_forest, growth_config, sampling_report,
+    train_random_forest, training_config,
+)
+from deadlock_core.training import DEFAULT_SIZES
+from page_resources import get_verdict_cache
 
 
 st.set_page_config(
@@ -37,84 +44,85 @@ st.write("""
 """)
 
 
-def detect_deadlock(total_resources, allocation, request):
-    total = np.array(total_resources, dtype=int)
-    alloc = np.array(allocation, dtype=int)
-    req = np.array(request, dtype=int)
-    n_proc, n_res = alloc.shape
-    work = total - alloc.sum(axis=0)
-    finish = np.array([False] * n_proc)
-    changed = True
-    while changed:
-        changed = False
-        for i in range(n_proc):
-            if not finish[i] and np.all(req[i] <= work):
-                work = work + alloc[i]
-                finish[i] = True
-                changed = True
-    return bool((~finish).any())
-
-
-def generate_random_state(n_proc=3, n_res=3):
-    total = np.random.randint(3, 10, size=n_res)
-    alloc = np.zeros((n_proc, n_res), dtype=int)
-    for j in range(n_res):
-        remaining = total[j]
-        for i in range(n_proc):
-            if i == n_proc - 1:
-                a = np.random.randint(0, remaining + 1)
-            else:
-                a = np.random.randint(0, remaining + 1)
-                remaining -= a
-            alloc[i, j] = a
-    req = np.zeros((n_proc, n_res), dtype=int)
-    max_additional = total - alloc.sum(axis=0)
-    for i in range(n_proc):
-        for j in range(n_res):
-            upper = max_additional[j] + alloc[i, j]
-            req[i, j] = np.random.randint(0, upper + 1)
-    label = int(detect_deadlock(total, alloc, req))
-    return total, alloc, req, label
-
-def build_dataset(n_samples=200, n_proc=3, n_res=3):
-    X = []
-    y = []
-    for _ in range(n_samples):
-        total, alloc, req, label = generate_random_state(n_proc, n_res)
-        feat = np.concatenate([total.flatten(), alloc.flatten(), req.flatten()])
-        X.append(feat)
-        y.append(label)
-    return np.array(X), np.array(y)
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry()
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_or_train_model(config_json):
+    """Process-wide: every session asking for the same config shares one bundle."""
+    config = json.loads(config_json)
+    registry = get_model_registry()
+    if config.get("mode") == "grow":
+        def grow(cfg):
+            base = registry.load(cfg["grown_from"]) if cfg["grown_from"] else None
+            if cfg["grown_from"] and base is None:
+                # The base was evicted since: grow from no trees on every row instead.
+                cfg = dict(cfg, grown_from=None, rows_seen=0)
+            return grow_random_forest(cfg, base)
+        return registry.get_or_train(config, grow)
+    return registry.get_or_train(config, train_random_forest)
+
 
+def growable_base(n_samples, seed):
+    """The last trained config if it can be grown into n_samples rows, else None."""
+    base = st.session_state.get("training_config")
+    if base is None or base.get("mode") != "grow" or base["seed"] != seed or base["n_samples"] >= n_samples:
+        return None
+    if get_model_registry().load(config_key(base)) is None:
+        return None
+    return base
 
 
 with st.container(border=True):
     st.subheader("1️⃣ Generate Training Data")
     n_samples = st.slider("Number of training examples", 50, 1000, 300, 50)
+    st.caption("Examples are spread over every P/R size the simulator offers, so one model scores them all.")
+    seed = st.number_input("Random seed", min_value=0, value=42, step=1)
+    grow = st.checkbox(
+        "Grow the previous forest on the new examples (warm start)",
+        help="Adds trees fit on all cores to the last grown model, using only the examples it has not seen, "
+             "until the out-of-bag score stops improving.",
+    )
 
     if st.button("Generate Data & Train AI Model"):
+        if grow:
+            config = growth_config(n_samples, seed=seed, base=growable_base(n_samples, seed))
+        else:
+            config = training_config(n_samples, seed=seed, n_estimators=100)
         with st.spinner("Generating synthetic data and training Random Forest..."):
-            X, y = build_dataset(n_samples=n_samples, n_proc=3, n_res=3)
-            st.session_state["feature_dim"] = X.shape[1]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-            model = RandomForestClassifier(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
-            st.session_state["deadlock_model"] = model
-            
-            y_pred = model.predict(X_test)
-            acc = accuracy_score(y_test, y_pred)
-            cm = confusion_matrix(y_test, y_pred)
-
-        st.success("✅ Model trained successfully!")
+            bundle, from_disk = load_or_train_model(json.dumps(config, sort_keys=True))
+            st.session_state["deadlock_model"] = bundle["forest"]
+            st.session_state["training_config"] = config
+            acc = bundle["accuracy"]
+            cm = bundle["confusion"]
+
+        st.success("✅ Model loaded from the model registry!" if from_disk else "✅ Model trained successfully!")
         
         c1, c2 = st.columns(2)
-        c1.metric("Test Accuracy", f"{acc*100:.2f}%")
-        c2.metric("Dataset Size", len(X))
+        c1.metric("Out-of-Bag Accuracy" if "oob_score" in bundle else "Test Accuracy", f"{acc*100:.2f}%")
+        c2.metric("Dataset Size", bundle["n_samples"])
+        if "oob_score" in bundle:
+            c3, c4 = st.columns(2)
+            c3.metric("Fit Time", f"{bundle['fit_seconds']:.2f} s")
+            c4.metric("Trees", bundle["n_trees"])
         
         st.caption("Confusion Matrix (Truth vs Prediction)")
         st.dataframe(pd.DataFrame(cm, index=["Safe", "Deadlock"], columns=["Pred Safe", "Pred Deadlock"]), use_container_width=True)
 
+    with st.expander("Compare sampling strategies"):
+        st.caption(
+            "How many examples and how much training time each way of drawing them needs to reach a target "
+            "accuracy on uniform states: uniform draws, boundary pairs one request unit from flipping, and "
+            "active mining of the states the current model is least sure about."
+        )
+        target = st.slider("Target accuracy", 0.90, 0.995, 0.99, 0.005, format="%.3f")
+        if st.button("Run Comparison"):
+            with st.spinner("Training one forest per batch for every strategy..."):
+                report = sampling_report(target, DEFAULT_SIZES, seed=seed, step=320, max_samples=6400, n_estimators=50)
+            st.dataframe(pd.DataFrame(report), use_container_width=True)
+
 st.markdown("---")
 
 
@@ -127,23 +135,26 @@ with st.container(border=True):
         st.warning("No simulation data found. Please run the **Deadlock Simulation** first.")
     else:
         model = st.session_state["deadlock_model"]
-        feat_dim = st.session_state.get("feature_dim", None)
         last = st.session_state["last_state"]
-        
 
         total = np.array(last["total"])
         alloc = np.array(last["alloc"])
         req = np.array(last["req"])
-        features = np.concatenate([total.flatten(), alloc.flatten(), req.flatten()]).reshape(1, -1)
-
-        if feat_dim is not None and features.shape[1] != feat_dim:
-            st.error("Dimension mismatch! The model was trained on a different P/R size. Please retrain.")
+        verdicts = get_verdict_cache()
+        hits = verdicts.counters["probability_hits"]
+        start = time.perf_counter()
+        proba = verdicts.probability(
+            model, config_key(st.session_state.get("training_config", {})), total, alloc, req,
+            timer=st.session_state.get("stage_timer"),
+        )
+        latency = time.perf_counter() - start
+        verdicts.save()
+        pred = int(proba >= 0.5)
+
+        if pred == 1:
+            st.error(f"⚠️ AI Prediction: **DEADLOCK LIKELY** ({proba*100:.1f}%)")
         else:
-            pred = int(model.predict(features)[0])
-            proba = model.predict_proba(features)[0][1]
-
-            if pred == 1:
-                st.error(f"⚠️ AI Prediction: **DEADLOCK LIKELY** ({proba*100:.1f}%)")
-            else:
 
-                st.success(f"✅ AI Prediction: **SAFE STATE** ({100-proba*100:.1f}%)")
+            st.success(f"✅ AI Prediction: **SAFE STATE** ({100-proba*100:.1f}%)")
+        cached = verdicts.counters["probability_hits"] > hits
+        st.caption(f"{'Cached' if cached else 'Inference'} latency: {latency*1e3:.2f} ms")
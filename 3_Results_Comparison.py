@@ -1,7 +1,14 @@
+import json
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 
+from deadlock_core import (
+    StageTimer, config_key, evaluate_on_store, single_instance_deadlock, state_digest,
+)
+from page_resources import get_verdict_cache
+
 st.set_page_config(page_title="Results Comparison", page_icon="📊", layout="wide")
 
 
@@ -25,24 +32,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def detect_deadlock(total_resources, allocation, request):
-    total = np.array(total_resources, dtype=int)
-    alloc = np.array(allocation, dtype=int)
-    req = np.array(request, dtype=int)
-    n_proc, n_res = alloc.shape
-    work = total - alloc.sum(axis=0)
-    finish = np.array([False] * n_proc)
-    changed = True
-    while changed:
-        changed = False
-        for i in range(n_proc):
-            if not finish[i] and np.all(req[i] <= work):
-                work = work + alloc[i]
-                finish[i] = True
-                changed = True
-    return bool((~finish).any())
-
-
 st.title("📊 Results Comparison")
 st.markdown("Compare the **Classical Algorithm** against the **AI Prediction Model**.")
 st.markdown("---")
@@ -56,6 +45,24 @@ total = np.array(last["total"])
 alloc = np.array(last["alloc"])
 req = np.array(last["req"])
 n, m = alloc.shape
+digest = state_digest(total, alloc, req)
+
+
+# Verdicts and probabilities live in the process-wide VerdictCache shared with
+# the prediction page, keyed on the state up to process order (and the
+# model's config key), so a snapshot seen before in any session, under any
+# numbering of its processes, recomputes nothing.
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def wait_for_cycles(digest, _total, _alloc, _req):
+    """Cycles of the wait-for graph for single-instance states, else []."""
+    single_instance = bool((_total == 1).all() and np.isin(_alloc, [0, 1]).all() and np.isin(_req, [0, 1]).all())
+    if single_instance:
+        return single_instance_deadlock(_total, _alloc, _req)[4]
+    return []
+
+
+verdicts = get_verdict_cache()
 
 
 with st.container(border=True):
@@ -79,7 +86,11 @@ st.markdown("---")
 st.subheader("2️⃣ Algorithm vs. AI")
 
 
-classical_deadlock = detect_deadlock(total, alloc, req)
+timer = st.session_state.get("stage_timer") or StageTimer(enabled=False)
+
+with timer.stage("detect"):
+    classical_deadlock, safe_seq, _, _ = verdicts.bankers_deadlock(total, alloc, req)
+    cycles = wait_for_cycles(digest, total, alloc, req) if classical_deadlock else []
 
 ai_result = None
 ai_proba = None
@@ -88,15 +99,16 @@ if "deadlock_model" not in st.session_state:
     ai_error = "Model not trained yet."
 else:
     model = st.session_state["deadlock_model"]
-    feat_dim = st.session_state.get("feature_dim", None)
-    features = np.concatenate([total.flatten(), alloc.flatten(), req.flatten()]).reshape(1, -1)
-    if feat_dim is not None and features.shape[1] != feat_dim:
-        ai_error = "Dimension mismatch. Retrain model."
-    else:
-        pred = int(model.predict(features)[0])
-        proba = model.predict_proba(features)[0][1]
-        ai_result = bool(pred)
-        ai_proba = proba
+    model_key = config_key(st.session_state.get("training_config", {}))
+    ai_proba = verdicts.probability(model, model_key, total, alloc, req, timer=timer)
+    ai_result = ai_proba >= 0.5
+verdicts.save()
+
+
+@st.cache_resource(show_spinner=False)
+def stored_eval_accuracy(config_json, _model):
+    """Accuracy on the stored evaluation split; the dataset is generated once and reused."""
+    return evaluate_on_store(_model, json.loads(config_json))
 
 c_classic, c_ai = st.columns(2)
 
@@ -107,10 +119,13 @@ with c_classic:
         st.markdown("<br>", unsafe_allow_html=True)
         if classical_deadlock:
             st.markdown('<div style="text-align:center"><span class="badge-dead">DEADLOCK</span></div>', unsafe_allow_html=True)
-            st.error("Cycle detected.")
+            if cycles:
+                st.error("Cycle detected: " + "; ".join(" → ".join(cycle) for cycle in cycles))
+            else:
+                st.error("No safe sequence exists.")
         else:
             st.markdown('<div style="text-align:center"><span class="badge-safe">SAFE STATE</span></div>', unsafe_allow_html=True)
-            st.success("Safe sequence exists.")
+            st.success("Safe sequence: " + " → ".join(safe_seq))
 
 with c_ai:
     with st.container(border=True):
@@ -129,3 +144,15 @@ with c_ai:
             st.markdown(f"**Confidence:** `{ai_proba*100:.2f}%`")
 
             st.progress(ai_proba)
+
+            if "training_config" in st.session_state:
+                config = st.session_state["training_config"]
+                eval_acc = stored_eval_accuracy(json.dumps(config, sort_keys=True), st.session_state["deadlock_model"])
+                st.caption(f"Accuracy on 2,000 held-out stored states: **{eval_acc*100:.2f}%**")
+
+cache_stats = verdicts.stats()
+st.caption(
+    f"Verdict cache: {cache_stats['entries']} states, "
+    f"{cache_stats['verdict_hits']} verdict / {cache_stats['probability_hits']} probability hits, "
+    f"{cache_stats['verdict_misses']} / {cache_stats['probability_misses']} misses."
+)
@@ -0,0 +1,150 @@
+"""
+Load test for the deadlock_core.service HTTP service.
+
+Run from the repository root:
+
+    python -m benchmarks.loadtest --requests 20000 --concurrency 64
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --n 50 --m 10
+
+Without --url a local instance is started on a free port for the run, with
+the given --max-batch, --max-wait and --max-pending. Each of --concurrency
+clients keeps one connection open and posts random snapshots back to back
+until --requests have been sent. Throughput, client-side latency
+percentiles, the 503 count and the service's own /metrics are printed as
+JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from deadlock_core.generation import generate_states
+
+
+async def _post(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    return json.loads(raw.split(b"\r\n\r\n", 1)[1])
+
+
+async def _client(host, port, bodies, counter, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < len(bodies):
+            body = bodies[counter[0]]
+            counter[0] += 1
+            start = time.perf_counter()
+            status, _ = await _post(reader, writer, host, "/detect", body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, bodies, concurrency):
+    """
+    Post every body to /detect over concurrency keep-alive connections.
+
+    returns a dict with requests, seconds, throughput_rps, status counts,
+    client latency percentiles in ms and the service's /metrics afterwards
+    """
+    counter, latencies, statuses = [0], [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, bodies, counter, latencies, statuses) for _ in range(concurrency)
+    ))
+    seconds = time.perf_counter() - start
+    ms = np.asarray(latencies) * 1e3
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "throughput_rps": len(latencies) / seconds,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "latency_ms": {f"p{q}": float(np.percentile(ms, q)) for q in (50, 90, 99)} | {"max": float(ms.max())},
+        "server": await _get(host, port, "/metrics"),
+    }
+
+
+def _spawn(args):
+    cmd = [
+        sys.executable, "-m", "deadlock_core.service", "--port", "0",
+        "--max-batch", str(args.max_batch), "--max-wait", str(args.max_wait),
+        "--max-pending", str(args.max_pending),
+    ]
+    if args.model:
+        cmd += ["--model", args.model]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError("service did not start")
+    return proc, line.split()[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="running service to test; a local one is started when omitted")
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64, help="open connections")
+    parser.add_argument("--n", type=int, default=10, help="processes per snapshot")
+    parser.add_argument("--m", type=int, default=5, help="resources per snapshot")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", help="passed to the local service")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=0.002)
+    parser.add_argument("--max-pending", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    totals, allocs, reqs = generate_states(args.requests, args.n, args.m, rng=args.seed)
+    bodies = [
+        json.dumps({"total": t.tolist(), "alloc": a.tolist(), "req": r.tolist()}).encode("utf-8")
+        for t, a, r in zip(totals, allocs, reqs)
+    ]
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = _spawn(args)
+    try:
+        parts = urlsplit(url)
+        report = asyncio.run(load_test(parts.hostname, parts.port, bodies, args.concurrency))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Benchmark suite for the deadlock_core hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run --out results.json
+    python -m benchmarks.run --suite detection labeling --n 100 1000 --m 10 --out new.csv
+    python -m benchmarks.run --baseline results.json --threshold 0.15
+
+Every case is timed --repeat times and reported by its minimum and median.
+Each suite only runs over the parameters it uses (SUITE_PARAMS); the others
+are left empty in its rows. generation times build_dataset, whose state
+distribution is fixed, so only n, m and batch apply to it; inference also
+records the single-snapshot median next to the batch timing. admission
+times batch pending requests judged together by AdmissionController.evaluate
+and records the median of a single can_grant decision; run it with
+--n 10000 for scheduler-sized systems. events replays batch lock-manager
+events (lock_events) through a fresh IncrementalDetector, with every
+resource instances units wide, so --instances sets the contention: at 1 or 2
+most processes end up waiting, at 20 few do. Use long streams for it, e.g.
+--suite events --n 10000 --m 1000 --instances 1 2 20 --batch 200000.
+The batch of a case is cut down so one (batch, n, m) int64 array, (batch, m)
+for admission, stays within --max-case-mb; peak memory runs at about ten
+times that. Rows report
+the batch actually used. With --out, the file is rewritten after every
+case, so an interrupted run keeps the cases it finished.
+With --baseline, cases are matched to the baseline by suite and parameters
+and any whose median got slower by more than --threshold is flagged; the
+exit status is then 1.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from deadlock_core import (
+    AdmissionController, FlatForest, IncrementalDetector, bankers_deadlock, build_dataset, detect_deadlock_batch,
+    extract_features, holt_reduction, predict_states,
+)
+
+SUITES = ("detection", "labeling", "generation", "training", "inference", "admission", "events")
+PARAM_KEYS = ("n", "m", "instances", "density", "batch")
+SUITE_PARAMS = {
+    "detection": ("n", "m", "instances", "density"),
+    "labeling": PARAM_KEYS,
+    "generation": ("n", "m", "batch"),
+    "training": PARAM_KEYS,
+    "inference": PARAM_KEYS,
+    "admission": PARAM_KEYS,
+    "events": ("n", "m", "instances", "batch"),
+}
+# Units a process holds at most in lock_events.
+EVENT_HOLD = 4
+
+
+def make_states(batch, n, m, instances, density, rng):
+    """
+    batch random states with up to instances units per resource.
+
+    Each process holds and requests each resource with probability density;
+    allocations never exceed capacity.
+    returns (totals, allocs, reqs)
+    """
+    totals = rng.integers(instances // 2 + 1, instances + 1, size=(batch, m))
+    weight = rng.random((batch, n, m)) * (rng.random((batch, n, m)) < density)
+    # Shares sum to at most one per resource, leaving part of it unallocated.
+    share = weight / (weight.sum(axis=1, keepdims=True) + rng.random((batch, 1, m)) + 1e-12)
+    allocs = np.floor(share * totals[:, None, :]).astype(np.int64)
+    headroom = totals[:, None, :] - allocs
+    reqs = (rng.random((batch, n, m)) * (headroom + 1)).astype(np.int64)
+    reqs *= rng.random((batch, n, m)) < density
+    return totals, allocs, reqs
+
+
+def lock_events(count, n, m, instances, rng, hold=EVENT_HOLD):
+    """
+    count (op, process, resource) events of n processes locking m resources
+    of instances units each, one unit per event.
+
+    A process asks for one resource at a time and is granted it once a unit
+    is free; it holds up to hold units and releases them at random. A waiting
+    process gives up one of its units now and then, so the stream keeps
+    moving however contended it gets.
+    """
+    free = [instances] * m
+    held = [[] for _ in range(n)]
+    wants = [None] * n
+    events = []
+    while len(events) < count:
+        procs, coins, picks = rng.integers(n, size=count), rng.random(count).tolist(), rng.random(count).tolist()
+        for p, coin, pick in zip(procs.tolist(), coins, picks):
+            r, units = wants[p], held[p]
+            if r is not None:
+                if free[r]:
+                    free[r] -= 1
+                    units.append(r)
+                    wants[p] = None
+                    events.append(("allocate", p, r))
+                elif units and coin < 0.1:
+                    r = units.pop(int(pick * len(units)))
+                    free[r] += 1
+                    events.append(("release", p, r))
+            elif units and (len(units) >= hold or coin < 0.5):
+                r = units.pop(int(pick * len(units)))
+                free[r] += 1
+                events.append(("release", p, r))
+            else:
+                wants[p] = r = int(pick * m)
+                events.append(("request", p, r))
+    return events[:count]
+
+
+def _replay(events, m, instances):
+    detector = IncrementalDetector([instances] * m)
+    handlers = {"allocate": detector.allocate, "release": detector.release, "request": detector.request}
+    for op, p, r in events:
+        handlers[op](p, r, 1)
+    return detector
+
+
+def _time(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), float(np.median(samples))
+
+
+def _fit(batch, n, m, instances, density, rng):
+    from sklearn.ensemble import RandomForestClassifier
+
+    states = make_states(batch, n, m, instances, density, rng)
+    y, _ = detect_deadlock_batch(*states)
+    features = extract_features(*states)
+
+    def fit():
+        return RandomForestClassifier(n_estimators=100, random_state=0).fit(features, y)
+
+    return fit, states
+
+
+def run_case(suite, params, repeat, rng):
+    """Time one case; returns (seconds_min, seconds_median, items per timed call)."""
+    n, m, instances, density, batch = (params.get(k) for k in PARAM_KEYS)
+    if suite == "detection":
+        total, alloc, req = (a[0] for a in make_states(1, n, m, instances, density, rng))
+        return _time(lambda: bankers_deadlock(total, alloc, req), repeat) + (1,)
+    if suite == "labeling":
+        states = make_states(batch, n, m, instances, density, rng)
+        return _time(lambda: detect_deadlock_batch(*states), repeat) + (batch,)
+    if suite == "generation":
+        return _time(lambda: build_dataset(batch, n, m, rng=rng), repeat) + (batch,)
+    if suite == "training":
+        fit, _ = _fit(batch, n, m, instances, density, rng)
+        return _time(fit, repeat) + (batch,)
+    if suite == "inference":
+        fit, states = _fit(min(batch, 2000), n, m, instances, density, rng)
+        forest = FlatForest.from_sklearn(fit())
+        single = tuple(a[:1] for a in states)
+        big = make_states(batch, n, m, instances, density, rng)
+        one = _time(lambda: predict_states(forest, *single), repeat)
+        many = _time(lambda: predict_states(forest, *big), repeat)
+        # Report the batch case; the single-row median goes in its own field.
+        return many + (batch, one[1])
+    if suite == "admission":
+        total, alloc, need = (a[0] for a in make_states(1, n, m, instances, density, rng))
+        # Clear the need of processes that cannot finish so the state is safe.
+        _, finish, _ = holt_reduction(total, alloc, need)
+        need[~finish] = 0
+        controller = AdmissionController(total, alloc, need)
+        procs = rng.integers(0, n, size=batch)
+        cap = np.minimum(need[procs], controller.available)
+        requests = (rng.random((batch, m)) * (cap + 1)).astype(np.int64)
+        one = _time(lambda: controller.can_grant(procs[0], requests[0]), repeat)
+        many = _time(lambda: controller.evaluate(procs, requests), repeat)
+        return many + (batch, one[1])
+    if suite == "events":
+        events = lock_events(batch, n, m, instances, rng)
+        return _time(lambda: _replay(events, m, instances), repeat) + (batch,)
+    raise ValueError(f"unknown suite {suite!r}")
+
+
+def cases(suite, grid, max_case_bytes):
+    """Parameter dicts of suite over grid, with batch capped to max_case_bytes per state array."""
+    keys = SUITE_PARAMS[suite]
+    seen = set()
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict.fromkeys(PARAM_KEYS) | dict(zip(keys, values))
+        if params["batch"] is not None:
+            # admission batches (m,) requests against one state, events (op, p, r) tuples,
+            # the rest (n, m) states.
+            per_item = {"admission": 8 * params["m"], "events": 200}.get(suite, 8 * params["m"] * params["n"])
+            fits = max_case_bytes // per_item
+            params["batch"] = max(1, min(params["batch"], fits))
+        key = tuple(params.values())
+        if key not in seen:
+            seen.add(key)
+            yield params
+
+
+def run(suites, grid, repeat, seed, max_case_bytes=64 << 20, on_row=None):
+    """Time every case; on_row(rows) is called after each one finishes."""
+    rows = []
+    for suite in suites:
+        for params in cases(suite, grid, max_case_bytes):
+            result = run_case(suite, params, repeat, np.random.default_rng(seed))
+            seconds_min, seconds_median, items = result[:3]
+            row = dict(suite=suite, **params, seconds_min=seconds_min, seconds_median=seconds_median,
+                       items_per_second=items / seconds_median if seconds_median else float("inf"))
+            if len(result) > 3:
+                row["single_seconds_median"] = result[3]
+            rows.append(row)
+            print(f"{suite:<10} " + " ".join(f"{k}={params[k]}" for k in SUITE_PARAMS[suite])
+                  + f"  median {seconds_median * 1e3:.3f} ms", file=sys.stderr)
+            if on_row is not None:
+                on_row(rows)
+    return rows
+
+
+def case_key(row):
+    # Unused parameters are None in JSON results and empty in CSV ones.
+    return (row["suite"],) + tuple("" if row.get(k) is None else str(row[k]) for k in PARAM_KEYS)
+
+
+def compare(rows, baseline_rows, threshold):
+    """Rows of the cases whose median is more than threshold slower than baseline."""
+    baseline = {case_key(row): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        before = baseline.get(case_key(row))
+        if before is None:
+            continue
+        ratio = row["seconds_median"] / float(before["seconds_median"])
+        row["baseline_ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(row)
+    return regressions
+
+
+def load_results(path):
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            return list(csv.DictReader(f))
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def save_results(path, rows):
+    if path.endswith(".csv"):
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": rows}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--n", nargs="+", type=int, default=[10, 100, 1000], help="processes")
+    parser.add_argument("--m", nargs="+", type=int, default=[10, 100], help="resources")
+    parser.add_argument("--instances", nargs="+", type=int, default=[10], help="max units per resource")
+    parser.add_argument("--density", nargs="+", type=float, default=[0.3],
+                        help="probability a process holds / requests a resource")
+    parser.add_argument("--batch", nargs="+", type=int, default=[1000], help="states per batched call")
+    parser.add_argument("--max-case-mb", type=float, default=64,
+                        help="cap on one (batch, n, m) int64 array; larger batches are cut down")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results to this .json or .csv file")
+    parser.add_argument("--baseline", help="earlier .json or .csv results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag cases whose median is this fraction slower than the baseline")
+    args = parser.parse_args(argv)
+
+    grid = {k: getattr(args, k) for k in PARAM_KEYS}
+    rows = run(args.suite, grid, args.repeat, args.seed, int(args.max_case_mb * 2**20),
+               on_row=(lambda rows: save_results(args.out, rows)) if args.out else None)
+
+    regressions = []
+    if args.baseline:
+        regressions = compare(rows, load_results(args.baseline), args.threshold)
+    if args.out:
+        save_results(args.out, rows)
+    else:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+
+    for row in regressions:
+        print(f"REGRESSION {row['suite']} " + " ".join(f"{k}={row[k]}" for k in SUITE_PARAMS[row["suite"]])
+              + f"  {row['baseline_ratio']:.2f}x baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Headless deadlock detection core.
+
+Importing the package is cheap: submodules, and numpy with them, are only
+loaded when one of the names below is first accessed. Nothing in here may
+import streamlit, pandas or scikit-learn at module level.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "AdmissionController": "deadlock_core.avoidance",
+    "DatasetStore": "deadlock_core.store",
+    "DetectionService": "deadlock_core.service",
+    "FlatForest": "deadlock_core.forest",
+    "IncrementalDetector": "deadlock_core.incremental",
+    "LocalTransport": "deadlock_core.distributed",
+    "MicroBatcher": "deadlock_core.service",
+    "ModelRegistry": "deadlock_core.registry",
+    "QueueTransport": "deadlock_core.distributed",
+    "SnapshotReader": "deadlock_core.streaming",
+    "StageTimer": "deadlock_core.timing",
+    "VerdictCache": "deadlock_core.cache",
+    "bankers_deadlock": "deadlock_core.detection",
+    "block_sums": "deadlock_core.sparse",
+    "boundary_states": "deadlock_core.sampling",
+    "build_dataset": "deadlock_core.dataset",
+    "build_dataset_parallel": "deadlock_core.dataset",
+    "canonical_state": "deadlock_core.cache",
+    "config_key": "deadlock_core.registry",
+    "detect_deadlock": "deadlock_core.detection",
+    "detect_deadlock_batch": "deadlock_core.detection",
+    "edge_chasing_deadlock": "deadlock_core.distributed",
+    "edge_chasing_report": "deadlock_core.distributed",
+    "evaluate_on_store": "deadlock_core.training",
+    "extract_features": "deadlock_core.features",
+    "flatten_states": "deadlock_core.dataset",
+    "generate_states": "deadlock_core.generation",
+    "grow_random_forest": "deadlock_core.training",
+    "growth_config": "deadlock_core.training",
+    "holt_reduction": "deadlock_core.detection",
+    "load_dataset_shards": "deadlock_core.dataset",
+    "load_features": "deadlock_core.training",
+    "load_sparse_state": "deadlock_core.sparse",
+    "pack_bits": "deadlock_core.sparse",
+    "packed_single_instance_reduction": "deadlock_core.sparse",
+    "partitioned_deadlock": "deadlock_core.partition",
+    "partitioned_reduction": "deadlock_core.partition",
+    "predict_states": "deadlock_core.prediction",
+    "read_event_log": "deadlock_core.streaming",
+    "reduce_batch": "deadlock_core.detection",
+    "reduce_demands": "deadlock_core.detection",
+    "reduce_snapshot": "deadlock_core.streaming",
+    "replay_events": "deadlock_core.streaming",
+    "sampling_report": "deadlock_core.sampling",
+    "save_sparse_state": "deadlock_core.sparse",
+    "scan_reduction": "deadlock_core.detection",
+    "shard_wait_for_graph": "deadlock_core.distributed",
+    "simulate_workload": "deadlock_core.montecarlo",
+    "single_instance_deadlock": "deadlock_core.waitfor",
+    "sparse_holt_reduction": "deadlock_core.sparse",
+    "state_components": "deadlock_core.partition",
+    "state_digest": "deadlock_core.cache",
+    "strongly_connected_components": "deadlock_core.waitfor",
+    "summarize_deadlock_times": "deadlock_core.montecarlo",
+    "train_random_forest": "deadlock_core.training",
+    "training_config": "deadlock_core.training",
+    "uncertain_states": "deadlock_core.sampling",
+    "unflatten_states": "deadlock_core.features",
+    "wait_for_graph": "deadlock_core.waitfor",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,251 @@
+import numpy as np
+
+from deadlock_core.detection import _as_state, holt_reduction
+
+_BLOCK = 64
+_UNBOUNDED = np.iinfo(np.int64).max // 4
+
+
+class AdmissionController:
+    """
+    Banker's-style request admission for a multi-instance resource system.
+
+    Holds the allocation and the remaining need of processes 0..n-1 and
+    answers "can process p be granted this request vector?" by granting it
+    tentatively and checking that the state stays safe.
+
+    The controller keeps the last safe sequence as a certificate, with the
+    work vector each process sees in it and its slack, the units of every
+    resource left over once it takes its need from that work. Granting q to
+    p and moving p to position k <= its own lowers the work of everyone
+    before k by q and never lowers anyone else's, so the grant is safe as
+    soon as p's need fits the work at some such k and q fits the smallest
+    slack before it. The earliest k is found by binary search, since work
+    only grows along the sequence, and the slack minimum is kept in blocks
+    of 64 positions with a lazy offset per block, so a decision touches
+    neither all n rows nor the reduction loop. Only when that fails is the
+    reduction run, on the processes up to p first and then on all of them,
+    and the sequence it returns becomes the new certificate.
+    """
+
+    def __init__(self, total, alloc, need):
+        total, alloc, need = _as_state(total, alloc, need)
+        self._total = total
+        self._alloc = alloc.copy()
+        self._need = need.copy()
+        self._available = total - alloc.sum(axis=0)
+        if (self._available < 0).any():
+            raise ValueError("allocations exceed total capacity")
+        order = self._safe_order()
+        if order is None:
+            raise ValueError("initial state is unsafe")
+        self._rebuild(order)
+
+    # -------------------- decisions --------------------
+
+    def can_grant(self, p, units):
+        """True if granting units (an (m,) vector) to process p keeps the state safe."""
+        units = self._checked(p, units)
+        if (units > self._available).any():
+            return False
+        return self._fast_position(p, units) is not None or self._tentative(p, units) is not None
+
+    def request(self, p, units):
+        """Grant units to process p if that keeps the state safe; returns whether it was granted."""
+        units = self._checked(p, units)
+        if (units > self._available).any():
+            return False
+        pos = self._pos[p]
+        if (units <= self._prefix_min(pos)).all():
+            # p keeps its place: update the certificate in place.
+            self._apply(p, units)
+            self._shift_prefix(pos, -units)
+            # p's own work drops too, but so does its need.
+            self._work[pos] -= units
+            return True
+        k = self._fast_position(p, units)
+        if k is not None:
+            order = np.insert(np.delete(self._order, pos), k, p)
+        else:
+            order = self._tentative(p, units)
+            if order is None:
+                return False
+        self._apply(p, units)
+        self._rebuild(order)
+        return True
+
+    def evaluate(self, procs, requests):
+        """
+        Admission decision for many pending requests at once.
+
+        procs    : (k,) process ids
+        requests : (k,m) request vectors
+        returns (k,) bool, each request judged alone against the current state;
+        nothing is granted
+        """
+        procs = np.asarray(procs, dtype=np.int64)
+        requests = np.asarray(requests, dtype=np.int64)
+        if requests.shape != (procs.size, self._total.size):
+            raise ValueError("requests must be a (k, m) array, one row per process id")
+        if (requests < 0).any() or (requests > self._need[procs]).any():
+            raise ValueError("requests must be non-negative and within each process's need")
+        fits = (requests <= self._available).all(axis=1)
+
+        n, m = self._need.shape
+        offset = np.repeat(self._offset, _BLOCK, axis=0)[:n]
+        work = self._work[:n] + offset
+        before = np.empty((n + 1, m), dtype=np.int64)
+        before[0] = _UNBOUNDED
+        np.minimum.accumulate(self._slack[:n] + offset, axis=0, out=before[1:])
+
+        need = self._need[procs]
+        earliest = np.zeros(procs.size, dtype=np.int64)
+        for r in range(m):
+            np.maximum(earliest, np.searchsorted(work[:, r], need[:, r]), out=earliest)
+        granted = fits & (requests <= before[earliest]).all(axis=1)
+
+        for i in np.flatnonzero(fits & ~granted):
+            granted[i] = self._tentative(procs[i], requests[i]) is not None
+        return granted
+
+    # -------------------- events --------------------
+
+    def release(self, p, units):
+        """Process p returns units early; its remaining need is unchanged."""
+        units = np.asarray(units, dtype=np.int64)
+        if (units < 0).any() or (units > self._alloc[p]).any():
+            raise ValueError(f"P{p} cannot release more than it holds")
+        self._alloc[p] -= units
+        self._available += units
+        # Everyone up to and including p now sees units more.
+        self._shift_prefix(self._pos[p] + 1, units)
+
+    def finish(self, p):
+        """Process p completes: it releases everything it holds and needs nothing more."""
+        pos = self._pos[p]
+        self._slack[pos] += self._need[p]
+        self._need[p] = 0
+        self.release(p, self._alloc[p].copy())
+        b = pos // _BLOCK
+        self._block_min[b] = self._slack[b * _BLOCK:(b + 1) * _BLOCK].min(axis=0)
+
+    def claim(self, p, units):
+        """Raise the need of process p by units if the state stays safe; returns whether it did."""
+        units = np.asarray(units, dtype=np.int64)
+        if units.shape != self._total.shape or (units < 0).any():
+            raise ValueError("units must be a non-negative (m,) vector")
+        pos = self._pos[p]
+        b = pos // _BLOCK
+        if (units <= self._slack[pos] + self._offset[b]).all():
+            # Only p's own slack depends on its need.
+            self._need[p] += units
+            self._slack[pos] -= units
+            self._block_min[b] = np.minimum(self._block_min[b], self._slack[pos])
+            return True
+        self._need[p] += units
+        order = self._safe_order()
+        if order is None:
+            self._need[p] -= units
+            return False
+        self._rebuild(order)
+        return True
+
+    # -------------------- state --------------------
+
+    @property
+    def available(self):
+        return self._available.copy()
+
+    @property
+    def safe_sequence(self):
+        """Process ids in an order that lets all of them finish."""
+        return self._order.copy()
+
+    def _checked(self, p, units):
+        units = np.asarray(units, dtype=np.int64)
+        if units.shape != self._total.shape:
+            raise ValueError("units must be an (m,) vector")
+        if (units < 0).any() or (units > self._need[p]).any():
+            raise ValueError(f"request of P{p} must be non-negative and within its need")
+        return units
+
+    def _apply(self, p, units):
+        self._alloc[p] += units
+        self._need[p] -= units
+        self._available -= units
+
+    def _safe_order(self):
+        order, finish, _ = holt_reduction(self._total, self._alloc, self._need)
+        return order if finish.all() else None
+
+    def _tentative(self, p, units):
+        """Safe order of the state with units granted to p, or None; the state is left as it was."""
+        self._apply(p, units)
+        try:
+            # Once p and everyone before it in the old sequence have finished,
+            # work is what it was there and the rest of that sequence still
+            # goes through, so try to reduce that prefix on its own first.
+            pos = self._pos[p]
+            head = self._order[:pos + 1]
+            alloc = self._alloc[head]
+            order, finish, _ = holt_reduction(self._available + alloc.sum(axis=0), alloc, self._need[head])
+            if finish.all():
+                return np.concatenate([head[order], self._order[pos + 1:]])
+            return self._safe_order()
+        finally:
+            self._apply(p, -units)
+
+    # -------------------- certificate --------------------
+
+    def _rebuild(self, order):
+        n, m = self._alloc.shape
+        n_blocks = -(-n // _BLOCK) or 1
+        held = self._alloc[order]
+        self._order = np.asarray(order, dtype=np.int64)
+        self._pos = np.empty(n, dtype=np.int64)
+        self._pos[self._order] = np.arange(n)
+        # Padding rows never bind: unbounded slack and work past every need.
+        self._work = np.full((n_blocks * _BLOCK, m), _UNBOUNDED, dtype=np.int64)
+        self._work[0:min(n, 1)] = self._available
+        np.cumsum(held[:-1], axis=0, out=self._work[1:n])
+        self._work[1:n] += self._available
+        self._slack = self._work.copy()
+        self._slack[:n] -= self._need[order]
+        self._offset = np.zeros((n_blocks, m), dtype=np.int64)
+        self._block_min = self._slack.reshape(n_blocks, _BLOCK, m).min(axis=1)
+
+    def _earliest(self, need):
+        """First position whose work covers need."""
+        m = need.size
+        cols = np.arange(m)
+        firsts = self._work[::_BLOCK] + self._offset
+        b = np.maximum((firsts < need).sum(axis=0) - 1, 0)
+        rows = b[:, None] * _BLOCK + np.arange(_BLOCK)
+        inside = (self._work[rows, cols[:, None]] + self._offset[b, cols][:, None] < need[:, None]).sum(axis=1)
+        return int((b * _BLOCK + inside).max(initial=0))
+
+    def _fast_position(self, p, units):
+        """Earliest position p can take with units granted, if the certificate proves it; else None."""
+        k = self._earliest(self._need[p])
+        if (units <= self._prefix_min(k)).all():
+            return k
+        return None
+
+    def _prefix_min(self, pos):
+        """Smallest slack of the processes before position pos, per resource."""
+        b = pos // _BLOCK
+        low = np.full(self._total.shape, _UNBOUNDED, dtype=np.int64)
+        if b:
+            np.minimum(low, (self._block_min[:b] + self._offset[:b]).min(axis=0), out=low)
+        if pos > b * _BLOCK:
+            np.minimum(low, self._slack[b * _BLOCK:pos].min(axis=0) + self._offset[b], out=low)
+        return low
+
+    def _shift_prefix(self, pos, delta):
+        """Add delta to the work and slack of the processes before position pos."""
+        b = pos // _BLOCK
+        self._offset[:b] += delta
+        if pos > b * _BLOCK:
+            self._work[b * _BLOCK:pos] += delta
+            self._slack[b * _BLOCK:pos] += delta
+            self._block_min[b] = self._slack[b * _BLOCK:(b + 1) * _BLOCK].min(axis=0)
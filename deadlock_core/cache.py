@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from deadlock_core.detection import _as_state, holt_reduction
+
+
+def state_digest(*arrays):
+    """
+    Content hash of the given arrays, e.g. (total, alloc, req).
+
+    Values are hashed as int64 together with their shapes, so equal states
+    built from lists, int32 or int64 arrays share a digest. Cheap enough to
+    compute on every rerun and use as the only cache key.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a, dtype=np.int64)
+        h.update(repr(a.shape).encode("ascii"))
+        h.update(memoryview(a).cast("B"))
+    return h.hexdigest()
+
+
+DEFAULT_VERDICT_PATH = os.environ.get(
+    "DEADLOCK_VERDICT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "deadlock_core", "verdicts.json")
+)
+
+
+def canonical_state(total_vec, alloc_mat, req_mat):
+    """
+    Digest of a state up to the order of its processes.
+
+    Process rows (alloc row, then req row) are sorted lexicographically and
+    the sorted state is hashed with state_digest, so two snapshots that
+    differ only in how processes are numbered share a digest.
+
+    returns (digest, perm): canonical process i is original process perm[i]
+    """
+    total_vec, alloc_mat, req_mat = _as_state(total_vec, alloc_mat, req_mat)
+    rows = np.hstack([alloc_mat, req_mat])
+    # lexsort treats its last key as the primary one.
+    perm = np.lexsort(rows.T[::-1])
+    return state_digest(total_vec, alloc_mat[perm], req_mat[perm]), perm
+
+
+class VerdictCache:
+    """
+    Bounded LRU of detection verdicts and model probabilities.
+
+    Entries are keyed by canonical_state, so a state is reduced once however
+    its processes are numbered. An entry keeps the verdict, the safe sequence
+    and deadlocked set as canonical positions (mapped back to the caller's
+    process ids on every hit), the final work vector, and the probability of
+    every model that scored the state, by model key.
+
+    path : optional JSON file. It is read on construction; save() merges the
+           entries into whatever is on disk by then and rewrites it atomically.
+    counters : {"verdict_hits", "verdict_misses", "probability_hits",
+               "probability_misses"}
+    """
+
+    def __init__(self, max_entries=4096, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.counters = dict.fromkeys(
+            ("verdict_hits", "verdict_misses", "probability_hits", "probability_misses"), 0
+        )
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None:
+            self._entries.update(self._read())
+            self._trim()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -------------------- lookups --------------------
+
+    def bankers_deadlock(self, total_vec, alloc_mat, req_mat):
+        """Cached bankers_deadlock: (is_deadlock, safe_sequence, deadlocked_processes, final_available)."""
+        digest, perm = canonical_state(total_vec, alloc_mat, req_mat)
+        entry = self._get(digest, "verdict")
+        if entry is None:
+            total_vec, alloc_mat, req_mat = _as_state(total_vec, alloc_mat, req_mat)
+            order, finish, work = holt_reduction(total_vec, alloc_mat[perm], req_mat[perm])
+            entry = {
+                "deadlock": bool((~finish).any()),
+                "order": order.tolist(),
+                "deadlocked": np.flatnonzero(~finish).tolist(),
+                "work": work.tolist(),
+                "proba": {},
+            }
+            self._put(digest, entry)
+        safe_seq = [f"P{perm[i]}" for i in entry["order"]]
+        deadlocked = [f"P{i}" for i in sorted(perm[entry["deadlocked"]].tolist())]
+        return entry["deadlock"], safe_seq, deadlocked, np.asarray(entry["work"], dtype=np.int64)
+
+    def detect_deadlock(self, total_vec, alloc_mat, req_mat):
+        """Cached detect_deadlock."""
+        return self.bankers_deadlock(total_vec, alloc_mat, req_mat)[0]
+
+    def probability(self, model, model_key, total_vec, alloc_mat, req_mat, timer=None):
+        """
+        P(deadlock) of model for the state, scored with predict_states on a miss.
+
+        model_key must change whenever the model does (e.g. config_key of its
+        training config). extract_features does not depend on process order,
+        so the canonical state gets the same score as the original.
+        """
+        from deadlock_core.prediction import predict_states
+
+        digest, _ = canonical_state(total_vec, alloc_mat, req_mat)
+        entry = self._get(digest, None)
+        proba = None if entry is None else entry["proba"].get(model_key)
+        with self._lock:
+            self.counters[f"probability_{'misses' if proba is None else 'hits'}"] += 1
+        if proba is not None:
+            return proba
+        proba = float(predict_states(model, total_vec, alloc_mat, req_mat, timer=timer)[1][0])
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                # Scored before it was ever reduced: the verdict comes later.
+                entry = self._entries[digest] = {"proba": {}}
+                self._trim()
+            entry["proba"][model_key] = proba
+            self._dirty = True
+        return proba
+
+    def stats(self):
+        """The counters plus the entry count and hit rates."""
+        out = dict(self.counters, entries=len(self._entries))
+        for kind in ("verdict", "probability"):
+            seen = out[f"{kind}_hits"] + out[f"{kind}_misses"]
+            out[f"{kind}_hit_rate"] = out[f"{kind}_hits"] / seen if seen else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    # -------------------- storage --------------------
+
+    def _get(self, digest, kind):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            if kind is not None:
+                if entry is not None and "deadlock" not in entry:
+                    entry = None
+                self.counters[f"{kind}_{'misses' if entry is None else 'hits'}"] += 1
+        return entry
+
+    def _put(self, digest, entry):
+        with self._lock:
+            old = self._entries.pop(digest, None)
+            if old is not None:
+                entry["proba"].update(old.get("proba", {}))
+            self._entries[digest] = entry
+            self._trim()
+            self._dirty = True
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("entries", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def save(self):
+        """Write the cache to path, if it has one and anything changed."""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            # Another process may have saved since we loaded: keep its
+            # entries, as the least recently used, under ours.
+            merged = OrderedDict((d, e) for d, e in self._read() if d not in self._entries)
+            merged.update(self._entries)
+            while len(merged) > self.max_entries:
+                merged.popitem(last=False)
+            payload = json.dumps({"entries": list(merged.items())}, separators=(",", ":"))
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deadlock_core.detection import detect_deadlock_batch
+from deadlock_core.generation import generate_states
+
+
+def flatten_states(totals, allocs, reqs):
+    """Concatenate total, alloc and req of each state into one feature row."""
+    n_samples = totals.shape[0]
+    return np.concatenate(
+        [totals, allocs.reshape(n_samples, -1), reqs.reshape(n_samples, -1)], axis=1
+    )
+
+
+def build_dataset(n_samples=200, n_proc=3, n_res=3, rng=None):
+    totals, allocs, reqs = generate_states(n_samples, n_proc, n_res, rng=rng)
+    deadlock_mask, _ = detect_deadlock_batch(totals, allocs, reqs)
+    X = flatten_states(totals, allocs, reqs)
+    y = deadlock_mask.astype(int)
+    return X, y
+
+
+def _shard_paths(out_dir, index):
+    return (
+        os.path.join(out_dir, f"X_{index:05d}.npy"),
+        os.path.join(out_dir, f"y_{index:05d}.npy"),
+    )
+
+
+def _write_shard(out_dir, index, seed_seq, n_samples, n_proc, n_res):
+    X, y = build_dataset(n_samples, n_proc, n_res, rng=np.random.default_rng(seed_seq))
+    return _save_shard(out_dir, index, X, y)
+
+
+def _save_shard(out_dir, index, X, y):
+    paths = _shard_paths(out_dir, index)
+    # Write both under temporary names first so a crashed worker never leaves
+    # a truncated shard behind that looks complete.
+    for path, arr in zip(paths, (X, y)):
+        np.save(path + ".tmp.npy", arr)
+    for path in paths:
+        os.replace(path + ".tmp.npy", path)
+    return index
+
+
+def build_dataset_parallel(out_dir, n_samples, n_proc=3, n_res=3, seed=None,
+                           n_workers=None, shard_size=250_000):
+    """
+    Generate and label n_samples states across a process pool.
+
+    The sample count is cut into fixed-size shards, independent of the worker
+    count, and shard k draws from the k-th child of SeedSequence(seed). Each
+    worker saves its shard to X_<k>.npy / y_<k>.npy in out_dir, so only shard
+    indices travel back through the pool and the concatenated output is
+    bit-identical for any n_workers.
+
+    returns the list of (X_path, y_path) pairs in shard order
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    n_shards = -(-n_samples // shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = [min(shard_size, n_samples - k * shard_size) for k in range(n_shards)]
+    jobs = [(out_dir, k, seeds[k], sizes[k], n_proc, n_res) for k in range(n_shards)]
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            _write_shard(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+            for future in [pool.submit(_write_shard, *job) for job in jobs]:
+                future.result()
+
+    return [_shard_paths(out_dir, k) for k in range(n_shards)]
+
+
+def load_dataset_shards(shard_paths, mmap_mode=None):
+    """Concatenate shards written by build_dataset_parallel into (X, y)."""
+    X = np.concatenate([np.load(x_path, mmap_mode=mmap_mode) for x_path, _ in shard_paths])
+    y = np.concatenate([np.load(y_path, mmap_mode=mmap_mode) for _, y_path in shard_paths])
+    return X, y
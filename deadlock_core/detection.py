@@ -0,0 +1,296 @@
+import heapq
+
+import numpy as np
+
+
+def _as_state(total_vec, alloc_mat, req_mat):
+    total_vec = np.asarray(total_vec, dtype=np.int64)
+    alloc_mat = np.asarray(alloc_mat, dtype=np.int64)
+    req_mat = np.asarray(req_mat, dtype=np.int64)
+    if alloc_mat.ndim != 2 or alloc_mat.shape != req_mat.shape:
+        raise ValueError("alloc and req must be (n, m) matrices of the same shape")
+    if total_vec.shape != (alloc_mat.shape[1],):
+        raise ValueError("total must be an (m,) vector")
+    return total_vec, alloc_mat, req_mat
+
+
+def _satisfied_range(head, stop):
+    """Flat indices covering the queue slices [head[k], stop[k]) back to back."""
+    lens = stop - head
+    count = int(lens.sum())
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lens) - lens
+    return np.repeat(head - offsets, lens) + np.arange(count)
+
+
+def reduce_demands(work, n, rows, cols, demand, release):
+    """
+    Holt's reduction driven by the demands the initial work cannot cover.
+
+    work    : (m,) initial available vector (updated in place)
+    n       : number of processes
+    rows, cols, demand : COO triples of every req[i, j] > work[j]
+    release : callable(ready, finish) -> (m,) units freed when the processes
+              in ready finish; finish already marks them
+
+    Demands are queued one queue per resource sorted by size. Every process
+    keeps a counter of its unsatisfied resources; when a batch of processes
+    finishes, the heads of the queues of the resources they free are advanced
+    with one vectorized search and the counters of the demands passed over are
+    decremented. Each process/resource pair is therefore visited once.
+
+    returns (order, finish, work) as holt_reduction
+    """
+    m = work.shape[0]
+    pending = np.bincount(rows, minlength=n)
+
+    # Encode (resource, demand) as one sortable key so a single searchsorted
+    # call advances the queues of every touched resource at once.
+    low = int(min(work.min(initial=0), 0))
+    span = int(demand.max(initial=0)) - low + 2
+    keys = cols.astype(np.int64) * span + (demand - low)
+    by_key = np.argsort(keys, kind="stable")
+    keys = keys[by_key]
+    queue_proc = rows[by_key]
+    head = np.searchsorted(keys, np.arange(m, dtype=np.int64) * span)
+
+    finish = np.zeros(n, dtype=bool)
+    rounds = []
+    ready = np.flatnonzero(pending == 0)
+    while ready.size:
+        finish[ready] = True
+        rounds.append(ready)
+        freed = release(ready, finish)
+        work += freed
+
+        touched = np.flatnonzero(freed)
+        if touched.size == 0:
+            break
+        probe = touched * span + np.clip(work[touched] - low, 0, span - 1)
+        stop = np.maximum(np.searchsorted(keys, probe, side="right"), head[touched])
+        satisfied = queue_proc[_satisfied_range(head[touched], stop)]
+        head[touched] = stop
+
+        procs, hits = np.unique(satisfied, return_counts=True)
+        pending[procs] -= hits
+        ready = procs[pending[procs] == 0]
+
+    order = np.concatenate(rounds) if rounds else np.empty(0, dtype=np.int64)
+    return order, finish, work
+
+
+def holt_reduction(total_vec, alloc_mat, req_mat):
+    """
+    Holt's graph reduction of a multi-instance resource state.
+
+    Only the (process, resource) demands that the initial work vector cannot
+    cover take part in the reduction; see reduce_demands. scipy.sparse
+    alloc/req are reduced without densifying; see sparse_holt_reduction.
+
+    returns (order, finish, work)
+        order  : indices of finished processes, one reduction round after another
+        finish : (n,) bool, True for processes that can run to completion
+        work   : (m,) available resources after all finishable processes release
+    """
+    if hasattr(alloc_mat, "tocsr") or hasattr(req_mat, "tocsr"):
+        # Imported here because deadlock_core.sparse builds on this module.
+        from deadlock_core.sparse import sparse_holt_reduction
+        return sparse_holt_reduction(total_vec, alloc_mat, req_mat)
+
+    total_vec, alloc_mat, req_mat = _as_state(total_vec, alloc_mat, req_mat)
+    n, m = alloc_mat.shape
+    held = alloc_mat.sum(axis=0)
+    work = total_vec - held
+
+    rows, cols = np.divmod(np.flatnonzero(req_mat > work), m)
+    demand = req_mat[rows, cols]
+
+    def release(ready, finish):
+        nonlocal held
+        if 2 * ready.size <= n:
+            freed = alloc_mat[ready].sum(axis=0)
+        else:
+            freed = held - alloc_mat[~finish].sum(axis=0)
+        held = held - freed
+        return freed
+
+    return reduce_demands(work, n, rows, cols, demand, release)
+
+
+def scan_reduction(total_vec, alloc_mat, req_mat):
+    """
+    holt_reduction with the processes finishing in the order of the classic
+    safety scan: pass after pass over the processes in index order, each one
+    finishing as soon as the work accumulated so far covers its request.
+
+    The demands are queued per resource and counted per process as in
+    reduce_demands, and the processes ready to finish wait in a heap keyed by
+    (pass, index): one woken by a process with a lower index still finishes in
+    the current pass, otherwise in the next. Each process/resource pair is
+    visited once instead of once per pass.
+
+    returns (order, finish, work) as holt_reduction
+    """
+    # Imported here because deadlock_core.sparse builds on this module.
+    from deadlock_core.sparse import _csr, is_sparse
+
+    if not (is_sparse(alloc_mat) or is_sparse(req_mat)):
+        total_vec, alloc_mat, req_mat = _as_state(total_vec, alloc_mat, req_mat)
+    total_vec = np.asarray(total_vec, dtype=np.int64)
+    (a_ptr, a_cols, a_vals), (n, m) = _csr(alloc_mat)
+    (r_ptr, r_cols, r_vals), req_shape = _csr(req_mat)
+    if req_shape != (n, m) or total_vec.shape != (m,):
+        raise ValueError("alloc and req must be (n, m) matrices and total an (m,) vector")
+
+    work = total_vec - np.bincount(a_cols, weights=a_vals, minlength=m).astype(np.int64)
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(r_ptr))
+    unmet = r_vals > work[r_cols]
+    rows, cols, demand = rows[unmet], r_cols[unmet], r_vals[unmet]
+    by_demand = np.lexsort((demand, cols))
+    queue_proc, queue_demand = rows[by_demand].tolist(), demand[by_demand].tolist()
+    queue_ptr = np.searchsorted(cols[by_demand], np.arange(m + 1)).tolist()
+    head = queue_ptr[:-1]
+    pending = np.bincount(rows, minlength=n).tolist()
+
+    a_ptr, a_cols, a_vals = a_ptr.tolist(), a_cols.tolist(), a_vals.tolist()
+    free = work.tolist()
+    ready = [(0, i) for i in range(n) if not pending[i]]
+    order = []
+    while ready:
+        scan_pass, i = heapq.heappop(ready)
+        order.append(i)
+        for j in range(a_ptr[i], a_ptr[i + 1]):
+            r = a_cols[j]
+            free[r] += a_vals[j]
+            h, stop = head[r], queue_ptr[r + 1]
+            while h < stop and queue_demand[h] <= free[r]:
+                q = queue_proc[h]
+                h += 1
+                pending[q] -= 1
+                if not pending[q]:
+                    heapq.heappush(ready, (scan_pass if q > i else scan_pass + 1, q))
+            head[r] = h
+
+    order = np.asarray(order, dtype=np.int64)
+    finish = np.zeros(n, dtype=bool)
+    finish[order] = True
+    return order, finish, np.asarray(free, dtype=np.int64)
+
+
+def bankers_deadlock(total_vec, alloc_mat, req_mat):
+    """
+    total_vec : (m,) total capacity of each resource
+    alloc_mat : (n,m) allocation
+    req_mat   : (n,m) remaining need / request
+    returns (is_deadlock, safe_sequence, deadlocked_processes, final_available)
+
+    The safe sequence is in the order of the classic safety scan; see scan_reduction.
+    """
+    order, finish, work = scan_reduction(total_vec, alloc_mat, req_mat)
+    safe_seq = [f"P{i}" for i in order]
+    deadlocked = [f"P{i}" for i in np.flatnonzero(~finish)]
+    is_deadlock = len(deadlocked) > 0
+    return is_deadlock, safe_seq, deadlocked, work
+
+
+def detect_deadlock(total_resources, allocation, request):
+    _, finish, _ = holt_reduction(total_resources, allocation, request)
+    return bool((~finish).any())
+
+
+def _reduce_states_first(totals, alloc, req):
+    """Lockstep reduction of (b,n,m) states; returns (b,n) finishing rounds, -1 for never."""
+    work = totals.astype(np.int64) - alloc.sum(axis=1)
+    done = np.zeros(alloc.shape[:2], dtype=bool)
+    rounds = np.full(alloc.shape[:2], -1, dtype=np.int32)
+    active = np.arange(alloc.shape[0])
+    step = 0
+    while active.size:
+        runnable = ~done[active] & (req[active] <= work[active, None, :]).all(axis=2)
+        progressed = runnable.any(axis=1)
+        active = active[progressed]
+        runnable = runnable[progressed]
+        done[active] |= runnable
+        states, procs = np.nonzero(runnable)
+        rounds[active[states], procs] = step
+        work[active] += np.einsum("bnm,bn->bm", alloc[active], runnable.astype(alloc.dtype))
+        step += 1
+    return rounds
+
+
+def _reduce_states_last(totals, alloc, req):
+    """As _reduce_states_first with the states moved to the last axis."""
+    alloc = np.ascontiguousarray(alloc.transpose(1, 2, 0))
+    req = np.ascontiguousarray(req.transpose(1, 2, 0))
+    work = totals.T.astype(np.int64) - alloc.sum(axis=0, dtype=np.int64)
+    n, _, b = alloc.shape
+    finished = np.full((b, n), -1, dtype=np.int32)
+    rounds = np.full((n, b), -1, dtype=np.int32)
+    active = np.arange(b)
+    step = 0
+    while True:
+        runnable = (rounds < 0) & (req <= work).all(axis=1)
+        progressed = runnable.any(axis=0)
+        if not progressed.any():
+            break
+        # A state that made no progress never will, so it can ride along
+        # until dropping the stalled ones pays for the copy. compress keeps
+        # the survivors contiguous along the state axis.
+        if 2 * progressed.sum() < progressed.size:
+            finished[active[~progressed]] = rounds[:, ~progressed].T
+            active, alloc, req, work, rounds, runnable = (
+                np.compress(progressed, a, axis=-1) for a in (active, alloc, req, work, rounds, runnable)
+            )
+        np.copyto(rounds, step, where=runnable)
+        work += (alloc * runnable[:, None, :]).sum(axis=0, dtype=np.int64)
+        step += 1
+    finished[active] = rounds.T
+    return finished
+
+
+def reduce_batch(totals, allocations, requests, chunk_size=65536):
+    """
+    Lockstep Holt reduction of many states; see detect_deadlock_batch.
+
+    returns (deadlock_mask, rounds)
+        deadlock_mask : (B,) bool, True for states with a deadlocked process
+        rounds        : (B,n) int32, the reduction round each process finishes
+                        in, -1 if it never does; sorting the finished processes
+                        of a state by round gives a safe sequence
+    """
+    totals = np.asarray(totals)
+    allocations = np.asarray(allocations)
+    requests = np.asarray(requests)
+    if allocations.ndim != 3 or allocations.shape != requests.shape:
+        raise ValueError("allocations and requests must be (B, n, m) arrays of the same shape")
+    if totals.shape != (allocations.shape[0], allocations.shape[2]):
+        raise ValueError("totals must be a (B, m) array")
+
+    B, n, m = allocations.shape
+    reduce_chunk = _reduce_states_last if m <= 16 else _reduce_states_first
+    rounds = np.empty((B, n), dtype=np.int32)
+    for lo in range(0, B, chunk_size):
+        hi = min(lo + chunk_size, B)
+        rounds[lo:hi] = reduce_chunk(totals[lo:hi], allocations[lo:hi], requests[lo:hi])
+    return (rounds < 0).any(axis=1), rounds
+
+
+def detect_deadlock_batch(totals, allocations, requests, chunk_size=65536):
+    """
+    totals      : (B,m) total capacity of each resource, one row per state
+    allocations : (B,n,m) allocation
+    requests    : (B,n,m) remaining need / request
+    returns (deadlock_mask, finish)
+        deadlock_mask : (B,) bool, True for states with a deadlocked process
+        finish        : (B,n) bool, True for processes that can run to completion
+
+    All states are reduced together: each round finishes every process whose
+    request fits its state's work vector, and only states that made progress
+    in the previous round take part in the next one. With few resources the
+    states are moved to the last axis first, so the per-round sums over
+    processes and resources become element-wise passes over contiguous rows
+    instead of many reductions over axes of length n or m.
+    """
+    deadlock_mask, rounds = reduce_batch(totals, allocations, requests, chunk_size)
+    return deadlock_mask, rounds >= 0
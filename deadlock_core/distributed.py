@@ -0,0 +1,271 @@
+import multiprocessing
+import queue
+import time
+from collections import deque
+
+import numpy as np
+
+
+def home_shard(process, n_shards):
+    """The shard that tracks what a process waits for."""
+    return process % n_shards
+
+
+class EdgeChasingShard:
+    """
+    One lock manager's slice of a distributed wait-for graph.
+
+    shard_id : index of this shard among n_shards
+    edges    : {waiter: [holders]}, the wait-for edges through the resources
+               this shard manages
+    waits_at : {process: [shard ids]} for the processes homed here (see
+               home_shard): the shards managing a resource each one waits for
+
+    Chandy-Misra-Haas probes for the AND model. A probe (initiator, p) says
+    that the initiator transitively waits for p. p's home shard forwards it,
+    once per initiator, to every shard where p waits; those follow their
+    local edges out of p and send the probe on to the home of each holder.
+    A probe that reaches its own initiator proves a cycle and is reported
+    back to the initiator's home. Messages are (kind, initiator, process,
+    hops) tuples; handle returns the (shard, message) pairs to send.
+    """
+
+    def __init__(self, shard_id, n_shards, edges, waits_at):
+        self.shard_id = shard_id
+        self.n_shards = n_shards
+        self.edges = edges
+        self.waits_at = waits_at
+        self.seen = set()
+        self.found = {}
+
+    def handle(self, message):
+        kind, initiator, process, hops = message
+        if kind == "chase":
+            out = []
+            for holder in self.edges.get(process, ()):
+                reply = "found" if holder == initiator else "probe"
+                out.append((home_shard(holder, self.n_shards), (reply, initiator, holder, hops + 1)))
+            return out
+        if kind in ("start", "probe"):
+            if (initiator, process) in self.seen:
+                return []
+            self.seen.add((initiator, process))
+            return [(s, ("chase", initiator, process, hops + 1)) for s in self.waits_at.get(process, ())]
+        if kind == "found":
+            # First report wins: it came over the shortest chain.
+            self.found.setdefault(initiator, (hops, time.monotonic()))
+            return []
+        raise ValueError(f"unknown message kind {kind!r}")
+
+
+class LocalTransport:
+    """Delivers every shard's messages in FIFO order inside this process."""
+
+    def run(self, shards, initiators):
+        """Probe from every initiator until no message is left; returns (shards, messages)."""
+        queue = deque()
+        messages = 0
+        for initiator in initiators:
+            queue.append((home_shard(initiator, len(shards)), ("start", initiator, initiator, 0)))
+        while queue:
+            src, message = queue.popleft()
+            for dest, out in shards[src].handle(message):
+                messages += dest != src
+                queue.append((dest, out))
+        return shards, messages
+
+
+def _serve_shard(shard, inboxes, results, in_flight):
+    """Worker loop of QueueTransport: handle messages until the None sentinel."""
+    messages = 0
+    local = deque()
+    inbox = inboxes[shard.shard_id]
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        local.append(message)
+        while local:
+            for dest, out in shard.handle(local.popleft()):
+                if dest == shard.shard_id:
+                    local.append(out)
+                    continue
+                # Count the message before it is queued, so in_flight never
+                # reads zero while work is still on its way somewhere.
+                with in_flight.get_lock():
+                    in_flight.value += 1
+                inboxes[dest].put(out)
+                messages += 1
+        with in_flight.get_lock():
+            in_flight.value -= 1
+    results.put((shard, messages))
+
+
+class QueueTransport:
+    """
+    One OS process per shard, exchanging messages over multiprocessing queues.
+
+    A shared counter of messages sent but not yet handled tells when the
+    probing has died out; the shards are then stopped and sent back. The
+    counter would never reach zero after a worker died, so run raises
+    RuntimeError as soon as one has exited, and TimeoutError once the
+    probing has taken more than timeout seconds (None waits forever).
+    """
+
+    def __init__(self, context=None, poll_interval=0.0005, timeout=300.0):
+        self.context = multiprocessing.get_context(context)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def _wait(self, workers, in_flight):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while in_flight.value:
+            for worker in workers:
+                if not worker.is_alive():
+                    raise RuntimeError(
+                        f"shard worker {worker.name} exited with code {worker.exitcode} while probing"
+                    )
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"probing did not die out within {self.timeout} seconds")
+            time.sleep(self.poll_interval)
+
+    def run(self, shards, initiators):
+        """Probe from every initiator until no message is left; returns (shards, messages)."""
+        ctx = self.context
+        inboxes = [ctx.Queue() for _ in shards]
+        results = ctx.Queue()
+        in_flight = ctx.Value("q", 0)
+        workers = [ctx.Process(target=_serve_shard, args=(shard, inboxes, results, in_flight)) for shard in shards]
+        for worker in workers:
+            worker.start()
+        finished = False
+        try:
+            with in_flight.get_lock():
+                in_flight.value += len(initiators)
+            for initiator in initiators:
+                inboxes[home_shard(initiator, len(shards))].put(("start", initiator, initiator, 0))
+            self._wait(workers, in_flight)
+            for inbox in inboxes:
+                inbox.put(None)
+            try:
+                returned = [results.get(timeout=self.timeout) for _ in shards]
+            except queue.Empty:
+                raise TimeoutError("shard workers did not send their results back") from None
+            finished = True
+        finally:
+            for worker in workers:
+                # After a failure the workers left are stuck on their inboxes.
+                worker.join(timeout=5 if finished else 0)
+                if worker.is_alive():
+                    worker.terminate()
+        returned.sort(key=lambda item: item[0].shard_id)
+        return [shard for shard, _ in returned], sum(count for _, count in returned)
+
+
+def shard_wait_for_graph(alloc_mat, req_mat, n_shards):
+    """
+    Split the wait-for graph of a single-instance state over n_shards.
+
+    Resource r is managed by shard r % n_shards and process p is homed on
+    home_shard(p). This stands in for lock managers that each only ever
+    see their own resources; no shard gets the global graph.
+
+    returns a list of EdgeChasingShard
+    """
+    alloc_mat = np.asarray(alloc_mat)
+    req_mat = np.asarray(req_mat)
+    if alloc_mat.ndim != 2 or alloc_mat.shape != req_mat.shape:
+        raise ValueError("alloc and req must be (n, m) matrices of the same shape")
+    held_by = alloc_mat > 0
+    if (held_by.sum(axis=0) > 1).any():
+        raise ValueError("single-instance resources can be held by at most one process")
+    holder = np.full(alloc_mat.shape[1], -1, dtype=np.int64)
+    owner_rows, owner_cols = np.nonzero(held_by)
+    holder[owner_cols] = owner_rows
+
+    waiter, res = np.nonzero(req_mat > 0)
+    keep = holder[res] >= 0
+    waiter, res = waiter[keep], res[keep]
+
+    edges = [{} for _ in range(n_shards)]
+    waits_at = [{} for _ in range(n_shards)]
+    for p, r, h in zip(waiter.tolist(), res.tolist(), holder[res].tolist()):
+        s = r % n_shards
+        edges[s].setdefault(p, []).append(h)
+        shards_of_p = waits_at[home_shard(p, n_shards)].setdefault(p, [])
+        if s not in shards_of_p:
+            shards_of_p.append(s)
+    return [EdgeChasingShard(s, n_shards, edges[s], waits_at[s]) for s in range(n_shards)]
+
+
+def edge_chasing_deadlock(alloc_mat, req_mat, n_shards=4, transport=None, initiators=None):
+    """
+    Distributed deadlock detection over a sharded single-instance state.
+
+    The wait-for graph is split with shard_wait_for_graph and probed from
+    every initiator (by default every blocked process) over transport,
+    LocalTransport unless given. As in Chandy-Misra-Haas, a process learns
+    it is deadlocked only if it lies on a cycle; processes that merely wait
+    on a cycle are not reported.
+
+    returns (is_deadlock, deadlocked_processes, stats)
+        stats : messages between shards, hops of the longest detecting
+                chain, seconds until the probing died out, seconds until
+                the first cycle was reported, and n_shards
+    """
+    shards = shard_wait_for_graph(alloc_mat, req_mat, n_shards)
+    if initiators is None:
+        initiators = sorted(p for shard in shards for p in shard.waits_at)
+    transport = transport or LocalTransport()
+
+    start = time.monotonic()
+    shards, messages = transport.run(shards, list(initiators))
+    seconds = time.monotonic() - start
+
+    found = {p: report for shard in shards for p, report in shard.found.items()}
+    deadlocked = [f"P{p}" for p in sorted(found)]
+    stats = {
+        "n_shards": n_shards,
+        "messages": messages,
+        "hops": max((hops for hops, _ in found.values()), default=0),
+        "seconds": seconds,
+        "first_detection_seconds": min((at for _, at in found.values()), default=start + seconds) - start,
+    }
+    return len(deadlocked) > 0, deadlocked, stats
+
+
+def random_wait_for_state(n_proc, n_res, rng=None, held=0.8, waits=1.5):
+    """
+    A random single-instance state for scaling runs.
+
+    Each resource is held by a random process with probability held; each
+    process waits on a Poisson(waits) number of random resources it does
+    not hold.
+    returns (total, alloc, req)
+    """
+    rng = np.random.default_rng(rng)
+    alloc = np.zeros((n_proc, n_res), dtype=np.int64)
+    owned = np.flatnonzero(rng.random(n_res) < held)
+    alloc[rng.integers(0, n_proc, owned.size), owned] = 1
+    req = np.zeros_like(alloc)
+    counts = rng.poisson(waits, n_proc)
+    rows = np.repeat(np.arange(n_proc), counts)
+    req[rows, rng.integers(0, n_res, rows.size)] = 1
+    req[alloc > 0] = 0
+    return np.ones(n_res, dtype=np.int64), alloc, req
+
+
+def edge_chasing_report(n_proc=500, n_res=500, shard_counts=(1, 2, 4, 8, 16, 32), seed=0, transport=None):
+    """
+    Message counts and detection latency of edge_chasing_deadlock as the
+    number of shards grows, on one random_wait_for_state.
+
+    returns a list of dicts, one per shard count, with the stats of
+    edge_chasing_deadlock plus the number of deadlocked processes found
+    """
+    _, alloc, req = random_wait_for_state(n_proc, n_res, seed)
+    rows = []
+    for n_shards in shard_counts:
+        _, deadlocked, stats = edge_chasing_deadlock(alloc, req, n_shards, transport)
+        rows.append(dict(stats, deadlocked=len(deadlocked)))
+    return rows
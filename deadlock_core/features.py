@@ -0,0 +1,101 @@
+import numpy as np
+
+FEATURE_NAMES = (
+    "log_n_proc",
+    "log_n_res",
+    "avail_ratio_min",
+    "avail_ratio_mean",
+    "avail_ratio_max",
+    "exhausted_res_frac",
+    "demand_ratio_min",
+    "demand_ratio_mean",
+    "demand_ratio_max",
+    "blocked_res_frac_min",
+    "blocked_res_frac_mean",
+    "blocked_res_frac_max",
+    "shortfall_min",
+    "shortfall_median",
+    "shortfall_mean",
+    "shortfall_max",
+    "held_share_max",
+    "runnable_frac",
+    "runnable_frac_round2",
+    "shortfall_min_round2",
+)
+
+
+def _shortfall(reqs, work, scale):
+    """Per-process worst relative shortfall max_j (req - work)+ / total_j."""
+    return (np.clip(reqs - work[:, None, :], 0, None) / scale[:, None, :]).max(axis=2)
+
+
+def extract_features(totals, allocs, reqs):
+    """
+    Fixed-width, size-agnostic encoding of a batch of states.
+
+    totals : (B,m), allocs/reqs : (B,n,m) for any n and m
+    returns (B, len(FEATURE_NAMES)) float32
+
+    Every feature is either normalised by capacity or aggregated over
+    processes/resources with order-free statistics, so the row does not depend
+    on process order and one model can score snapshots of any P x R. The last
+    three features look one reduction round ahead: the work vector after every
+    immediately runnable process has released.
+    """
+    totals = np.asarray(totals, dtype=np.float64)
+    allocs = np.asarray(allocs, dtype=np.float64)
+    reqs = np.asarray(reqs, dtype=np.float64)
+    B, n, m = allocs.shape
+    scale = np.maximum(totals, 1.0)
+
+    held = allocs.sum(axis=1)
+    avail = totals - held
+    avail_ratio = avail / scale
+    demand_ratio = reqs.sum(axis=1) / scale
+
+    blocked = reqs > avail[:, None, :]
+    blocked_frac = blocked.mean(axis=2)
+    shortfall = _shortfall(reqs, avail, scale)
+    runnable = ~blocked.any(axis=2)
+    held_share = allocs.sum(axis=2) / np.maximum(totals.sum(axis=1, keepdims=True), 1.0)
+
+    work2 = avail + np.einsum("bnm,bn->bm", allocs, runnable.astype(np.float64))
+    shortfall2 = _shortfall(reqs, work2, scale)
+    runnable2 = shortfall2 == 0
+    pending2 = np.where(runnable2, np.inf, shortfall2).min(axis=1)
+    pending2[np.isinf(pending2)] = 0.0
+
+    columns = [
+        np.full(B, np.log(n)),
+        np.full(B, np.log(m)),
+        avail_ratio.min(axis=1),
+        avail_ratio.mean(axis=1),
+        avail_ratio.max(axis=1),
+        (avail <= 0).mean(axis=1),
+        demand_ratio.min(axis=1),
+        demand_ratio.mean(axis=1),
+        demand_ratio.max(axis=1),
+        blocked_frac.min(axis=1),
+        blocked_frac.mean(axis=1),
+        blocked_frac.max(axis=1),
+        shortfall.min(axis=1),
+        np.median(shortfall, axis=1),
+        shortfall.mean(axis=1),
+        shortfall.max(axis=1),
+        held_share.max(axis=1),
+        runnable.mean(axis=1),
+        runnable2.mean(axis=1),
+        pending2,
+    ]
+    return np.stack(columns, axis=1).astype(np.float32)
+
+
+def unflatten_states(X, n_proc, n_res):
+    """Inverse of flatten_states: (B, m + 2nm) rows back to (totals, allocs, reqs)."""
+    X = np.asarray(X)
+    B = X.shape[0]
+    nm = n_proc * n_res
+    totals = X[:, :n_res]
+    allocs = X[:, n_res:n_res + nm].reshape(B, n_proc, n_res)
+    reqs = X[:, n_res + nm:n_res + 2 * nm].reshape(B, n_proc, n_res)
+    return totals, allocs, reqs
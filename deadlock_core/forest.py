@@ -0,0 +1,109 @@
+import numpy as np
+
+_FIELDS = ("feature", "threshold", "children", "value", "roots", "classes", "depth")
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous NumPy arrays.
+
+    All trees share one node table: feature, threshold, children (N, 2) and
+    value (N, n_classes), the leaf class fractions already normalised the way
+    sklearn's trees normalise them. Leaves point to themselves, so a batch is
+    evaluated by stepping every (row, tree) pair down depth times with no
+    per-tree Python loop. Per-tree probabilities are then summed in tree order
+    and divided by the tree count, exactly as the forest does, which keeps the
+    output bit-identical to predict_proba.
+
+    Needs only NumPy once exported; has classes_, predict and predict_proba so
+    it drops in wherever the sklearn model was used.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, classes, depth):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.children = np.ascontiguousarray(children, dtype=np.intp).reshape(-1, 2)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.classes_ = np.asarray(classes)
+        self.depth = int(depth)
+        # Walk on doubled node ids, 2 * node + went_right, so a step needs no
+        # multiply: both slots of a node carry its feature and threshold.
+        self._feature2 = np.repeat(self.feature, 2)
+        self._threshold2 = np.repeat(self.threshold, 2)
+        self._children2 = 2 * self.children.ravel()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier (single output)."""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("only single-output forests can be flattened")
+        n_classes = len(model.classes_)
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n)
+            left = np.where(leaf, own, tree.children_left + offset)
+            right = np.where(leaf, own, tree.children_right + offset)
+
+            value = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, None]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold))
+            children.append(np.stack([left, right], axis=1))
+            values.append(value)
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds), np.concatenate(children),
+            np.concatenate(values), np.array(roots), model.classes_, depth,
+        )
+
+    @property
+    def n_trees(self):
+        return self.roots.shape[0]
+
+    def leaves(self, X):
+        """(B, n_trees) index of the leaf each row reaches in each tree."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise ValueError("X must be a (B, n_features) array")
+        flat = X.ravel()
+        base = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        node = np.repeat(2 * self.roots[None], X.shape[0], axis=0)
+        feature, threshold, children = self._feature2, self._threshold2, self._children2
+        for _ in range(self.depth):
+            # sklearn goes left when x <= threshold; features are never NaN.
+            x = np.take(flat, base + np.take(feature, node))
+            node = np.take(children, node + (x > np.take(threshold, node)))
+        return node // 2
+
+    def predict_proba(self, X, chunk_size=256):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((X.shape[0], self.value.shape[1]))
+        for lo in range(0, X.shape[0], chunk_size):
+            hi = min(lo + chunk_size, X.shape[0])
+            per_tree = self.value[self.leaves(X[lo:hi])]
+            # cumsum adds tree after tree, the same order sklearn accumulates in.
+            out[lo:hi] = np.cumsum(per_tree, axis=1)[:, -1] / self.n_trees
+        return out
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        arrays = {name: getattr(self, name) for name in _FIELDS if name not in ("classes", "depth")}
+        np.savez(path, classes=self.classes_, depth=np.array(self.depth), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in _FIELDS})
@@ -0,0 +1,37 @@
+import numpy as np
+
+# Bump whenever generate_states draws a different distribution, so models and
+# datasets keyed on it are not silently reused.
+GENERATOR_VERSION = 1
+
+
+def _uniform_upto(rng, upper, dtype):
+    """Independent uniform integers in [0, upper] for every entry of upper."""
+    # Scaling one float draw is several times faster than Generator.integers
+    # with per-element bounds, and the bias is below 2**-50 for these ranges.
+    return (rng.random(upper.shape) * (upper + 1)).astype(dtype)
+
+
+def generate_states(n_samples, n_proc=3, n_res=3, rng=None, dtype=np.int64):
+    """
+    Draw n_samples random multi-instance states at once.
+
+    Per resource, total capacity is uniform in [3, 9]; processes take turns
+    drawing their allocation uniformly from what is still unallocated, and
+    each request is uniform in [0, max_additional + alloc].
+
+    rng : numpy.random.Generator, seed or None
+    returns (totals, allocs, reqs) with shapes (B,m), (B,n,m), (B,n,m)
+    """
+    rng = np.random.default_rng(rng)
+    totals = rng.integers(3, 10, size=(n_samples, n_res), dtype=dtype)
+
+    allocs = np.empty((n_samples, n_proc, n_res), dtype=dtype)
+    remaining = totals.copy()
+    for i in range(n_proc):
+        allocs[:, i, :] = _uniform_upto(rng, remaining, dtype)
+        remaining -= allocs[:, i, :]
+
+    max_additional = totals - allocs.sum(axis=1, dtype=dtype)
+    reqs = _uniform_upto(rng, max_additional[:, None, :] + allocs, dtype)
+    return totals, allocs, reqs
@@ -0,0 +1,508 @@
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+from deadlock_core.detection import reduce_demands
+from deadlock_core.sparse import csr_release
+
+_UNBOUNDED = float("inf")
+# Level of the processes that hold nothing: they release nothing, so they
+# may as well go after everyone else.
+_LAST = -1
+# Moves one process may make while a single verdict is settled. Processes
+# that keep pushing each other up are usually forming a deadlock, so past
+# that they are parked with the deadlocked ones until they fit again.
+_MAX_MOVES = 2
+# Processes only ever move up, so levels pile up over time; past this many
+# more than the last rebuild produced, the next verdict rebuilds them.
+_EXTRA_LEVELS = 8
+
+
+class IncrementalDetector:
+    """
+    Event-driven deadlock detector for a multi-instance resource system.
+
+    Feed it allocate/release/request events; each call returns the deadlock
+    verdict for the state after the event. Processes are int ids and are
+    created on first use.
+
+    Every process whose whole request fits the current available vector can
+    finish right away, so only the blocked processes can end up deadlocked.
+    The detector keeps, per process, the number of resources it is blocked on
+    and, per resource, the waiting demands sorted by size, so a change of
+    available[r] only visits the demands between the old and the new value.
+
+    For the blocked processes it keeps a certificate: the finishable ones
+    spread over levels, and the remaining, deadlocked, processes. Level l may
+    use total minus what the tracked processes hold plus what the levels
+    below l release, and every request fits the level it is on, so the levels
+    are a reduction. Processes holding nothing go on a last level after all
+    the others. A process that stops waiting still fits its level, so it stays
+    tracked there, and waiters flipping in and out of the blocked set as
+    units come and go cost nothing.
+
+    Per level and resource the requests are kept sorted. An event that lowers
+    what some levels may use checks only the largest requests on them; a
+    process left short moves up to the lowest level it fits on, or among the
+    deadlocked if it does not fit once every finishable process has released.
+    The requests of the deadlocked are indexed the same way against what is
+    left at that point, with a count of the resources each is short of, so
+    one comes back as soon as its count drops to zero. The certificate is
+    rebuilt with reduce_demands over the blocked processes only when the
+    levels have piled up.
+    """
+
+    def __init__(self, total):
+        self._total = [int(t) for t in np.asarray(total).ravel()]
+        m = len(self._total)
+        self._available = list(self._total)
+        self._alloc = {}
+        self._need = {}
+        self._blocked_on = {}
+        self._waiters = [[] for _ in range(m)]
+        self._blocked = set()
+        self._tracked = set()
+        self._stale = False
+        self._reset_certificate()
+
+    @classmethod
+    def from_state(cls, total_vec, alloc_mat, req_mat):
+        """Build a detector already holding the given (total, alloc, req) snapshot."""
+        detector = cls(total_vec)
+        # Skip per-event certificate upkeep; the first verdict rebuilds it.
+        detector._stale = True
+        alloc_mat = np.asarray(alloc_mat)
+        req_mat = np.asarray(req_mat)
+        if alloc_mat.ndim != 2 or alloc_mat.shape != req_mat.shape or alloc_mat.shape[1] != len(detector._total):
+            raise ValueError("alloc and req must be (n, m) matrices matching total")
+        if (alloc_mat < 0).any() or (req_mat < 0).any():
+            raise ValueError("alloc and req must be non-negative")
+        for p in range(alloc_mat.shape[0]):
+            detector._process(p)
+        for p, r in zip(*np.nonzero(alloc_mat)):
+            k = int(alloc_mat[p, r])
+            if k > detector._available[r]:
+                raise ValueError(f"allocations exceed total capacity of R{r}")
+            detector._alloc[int(p)][int(r)] = k
+            detector._set_available(int(r), detector._available[r] - k)
+        for p, r in zip(*np.nonzero(req_mat)):
+            detector._set_need(int(p), int(r), int(req_mat[p, r]))
+        return detector
+
+    # -------------------- events --------------------
+
+    def allocate(self, p, r, k=1):
+        """Grant k units of resource r to process p, settling up to k of its request."""
+        self._check(r, k)
+        if k > self._available[r]:
+            raise ValueError(f"cannot allocate {k} of R{r}: only {self._available[r]} available")
+        self._process(p)
+        self._alloc[p][r] = self._alloc[p].get(r, 0) + k
+        if p in self._tracked:
+            self._alloc_changed(p, r, k)
+
+        # need' > available' exactly when need > available, so the grant never
+        # changes whether p is blocked on r and p is left out of the flips.
+        old = self._need[p].get(r, 0)
+        new = max(old - k, 0)
+        if new != old:
+            self._index_need(p, r, old, new)
+            if p in self._tracked:
+                self._need_changed(p, r, old, new)
+        self._set_available(r, self._available[r] - k, skip=p)
+        return self.is_deadlock
+
+    def release(self, p, r, k=1):
+        """Process p returns k units of resource r."""
+        self._check(r, k)
+        self._process(p)
+        held = self._alloc[p].get(r, 0)
+        if k > held:
+            raise ValueError(f"P{p} holds only {held} of R{r}, cannot release {k}")
+        if held == k:
+            del self._alloc[p][r]
+        else:
+            self._alloc[p][r] = held - k
+        if p in self._tracked:
+            self._alloc_changed(p, r, -k)
+        self._set_available(r, self._available[r] + k)
+        return self.is_deadlock
+
+    def request(self, p, r, k=1):
+        """Process p asks for k more units of resource r."""
+        self._check(r, k)
+        self._process(p)
+        self._set_need(p, r, self._need[p].get(r, 0) + k)
+        return self.is_deadlock
+
+    # -------------------- verdict --------------------
+
+    @property
+    def is_deadlock(self):
+        if self._dirty and not self._stale:
+            self._settle()
+        if self._stale:
+            self._rebuild()
+        elif self._unstuck:
+            self._retry()
+        return bool(self._deadlocked_set)
+
+    @property
+    def deadlocked(self):
+        """Ids of the processes that cannot finish, in ascending order."""
+        self.is_deadlock
+        return sorted(self._deadlocked_set)
+
+    @property
+    def available(self):
+        return np.array(self._available, dtype=np.int64)
+
+    def _reset_certificate(self):
+        m = len(self._total)
+        self._tracked_held = [0] * m
+        self._filed = {}
+        self._level = {}
+        self._releases = []
+        self._requests = []
+        self._last_requests = {}
+        self._members = []
+        self._max_levels = _EXTRA_LEVELS
+        self._dirty = []
+        self._deadlocked_set = set()
+        self._deadlocked_alloc = [0] * m
+        self._dead_requests = [[] for _ in range(m)]
+        self._dead_short = {}
+        self._unstuck = []
+
+    def _rebuild(self):
+        self._reset_certificate()
+        self._tracked = set(self._blocked)
+        for p in self._blocked:
+            for r, k in self._alloc[p].items():
+                self._tracked_held[r] += k
+        procs = list(self._blocked)
+        need_ptr, need_cols, need_vals = self._rows(procs, self._need)
+        work = np.array(self._total, dtype=np.int64) - self._tracked_held
+        short = need_vals > work[need_cols]
+        rows = np.repeat(np.arange(len(procs)), np.diff(need_ptr))
+        release = csr_release(*self._rows(procs, self._alloc), len(self._total))
+
+        def release_onto_level(ready, finish):
+            # One level per reduction round.
+            level = len(self._releases)
+            for i in ready.tolist():
+                self._add_finishable(procs[i], level)
+            return release(ready, finish)
+
+        _, finish, _ = reduce_demands(
+            work, len(procs), rows[short], need_cols[short], need_vals[short], release_onto_level,
+        )
+        for p, done in zip(procs, finish.tolist()):
+            if not done:
+                self._park(p)
+        self._max_levels = len(self._releases) + _EXTRA_LEVELS
+        self._stale = False
+
+    def _retry(self):
+        """Bring back every deadlocked process no longer short of anything."""
+        unstuck = self._unstuck
+        while unstuck:
+            p = unstuck.pop()
+            if p in self._deadlocked_set and not self._dead_short[p]:
+                self._unpark(p)
+                self._add_finishable(p, self._fit(p))
+
+    def _rows(self, procs, table):
+        """CSR (indptr, cols, vals) of table[p] for p in procs."""
+        indptr = np.zeros(len(procs) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(table[p]) for p in procs), np.int64, len(procs)), out=indptr[1:])
+        count = int(indptr[-1])
+        cols = np.fromiter((r for p in procs for r in table[p]), np.int64, count)
+        vals = np.fromiter((k for p in procs for k in table[p].values()), np.int64, count)
+        return indptr, cols, vals
+
+    # -------------------- levels --------------------
+
+    def _requests_on(self, level):
+        return self._last_requests if level == _LAST else self._requests[level]
+
+    def _add_finishable(self, p, level):
+        alloc = self._alloc[p]
+        if not alloc:
+            level = _LAST
+        elif level == len(self._releases):
+            self._releases.append({})
+            self._requests.append({})
+            self._members.append(0)
+        self._level[p] = level
+        if level != _LAST:
+            self._members[level] += 1
+            releases = self._releases[level]
+            for r, k in alloc.items():
+                releases[r] = releases.get(r, 0) + k
+        requests = self._requests_on(level)
+        filed = self._filed[p] = dict(self._need[p])
+        for r, k in filed.items():
+            insort(requests.setdefault(r, []), (k, p))
+
+    def _drop_finishable(self, p):
+        """Take p off its level; the levels above may now be short of what it held."""
+        level = self._level.pop(p)
+        if level != _LAST:
+            self._members[level] -= 1
+            releases = self._releases[level]
+            for r, k in self._alloc[p].items():
+                releases[r] -= k
+                self._dirty.append((r, level + 1))
+        requests = self._requests_on(level)
+        for r, k in self._filed.pop(p).items():
+            waiting = requests[r]
+            del waiting[bisect_left(waiting, (k, p))]
+
+    def _fit(self, p):
+        """Lowest level p's request fits on, a new one on top if need be; None if none."""
+        total = self._total
+        held = self._tracked_held
+        releases = self._releases
+        top = len(releases)
+        fit = 0
+        for r, k in self._need[p].items():
+            work = total[r] - held[r]
+            level = 0
+            while k > work:
+                if level == top:
+                    return None
+                work += releases[level].get(r, 0)
+                level += 1
+            if level > fit:
+                fit = level
+        return fit
+
+    def _place(self, p):
+        """File blocked process p on a level, or among the deadlocked."""
+        if self._alloc[p]:
+            level = self._fit(p)
+        else:
+            # Once everyone else has finished, total minus the deadlocked holdings is free.
+            total = self._total
+            dead = self._deadlocked_alloc
+            level = _LAST if all(k <= total[r] - dead[r] for r, k in self._need[p].items()) else None
+        if level is None:
+            self._park(p)
+        else:
+            self._add_finishable(p, level)
+
+    def _settle(self):
+        """Re-check every (resource, level and up) that lost units; move whoever is short."""
+        total = self._total
+        held = self._tracked_held
+        moves = {}
+        dirty = self._dirty
+        while dirty:
+            r, start = dirty.pop()
+            work = total[r] - held[r]
+            for level in range(start):
+                work += self._releases[level].get(r, 0)
+            for level in range(start, len(self._releases) + 1):
+                # Past the last level come the processes holding nothing.
+                top = level == len(self._releases)
+                waiting = (self._last_requests if top else self._requests[level]).get(r)
+                if waiting and waiting[-1][0] > work:
+                    short = [p for _, p in waiting[bisect_right(waiting, (work, _UNBOUNDED)):]]
+                    for p in short:
+                        moves[p] = moves.get(p, 0) + 1
+                        self._drop_finishable(p)
+                        if moves[p] > _MAX_MOVES:
+                            self._park(p)
+                        else:
+                            self._place(p)
+                    # The moves queued the resources they held; r goes on from the next level.
+                    if not top:
+                        dirty.append((r, level + 1))
+                    break
+                if not top:
+                    work += self._releases[level].get(r, 0)
+        # Levels emptied at the top are dropped.
+        while self._members and not self._members[-1]:
+            self._releases.pop()
+            self._requests.pop()
+            self._members.pop()
+        if len(self._releases) > self._max_levels:
+            self._stale = True
+
+    # -------------------- deadlocked --------------------
+
+    def _park(self, p):
+        """Count p among the deadlocked until it is short of nothing."""
+        for r, k in self._alloc[p].items():
+            self._shift_dead(r, k)
+        total = self._total
+        dead = self._deadlocked_alloc
+        filed = self._filed[p] = dict(self._need[p])
+        for r, k in filed.items():
+            insort(self._dead_requests[r], (k, p))
+        self._deadlocked_set.add(p)
+        self._dead_short[p] = short = sum(k > total[r] - dead[r] for r, k in filed.items())
+        if not short:
+            self._unstuck.append(p)
+
+    def _unpark(self, p):
+        self._deadlocked_set.discard(p)
+        del self._dead_short[p]
+        for r, k in self._filed.pop(p).items():
+            waiting = self._dead_requests[r]
+            del waiting[bisect_left(waiting, (k, p))]
+        for r, k in self._alloc[p].items():
+            self._shift_dead(r, -k)
+
+    def _shift_dead(self, r, delta):
+        """The deadlocked hold delta more of r; recount who is short of it."""
+        dead = self._deadlocked_alloc
+        before = self._total[r] - dead[r]
+        dead[r] += delta
+        after = before - delta
+        waiting = self._dead_requests[r]
+        lo, hi = sorted((before, after))
+        # Requests in (lo, hi] change side.
+        start = bisect_right(waiting, (lo, _UNBOUNDED))
+        stop = bisect_right(waiting, (hi, _UNBOUNDED))
+        step = 1 if delta > 0 else -1
+        dead_short = self._dead_short
+        for _, p in waiting[start:stop]:
+            dead_short[p] += step
+            if not dead_short[p]:
+                self._unstuck.append(p)
+
+    # -------------------- certificate upkeep --------------------
+
+    def _enter_blocked(self, p):
+        self._blocked.add(p)
+        if p in self._tracked:
+            return
+        self._tracked.add(p)
+        held = self._tracked_held
+        for r, k in self._alloc[p].items():
+            held[r] += k
+        if self._stale:
+            return
+        # What p holds is out of reach of every level up to its own.
+        for r in self._alloc[p]:
+            self._dirty.append((r, 0))
+        self._place(p)
+
+    def _leave_blocked(self, p):
+        self._blocked.discard(p)
+        level = self._level.get(p)
+        if level is not None and (level == _LAST or self._alloc[p]):
+            return
+        self._tracked.discard(p)
+        held = self._tracked_held
+        for r, k in self._alloc[p].items():
+            held[r] -= k
+        if self._stale:
+            return
+        if level is not None:
+            self._drop_finishable(p)
+        elif p in self._deadlocked_set:
+            # What p held comes back to everyone: nobody gets short.
+            self._unpark(p)
+
+    def _alloc_changed(self, p, r, delta):
+        """Allocation of tracked process p on r changed by delta (already applied)."""
+        self._tracked_held[r] += delta
+        if self._stale:
+            return
+        if delta > 0:
+            self._dirty.append((r, 0))
+        if p in self._deadlocked_set:
+            self._shift_dead(r, delta)
+        elif self._level[p] == _LAST:
+            # p held nothing until now: it goes on a real level.
+            self._drop_finishable(p)
+            self._place(p)
+        else:
+            releases = self._releases[self._level[p]]
+            releases[r] = releases.get(r, 0) + delta
+
+    def _need_changed(self, p, r, old, new):
+        """Request of tracked process p on r moved from old to new (already applied)."""
+        if self._stale:
+            return
+        filed = self._filed[p]
+        dead = p in self._deadlocked_set
+        waiting = self._dead_requests[r] if dead else self._requests_on(self._level[p]).setdefault(r, [])
+        if old:
+            del waiting[bisect_left(waiting, (old, p))]
+            del filed[r]
+        if new:
+            insort(waiting, (new, p))
+            filed[r] = new
+        if dead:
+            left = self._total[r] - self._deadlocked_alloc[r]
+            self._dead_short[p] += (new > left) - (old > left)
+            if not self._dead_short[p]:
+                self._unstuck.append(p)
+        elif new > old:
+            level = self._level[p]
+            self._dirty.append((r, len(self._releases) if level == _LAST else level))
+
+    # -------------------- bookkeeping --------------------
+
+    def _check(self, r, k):
+        if not 0 <= r < len(self._total):
+            raise ValueError(f"no resource R{r}: resources are R0..R{len(self._total) - 1}")
+        if k <= 0:
+            raise ValueError(f"amount must be positive, got {k}")
+
+    def _process(self, p):
+        if p not in self._need:
+            self._alloc[p] = {}
+            self._need[p] = {}
+            self._blocked_on[p] = 0
+
+    def _shift_blocked(self, p, delta):
+        was_blocked = self._blocked_on[p] > 0
+        self._blocked_on[p] += delta
+        is_blocked = self._blocked_on[p] > 0
+        if is_blocked and not was_blocked:
+            self._enter_blocked(p)
+        elif was_blocked and not is_blocked:
+            self._leave_blocked(p)
+
+    def _index_need(self, p, r, old, new):
+        waiters = self._waiters[r]
+        if old:
+            del waiters[bisect_right(waiters, (old, p)) - 1]
+        if new:
+            insort(waiters, (new, p))
+            self._need[p][r] = new
+        else:
+            self._need[p].pop(r, None)
+
+    def _set_need(self, p, r, k):
+        old = self._need[p].get(r, 0)
+        if k == old:
+            return
+        was_tracked = p in self._tracked
+        self._index_need(p, r, old, k)
+        avail = self._available[r]
+        delta = (k > avail) - (old > avail)
+        if delta:
+            self._shift_blocked(p, delta)
+        if was_tracked and p in self._tracked:
+            self._need_changed(p, r, old, k)
+
+    def _set_available(self, r, value, skip=None):
+        old = self._available[r]
+        self._available[r] = value
+        if value == old:
+            return
+        waiters = self._waiters[r]
+        lo, hi = sorted((old, value))
+        # Demands in (lo, hi] change side of the available line.
+        start = bisect_right(waiters, (lo, _UNBOUNDED))
+        stop = bisect_right(waiters, (hi, _UNBOUNDED))
+        delta = -1 if value > old else 1
+        for _, p in waiters[start:stop]:
+            if p != skip:
+                self._shift_blocked(p, delta)
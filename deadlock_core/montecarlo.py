@@ -0,0 +1,234 @@
+import time
+
+import numpy as np
+
+from deadlock_core.detection import detect_deadlock_batch
+
+
+def _wilson(k, n, z=1.96):
+    """Wilson score interval of k successes out of n trials; returns (lo, hi)."""
+    k = np.asarray(k, dtype=np.float64)
+    n = np.maximum(np.asarray(n, dtype=np.float64), 1)
+    p = k / n
+    denom = 1 + z**2 / n
+    center = (p + z**2 / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denom
+    return np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)
+
+
+def _run_chunk(n_replicas, n_proc, capacity, n_steps, arrival_rate, finish_rate, request_size, rng, history):
+    """
+    Advance n_replicas systems together for n_steps.
+
+    returns (deadlock_step, running, held_sum, utilization): deadlock_step is
+    (R,) with the step each replica deadlocked at, 0 if it never did; running
+    and held_sum are (n_steps,) counts of replicas still running and the
+    units they held; utilization is (n_steps, R) or None without history.
+    """
+    m = capacity.size
+    # Replicas go on the last axis, so the sums over processes and resources
+    # below are element-wise passes over contiguous rows rather than
+    # reductions over axes of length n_proc or m. Small systems fit int16,
+    # which halves the memory traffic again.
+    dtype = np.int16 if n_proc * int(capacity.max()) < np.iinfo(np.int16).max else np.int64
+    capacity = capacity.astype(dtype)
+    alloc = np.zeros((n_proc, m, n_replicas), dtype=dtype)
+    need = np.zeros((n_proc, m, n_replicas), dtype=dtype)
+    busy = np.zeros((n_proc, n_replicas), dtype=bool)
+    holding = np.zeros((n_proc, n_replicas), dtype=bool)
+    avail = np.repeat(capacity[:, None], n_replicas, axis=1)
+    ids = np.arange(n_replicas)
+    alive = np.ones(n_replicas, dtype=bool)
+    deadlock_step = np.zeros(n_replicas, dtype=np.int64)
+    running = np.zeros(n_steps, dtype=np.int64)
+    held_sum = np.zeros(n_steps, dtype=np.int64)
+    utilization = np.zeros((n_steps, n_replicas), dtype=np.float32) if history else None
+    demand_cap = np.minimum(request_size, capacity)
+    units = int(capacity.sum())
+
+    for t in range(n_steps):
+        if not alive.any():
+            break
+        size = ids.size
+        # Deadlocked replicas are dropped once they make up a tenth of the
+        # arrays; until then they keep stepping but are masked out.
+        if alive.sum() < 0.9 * size:
+            # compress keeps the copies C-ordered; fancy indexing on the last
+            # axis would hand back strided views that slow every later pass.
+            keep = alive
+            ids, avail, alloc, need, busy, holding, alive = (
+                np.compress(keep, a, axis=-1) for a in (ids, avail, alloc, need, busy, holding, alive)
+            )
+            size = ids.size
+
+        # Jobs in their hold phase finish and release everything.
+        done = holding & (rng.random((n_proc, size)) < finish_rate)
+        released = alloc * done[:, None, :]
+        avail += released.sum(axis=0, dtype=dtype)
+        alloc -= released
+        busy &= ~done
+
+        # Idle processes start a job with a fresh demand vector.
+        arrive = ~busy & (rng.random((n_proc, size)) < arrival_rate)
+        procs, reps = np.nonzero(arrive)
+        need[procs, :, reps] = (rng.random((procs.size, m)) * (demand_cap + 1)).astype(dtype)
+        busy |= arrive
+
+        # Waiting processes take what is free in a random priority order and
+        # keep it: the hold-and-wait that lets deadlocks form.
+        for i in rng.permutation(n_proc):
+            grant = np.minimum(avail, need[i])
+            alloc[i] += grant
+            need[i] -= grant
+            avail -= grant
+        waiting = busy & need.any(axis=1)
+        holding = busy & ~waiting
+
+        held = units - avail.sum(axis=0, dtype=np.int64)
+        running[t] = alive.sum()
+        held_sum[t] = held[alive].sum()
+        if history:
+            utilization[t, ids[alive]] = held[alive] / units
+
+        # If every waiting process fits what is free once the holders finish,
+        # all of them can finish; only the other replicas need the full check.
+        work = avail + (alloc * holding[:, None, :]).sum(axis=0, dtype=dtype)
+        blocked = waiting & (need > work).any(axis=1)
+        suspects = np.flatnonzero(blocked.any(axis=0) & alive)
+        if not suspects.size:
+            continue
+        dead, _ = detect_deadlock_batch(
+            np.broadcast_to(capacity, (suspects.size, m)),
+            alloc[:, :, suspects].transpose(2, 0, 1),
+            need[:, :, suspects].transpose(2, 0, 1),
+        )
+        stuck = suspects[dead]
+        deadlock_step[ids[stuck]] = t + 1
+        alive[stuck] = False
+        if history:
+            # A deadlock is permanent, so so is what the replica holds.
+            utilization[t + 1:, ids[stuck]] = utilization[t, ids[stuck]]
+    return deadlock_step, running, held_sum, utilization
+
+
+def simulate_workload(
+    n_replicas=10_000,
+    n_steps=500,
+    n_proc=5,
+    capacity=(4, 4, 4),
+    arrival_rate=0.2,
+    hold_time=5.0,
+    request_size=2,
+    seed=0,
+    chunk_size=20_000,
+    history=False,
+):
+    """
+    Monte Carlo estimate of how often and how soon a workload deadlocks.
+
+    Every replica is a system of n_proc processes over resources with the
+    given capacity, advanced in discrete steps. An idle process starts a job
+    with probability arrival_rate per step, demanding a uniform [0,
+    request_size] units of every resource. While waiting it takes whatever
+    is free, in a random priority order, and keeps it; once it holds its
+    whole demand it keeps it for a geometric number of steps with mean
+    hold_time and then releases everything. After every step the replicas
+    with a waiting process are checked with detect_deadlock_batch, and a
+    replica that deadlocked stops, since a deadlock never clears on its own.
+
+    All replicas of a chunk advance in lockstep as (replicas, n_proc, m)
+    arrays. Only the per-step counts and a per-replica deadlock step are
+    kept; history=True also returns the utilization of every replica at
+    every step, which costs n_steps x n_replicas floats.
+
+    returns a dict with
+        deadlock_probability, probability_ci : share of replicas that
+            deadlocked within n_steps, with its 95% Wilson interval
+        survival, survival_ci : (n_steps,) share not deadlocked after each
+            step, with (2, n_steps) Wilson bounds
+        mean_time_to_deadlock, mean_time_ci : mean step of the deadlocked
+            replicas and its 95% normal interval (nan if none deadlocked)
+        time_quantiles : {50, 90, 99} percentiles of that step
+        time_histogram : (n_steps + 1,) replicas deadlocking at each step
+        mean_utilization : (n_steps,) share of all units held, averaged
+            over the replicas still running
+        replicas, steps, deadlocks, replica_steps, seconds
+        deadlock_step, utilization : with history only; (n_replicas,) step
+            of each deadlock (0 for none) and (n_steps, n_replicas)
+    """
+    capacity = np.asarray(capacity, dtype=np.int64).ravel()
+    if capacity.size == 0 or (capacity < 1).any():
+        raise ValueError("capacity must hold at least one unit of every resource")
+    if not 0 < arrival_rate <= 1:
+        raise ValueError("arrival_rate must be in (0, 1]")
+    if hold_time < 1:
+        raise ValueError("hold_time must be at least one step")
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    histogram = np.zeros(n_steps + 1, dtype=np.int64)
+    running = np.zeros(n_steps, dtype=np.int64)
+    held_sum = np.zeros(n_steps, dtype=np.int64)
+    steps, utilization = [], []
+    for lo in range(0, n_replicas, chunk_size):
+        chunk = _run_chunk(
+            min(chunk_size, n_replicas - lo), n_proc, capacity, n_steps,
+            arrival_rate, 1 / hold_time, request_size, rng, history,
+        )
+        histogram += np.bincount(chunk[0], minlength=n_steps + 1)
+        running += chunk[1]
+        held_sum += chunk[2]
+        if history:
+            steps.append(chunk[0])
+            utilization.append(chunk[3])
+
+    report = summarize_deadlock_times(histogram, n_replicas)
+    report["mean_utilization"] = held_sum / np.maximum(running, 1) / capacity.sum()
+    report["replica_steps"] = int(running.sum())
+    report["seconds"] = time.perf_counter() - start
+    if history:
+        report["deadlock_step"] = np.concatenate(steps)
+        report["utilization"] = np.concatenate(utilization, axis=1)
+    return report
+
+
+def summarize_deadlock_times(histogram, n_replicas, z=1.96):
+    """
+    Deadlock statistics from a histogram of deadlock steps.
+
+    histogram : (n_steps + 1,) replicas that deadlocked at each step; entry 0
+                counts the replicas that never did
+    returns the statistics part of the simulate_workload report
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    n_steps = histogram.size - 1
+    deadlocks = int(histogram[1:].sum())
+    survived = n_replicas - np.cumsum(histogram[1:])
+
+    t = np.arange(1, n_steps + 1)
+    counts = histogram[1:]
+    if deadlocks:
+        mean = float((t * counts).sum() / deadlocks)
+        var = float((counts * (t - mean) ** 2).sum() / max(deadlocks - 1, 1))
+        half = z * np.sqrt(var / deadlocks)
+        cdf = np.cumsum(counts) / deadlocks
+        quantiles = {q: int(t[np.searchsorted(cdf, q / 100)]) for q in (50, 90, 99)}
+    else:
+        mean, half = float("nan"), float("nan")
+        quantiles = {q: None for q in (50, 90, 99)}
+
+    lo, hi = _wilson(deadlocks, n_replicas, z)
+    surv_lo, surv_hi = _wilson(survived, n_replicas, z)
+    return {
+        "replicas": n_replicas,
+        "steps": n_steps,
+        "deadlocks": deadlocks,
+        "deadlock_probability": deadlocks / n_replicas if n_replicas else 0.0,
+        "probability_ci": (float(lo), float(hi)),
+        "survival": survived / max(n_replicas, 1),
+        "survival_ci": np.stack([surv_lo, surv_hi]),
+        "mean_time_to_deadlock": mean,
+        "mean_time_ci": (mean - half, mean + half),
+        "time_quantiles": quantiles,
+        "time_histogram": histogram,
+    }
@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from deadlock_core.detection import _satisfied_range
+from deadlock_core.sparse import _csr, reduce_csr
+
+
+def state_components(n, m, rows, cols):
+    """
+    Union-find over the bipartite process/resource graph.
+
+    n, m       : number of processes and resources
+    rows, cols : process and resource of every non-zero alloc or req entry
+    returns (proc_label, res_label): the smallest node id of each node's
+    component, processes numbered 0..n-1 and resources n..n+m-1
+
+    Vectorized union by min-label: every round hooks the larger root of each
+    still-split edge onto the smaller one, then compresses paths by pointer
+    jumping until every node points at its root. Edges already inside one
+    component drop out, so rounds get cheaper as components merge.
+    """
+    parent = np.arange(n + m, dtype=np.int64)
+    u = np.asarray(rows, dtype=np.int64)
+    v = np.asarray(cols, dtype=np.int64) + n
+    while u.size:
+        pu, pv = parent[u], parent[v]
+        split = pu != pv
+        u, v, pu, pv = u[split], v[split], pu[split], pv[split]
+        if not u.size:
+            break
+        np.minimum.at(parent, np.maximum(pu, pv), np.minimum(pu, pv))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent[:n], parent[n:]
+
+
+def _select_rows(csr, procs, res_local):
+    """CSR rows procs of csr with columns renumbered through res_local."""
+    indptr, cols, vals = csr
+    idx = _satisfied_range(indptr[procs], indptr[procs + 1])
+    sub_ptr = np.zeros(procs.size + 1, dtype=np.int64)
+    np.cumsum(indptr[procs + 1] - indptr[procs], out=sub_ptr[1:])
+    return sub_ptr, res_local[cols[idx]], vals[idx]
+
+
+def _reduce_rows(arrays, procs, res):
+    """Global ids of procs that finish, in order, reducing them over resources res only."""
+    res_local = arrays["res_local"]
+    alloc = (arrays["a_ptr"], arrays["a_cols"], arrays["a_vals"])
+    req = (arrays["r_ptr"], arrays["r_cols"], arrays["r_vals"])
+    order, _, _ = reduce_csr(
+        arrays["total"][res], _select_rows(alloc, procs, res_local), _select_rows(req, procs, res_local)
+    )
+    return procs[order]
+
+
+def _share(arrays):
+    """Copy arrays into shared memory; returns (spec, handles)."""
+    spec, handles = {}, []
+    for name, arr in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        spec[name] = (shm.name, arr.shape, arr.dtype.str)
+        handles.append(shm)
+    return spec, handles
+
+
+def _reduce_shared_component(spec, p_lo, p_hi, r_lo, r_hi):
+    handles = [shared_memory.SharedMemory(name=name) for name, _, _ in spec.values()]
+    try:
+        arrays = {
+            key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            for (key, (_, shape, dtype)), shm in zip(spec.items(), handles)
+        }
+        procs = arrays["proc_order"][p_lo:p_hi]
+        res = arrays["res_order"][r_lo:r_hi]
+        return np.array(_reduce_rows(arrays, procs, res))
+    finally:
+        for shm in handles:
+            shm.close()
+
+
+def partitioned_reduction(total_vec, alloc, req, n_workers=None, min_parallel_nnz=200_000):
+    """
+    Holt reduction split over the independent components of a snapshot.
+
+    Processes and resources that share no allocation or request can never
+    wait on each other, so each component of the process/resource graph
+    (see state_components) is reduced on its own. Components with at least
+    min_parallel_nnz non-zeros are sent to a process pool, which reads the
+    CSR arrays from shared memory and returns only the finished process ids.
+    The remaining small components are reduced together in this process.
+    Dense or scipy.sparse alloc/req are accepted.
+
+    returns (order, finish, work) as holt_reduction; order lists every
+    component's finishers one component after another, which is a valid
+    safe sequence because components never exchange resources.
+    """
+    total_vec = np.asarray(total_vec, dtype=np.int64)
+    (a_ptr, a_cols, a_vals), shape = _csr(alloc)
+    (r_ptr, r_cols, r_vals), req_shape = _csr(req)
+    if len(shape) != 2 or shape != req_shape:
+        raise ValueError("alloc and req must be (n, m) matrices of the same shape")
+    n, m = shape
+    if total_vec.shape != (m,):
+        raise ValueError("total must be an (m,) vector")
+
+    a_rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(a_ptr))
+    r_rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(r_ptr))
+    proc_label, res_label = state_components(
+        n, m, np.concatenate([a_rows, r_rows]), np.concatenate([a_cols, r_cols])
+    )
+
+    # Lay processes and resources out component by component.
+    proc_order = np.argsort(proc_label, kind="stable")
+    res_order = np.argsort(res_label, kind="stable")
+    labels, p_start, p_count = np.unique(proc_label[proc_order], return_index=True, return_counts=True)
+    r_sorted = res_label[res_order]
+    r_start = np.searchsorted(r_sorted, labels)
+    r_stop = np.searchsorted(r_sorted, labels, side="right")
+    res_local = np.empty(m, dtype=np.int64)
+    res_local[res_order] = np.arange(m) - np.searchsorted(r_sorted, r_sorted)
+
+    nnz = np.diff(a_ptr) + np.diff(r_ptr)
+    comp_nnz = np.add.reduceat(nnz[proc_order], p_start) if n else np.empty(0, dtype=np.int64)
+    n_workers = n_workers or os.cpu_count() or 1
+    large = np.flatnonzero(comp_nnz >= min_parallel_nnz)
+    if n_workers == 1 or large.size < 2:
+        large = np.empty(0, dtype=np.int64)
+
+    arrays = {
+        "total": total_vec, "res_local": res_local,
+        "a_ptr": a_ptr, "a_cols": a_cols, "a_vals": a_vals,
+        "r_ptr": r_ptr, "r_cols": r_cols, "r_vals": r_vals,
+        "proc_order": proc_order, "res_order": res_order,
+    }
+    orders = []
+    if large.size:
+        spec, handles = _share(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=min(n_workers, large.size)) as pool:
+                futures = [
+                    pool.submit(_reduce_shared_component, spec, p_start[c], p_start[c] + p_count[c],
+                                r_start[c], r_stop[c])
+                    for c in large
+                ]
+                orders.extend(future.result() for future in futures)
+        finally:
+            for shm in handles:
+                shm.close()
+                shm.unlink()
+
+    # Small components together, over the full resource space.
+    is_large = np.zeros(labels.size, dtype=bool)
+    is_large[large] = True
+    rest = proc_order[np.repeat(~is_large, p_count)]
+    arrays["res_local"] = np.arange(m, dtype=np.int64)
+    orders.append(_reduce_rows(arrays, rest, np.arange(m)))
+
+    order = np.concatenate(orders)
+    finish = np.zeros(n, dtype=bool)
+    finish[order] = True
+    stuck = _satisfied_range(a_ptr[:-1][~finish], a_ptr[1:][~finish])
+    work = total_vec - np.bincount(a_cols[stuck], weights=a_vals[stuck], minlength=m).astype(np.int64)
+    return order, finish, work
+
+
+def partitioned_deadlock(total_vec, alloc, req, n_workers=None, min_parallel_nnz=200_000):
+    """
+    bankers_deadlock over independent components; see partitioned_reduction.
+
+    returns (is_deadlock, safe_sequence, deadlocked_processes, final_available)
+    """
+    order, finish, work = partitioned_reduction(total_vec, alloc, req, n_workers, min_parallel_nnz)
+    safe_seq = [f"P{i}" for i in order]
+    deadlocked = [f"P{i}" for i in np.flatnonzero(~finish)]
+    return len(deadlocked) > 0, safe_seq, deadlocked, work
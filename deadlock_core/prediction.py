@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+
+from deadlock_core.features import extract_features
+from deadlock_core.timing import StageTimer
+
+_UNTIMED = StageTimer(enabled=False)
+
+
+def _deadlock_column(model, proba):
+    """P(deadlock) out of predict_proba output, whatever classes the model saw."""
+    classes = list(getattr(model, "classes_", [0, 1]))
+    if 1 not in classes:
+        return np.zeros(proba.shape[0])
+    return proba[:, classes.index(1)]
+
+
+def predict_states(model, totals, allocations, requests, threshold=0.5, chunk_size=65536, timer=None):
+    """
+    Score a batch of snapshots with one predict_proba pass per chunk.
+
+    model       : fitted classifier trained on extract_features rows
+    totals      : (B,m), or (m,) for a single snapshot
+    allocations : (B,n,m), or (n,m)
+    requests    : (B,n,m), or (n,m)
+    threshold   : P(deadlock) at or above which a snapshot is labelled 1
+    timer       : optional StageTimer; "features" and "inference" are timed
+    returns (labels, proba, latency)
+        labels  : (B,) int, 1 for predicted deadlock
+        proba   : (B,) float, P(deadlock)
+        latency : seconds per snapshot, feature extraction included
+    """
+    totals = np.asarray(totals)
+    allocations = np.asarray(allocations)
+    requests = np.asarray(requests)
+    if allocations.ndim == 2:
+        totals, allocations, requests = totals[None], allocations[None], requests[None]
+    if allocations.ndim != 3 or allocations.shape != requests.shape:
+        raise ValueError("allocations and requests must be (B, n, m) arrays of the same shape")
+    if totals.shape != (allocations.shape[0], allocations.shape[2]):
+        raise ValueError("totals must be a (B, m) array")
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError("threshold must lie in [0, 1]")
+
+    timer = timer or _UNTIMED
+    B = allocations.shape[0]
+    proba = np.empty(B)
+    start = time.perf_counter()
+    for lo in range(0, B, chunk_size):
+        hi = min(lo + chunk_size, B)
+        with timer.stage("features"):
+            features = extract_features(totals[lo:hi], allocations[lo:hi], requests[lo:hi])
+        with timer.stage("inference"):
+            proba[lo:hi] = _deadlock_column(model, model.predict_proba(features))
+    latency = (time.perf_counter() - start) / max(B, 1)
+    return (proba >= threshold).astype(np.int64), proba, latency
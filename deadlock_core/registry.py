@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+DEFAULT_ROOT = os.environ.get(
+    "DEADLOCK_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "deadlock_core", "models")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def config_key(config):
+    """Content address of a training config: sha256 of its canonical JSON."""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ModelRegistry:
+    """
+    On-disk store of trained model bundles keyed by config_key.
+
+    Every entry is <key>.pkl plus a <key>.json copy of its config. Reads bump
+    the entry's modification time, and after each write the least recently
+    used entries are removed until the store fits in max_bytes.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def load(self, key):
+        """Return the stored bundle for key, or None if it is missing or cannot be loaded."""
+        path = self._path(key, "pkl")
+        try:
+            with open(path, "rb") as f:
+                bundle = pickle.load(f)
+        except Exception:
+            # Truncated files, other library versions and renamed classes fail
+            # in too many ways to list; any of them just means retraining.
+            return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            pass
+        return bundle
+
+    def save(self, key, bundle, config):
+        for ext, payload in (
+            ("json", json.dumps(config, sort_keys=True, indent=2).encode("utf-8")),
+            ("pkl", pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL)),
+        ):
+            # Write next to the target and rename, so concurrent readers never
+            # see a half-written model.
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key, ext))
+        self.evict()
+
+    def get_or_train(self, config, train):
+        """
+        Load the bundle for config, or build it with train(config) and store it.
+
+        returns (bundle, cache_hit)
+        """
+        key = config_key(config)
+        bundle = self.load(key)
+        if bundle is not None:
+            return bundle, True
+        bundle = train(config)
+        self.save(key, bundle, config)
+        return bundle, False
+
+    def entries(self):
+        """(key, size_bytes, last_used) of every stored model, most recent first."""
+        out = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            out.append((name[:-4], st.st_size, st.st_mtime))
+        out.sort(key=lambda entry: entry[2], reverse=True)
+        return out
+
+    def evict(self):
+        """Drop least recently used models until the store fits in max_bytes."""
+        used = 0
+        for rank, (key, size, _) in enumerate(self.entries()):
+            used += size
+            # The most recently used model is always kept, even if it alone
+            # exceeds the budget.
+            if rank and used > self.max_bytes:
+                for ext in ("pkl", "json"):
+                    try:
+                        os.remove(self._path(key, ext))
+                    except FileNotFoundError:
+                        pass
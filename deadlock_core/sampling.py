@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+
+from deadlock_core.detection import detect_deadlock_batch
+from deadlock_core.features import extract_features
+from deadlock_core.generation import generate_states
+from deadlock_core.prediction import predict_states
+
+SAMPLING_STRATEGIES = ("uniform", "boundary", "active")
+
+
+def _take(states, idx):
+    return tuple(a[idx] for a in states)
+
+
+def _fill_along(base, delta, rank, k):
+    """base plus the first k units of delta, entries filled in rank order."""
+    B = base.shape[0]
+    flat_delta = delta.reshape(B, -1)
+    order = np.argsort(rank, axis=1)
+    before = np.empty_like(flat_delta)
+    sorted_delta = np.take_along_axis(flat_delta, order, axis=1)
+    np.put_along_axis(before, order, np.cumsum(sorted_delta, axis=1) - sorted_delta, axis=1)
+    filled = np.clip(k[:, None] - before, 0, flat_delta)
+    return base + filled.reshape(base.shape)
+
+
+def boundary_states(n_samples, n_proc=3, n_res=3, rng=None):
+    """
+    Pairs of states one request unit apart with opposite verdicts.
+
+    Deadlock is monotone in the requests, so along any path that raises them
+    one unit at a time the verdict flips exactly once. Each uniform
+    candidate gets such a path: from all-zero requests up to its own when it
+    is deadlocked, and from its own requests up to ones no process can meet
+    when it is safe. A batched binary search over all paths at once finds
+    the flip, and both states on either side of it are kept, so the classes
+    are exactly balanced.
+
+    returns (totals, allocs, reqs, y) with n_samples rows, shuffled
+    """
+    rng = np.random.default_rng(rng)
+    n_pairs = -(-n_samples // 2)
+    totals, allocs, reqs = generate_states(n_pairs, n_proc, n_res, rng=rng)
+    deadlocked, _ = detect_deadlock_batch(totals, allocs, reqs)
+
+    # No process can finish once it asks for more than it does not hold.
+    ceiling = totals[:, None, :] - allocs + 1
+    base = np.where(deadlocked[:, None, None], 0, reqs)
+    delta = np.where(deadlocked[:, None, None], reqs, ceiling - reqs)
+    rank = rng.random((n_pairs, n_proc * n_res))
+
+    lo = np.zeros(n_pairs, dtype=np.int64)
+    hi = delta.reshape(n_pairs, -1).sum(axis=1)
+    while True:
+        open_ = np.flatnonzero(hi - lo > 1)
+        if open_.size == 0:
+            break
+        mid = (lo[open_] + hi[open_]) // 2
+        state = _fill_along(base[open_], delta[open_], rank[open_], mid)
+        dead, _ = detect_deadlock_batch(totals[open_], allocs[open_], state)
+        hi[open_[dead]] = mid[dead]
+        lo[open_[~dead]] = mid[~dead]
+
+    safe = _fill_along(base, delta, rank, lo)
+    unsafe = _fill_along(base, delta, rank, hi)
+    totals = np.concatenate([totals, totals])
+    allocs = np.concatenate([allocs, allocs])
+    reqs = np.concatenate([safe, unsafe])
+    y = np.repeat(np.array([0, 1], dtype=np.int64), n_pairs)
+    keep = rng.permutation(2 * n_pairs)[:n_samples]
+    return totals[keep], allocs[keep], reqs[keep], y[keep]
+
+
+def uncertain_states(model, n_samples, n_proc=3, n_res=3, rng=None, pool_factor=10):
+    """
+    The uniform states model is least sure about, half of each true class.
+
+    A pool of pool_factor * n_samples states is scored and labeled; from
+    each class the states with P(deadlock) closest to 0.5 are kept. A class
+    with too few members in the pool is topped up from the other.
+
+    returns (totals, allocs, reqs, y)
+    """
+    rng = np.random.default_rng(rng)
+    pool = generate_states(pool_factor * n_samples, n_proc, n_res, rng=rng)
+    y, _ = detect_deadlock_batch(*pool)
+    _, proba, _ = predict_states(model, *pool)
+    by_margin = np.argsort(np.abs(proba - 0.5), kind="stable")
+    positive = by_margin[y[by_margin]]
+    negative = by_margin[~y[by_margin]]
+    n_neg = max(n_samples // 2, n_samples - positive.size)
+    n_pos = n_samples - min(n_neg, negative.size)
+    keep = np.concatenate([negative[:n_samples - n_pos], positive[:n_pos]])
+    totals, allocs, reqs = _take(pool, keep)
+    return totals, allocs, reqs, y[keep].astype(np.int64)
+
+
+def _draw(strategy, model, n_samples, sizes, rng):
+    """n_samples labeled feature rows spread over sizes, drawn by strategy."""
+    per_size = -(-n_samples // len(sizes))
+    features, labels = [], []
+    for n_proc, n_res in sizes:
+        if strategy == "boundary":
+            # Boundary pairs alone lose the class prior of the uniform states
+            # the model is scored on, so half of each batch stays uniform.
+            n_pairs = per_size // 2
+            near = boundary_states(n_pairs, n_proc, n_res, rng=rng)
+            totals, allocs, reqs = generate_states(per_size - n_pairs, n_proc, n_res, rng=rng)
+            y = detect_deadlock_batch(totals, allocs, reqs)[0].astype(np.int64)
+            totals, allocs, reqs, y = (np.concatenate(pair) for pair in zip(near, (totals, allocs, reqs, y)))
+        elif strategy == "active" and model is not None:
+            totals, allocs, reqs, y = uncertain_states(model, per_size, n_proc, n_res, rng=rng)
+        else:
+            totals, allocs, reqs = generate_states(per_size, n_proc, n_res, rng=rng)
+            y = detect_deadlock_batch(totals, allocs, reqs)[0].astype(np.int64)
+        features.append(extract_features(totals, allocs, reqs))
+        labels.append(y)
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def sampling_report(target_accuracy, sizes, seed=0, step=200, max_samples=20_000, n_eval=4_000,
+                    n_estimators=100, strategies=SAMPLING_STRATEGIES):
+    """
+    Samples and training time each strategy needs to reach target_accuracy.
+
+    Every strategy grows its training set by step rows at a time and refits
+    a forest, until the accuracy on one shared uniform evaluation set of
+    about n_eval states reaches the target or max_samples is hit. Boundary
+    batches are half boundary_states pairs and half uniform states; the
+    active strategy starts from one uniform batch and then mines the states
+    its current model is least sure about.
+
+    returns one dict per strategy: strategy, n_samples, train_seconds (total
+    fit time over all refits), accuracy, reached
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    X_eval, y_eval = _draw("uniform", None, n_eval, sizes, np.random.default_rng([seed, 0]))
+    report = []
+    for k, strategy in enumerate(strategies):
+        rng = np.random.default_rng([seed, k + 1])
+        X = np.empty((0, X_eval.shape[1]), dtype=X_eval.dtype)
+        y = np.empty(0, dtype=np.int64)
+        model = None
+        train_seconds = 0.0
+        accuracy = 0.0
+        while X.shape[0] < max_samples:
+            X_new, y_new = _draw(strategy, model, step, sizes, rng)
+            X = np.concatenate([X, X_new])
+            y = np.concatenate([y, y_new])
+            start = time.perf_counter()
+            model = RandomForestClassifier(n_estimators=n_estimators, random_state=seed).fit(X, y)
+            train_seconds += time.perf_counter() - start
+            accuracy = float((model.predict(X_eval) == y_eval).mean())
+            if accuracy >= target_accuracy:
+                break
+        report.append({
+            "strategy": strategy,
+            "n_samples": int(X.shape[0]),
+            "train_seconds": train_seconds,
+            "accuracy": accuracy,
+            "reached": accuracy >= target_accuracy,
+        })
+    return report
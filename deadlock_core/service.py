@@ -0,0 +1,326 @@
+"""
+Headless detection and prediction service.
+
+    python -m deadlock_core.service --port 8000 --model forest.npz
+
+POST /detect takes {"total": [m], "alloc": [[n x m]], "req": [[n x m]]} and
+answers {"deadlock", "safe_sequence", "deadlocked", "probability"}; the
+probability is null unless a model was loaded. Snapshots that fail
+validation get 400, and 500 comes back if their batch fails to reduce or
+score. GET /metrics reports
+counters, throughput and latency percentiles, GET /health answers ok.
+
+Concurrent requests are coalesced by a MicroBatcher: the first request of a
+batch waits up to --max-wait seconds for others, then the whole batch goes
+through reduce_batch and predict_states in one call per state shape. When
+--max-pending requests are already queued, new ones get 503 right away
+instead of piling up.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import numpy as np
+
+from deadlock_core.detection import reduce_batch
+from deadlock_core.prediction import predict_states
+from deadlock_core.timing import StageTimer
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submissions into batches for one handler call.
+
+    handler     : callable(list of items) -> list of results, one per item;
+                  run in the default executor so the event loop stays free
+    max_batch   : most items per handler call
+    max_wait    : seconds the first item of a batch waits for company
+    max_pending : queued items beyond which submit raises asyncio.QueueFull
+    timer       : StageTimer receiving "queue" and "batch" samples and the
+                  "batches" / "batched" counters
+    """
+
+    def __init__(self, handler, max_batch=256, max_wait=0.002, max_pending=4096, timer=None):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timer = timer or StageTimer()
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._task = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item):
+        """Result of handler for item once its batch has run."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            now = time.perf_counter()
+            for _, _, queued in batch:
+                self.timer.record("queue", now - queued, queued)
+            self.timer.count("batches")
+            self.timer.count("batched", len(batch))
+            items = [item for item, _, _ in batch]
+            try:
+                with self.timer.stage("batch"):
+                    results = await loop.run_in_executor(None, self.handler, items)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _int_array(payload, key):
+    try:
+        a = np.asarray(payload[key])
+    except (KeyError, TypeError):
+        raise ValueError(f"payload needs total, alloc and req integer arrays (no {key!r})") from None
+    # JSON floats and booleans would be truncated by a cast, and integers past
+    # int64 come back as object or uint64 arrays: reject all of them.
+    if a.size and a.dtype.kind not in "iu":
+        raise ValueError(f"{key} must hold integers only")
+    if a.dtype.kind == "u" and (a > np.iinfo(np.int64).max).any():
+        raise ValueError(f"{key} holds integers too large for int64")
+    return a.astype(np.int64)
+
+
+def parse_snapshot(payload):
+    """(total, alloc, req) int64 arrays out of a /detect payload; raises ValueError."""
+    total, alloc, req = (_int_array(payload, key) for key in ("total", "alloc", "req"))
+    if alloc.ndim != 2 or alloc.shape != req.shape:
+        raise ValueError("alloc and req must be (n, m) matrices of the same shape")
+    if 0 in alloc.shape:
+        raise ValueError("a snapshot needs at least one process and one resource")
+    if total.shape != (alloc.shape[1],):
+        raise ValueError("total must be an (m,) vector")
+    if (total < 0).any() or (alloc < 0).any() or (req < 0).any():
+        raise ValueError("total, alloc and req must be non-negative")
+    if (alloc.sum(axis=0) > total).any():
+        raise ValueError("allocations exceed total capacity")
+    return total, alloc, req
+
+
+def detect_snapshots(snapshots, model=None):
+    """
+    Verdicts for a batch of (total, alloc, req) snapshots of any sizes.
+
+    Snapshots of the same (n, m) are stacked and go through reduce_batch,
+    and predict_states when a model is given, together.
+    returns one {"deadlock", "safe_sequence", "deadlocked", "probability"}
+    dict per snapshot, in order
+    """
+    groups = {}
+    for i, (_, alloc, _) in enumerate(snapshots):
+        groups.setdefault(alloc.shape, []).append(i)
+
+    results = [None] * len(snapshots)
+    for members in groups.values():
+        totals, allocs, reqs = (np.stack([snapshots[i][k] for i in members]) for k in range(3))
+        deadlocked, rounds = reduce_batch(totals, allocs, reqs)
+        proba = predict_states(model, totals, allocs, reqs)[1] if model is not None else None
+        for j, i in enumerate(members):
+            finished = np.flatnonzero(rounds[j] >= 0)
+            order = finished[np.argsort(rounds[j][finished], kind="stable")]
+            results[i] = {
+                "deadlock": bool(deadlocked[j]),
+                "safe_sequence": [f"P{p}" for p in order],
+                "deadlocked": [f"P{p}" for p in np.flatnonzero(rounds[j] < 0)],
+                "probability": float(proba[j]) if proba is not None else None,
+            }
+    return results
+
+
+class DetectionService:
+    """The HTTP front end: routes, backpressure and metrics around a MicroBatcher."""
+
+    def __init__(self, model=None, max_batch=256, max_wait=0.002, max_pending=4096):
+        self.timer = StageTimer()
+        self.batcher = MicroBatcher(
+            lambda items: detect_snapshots(items, model), max_batch, max_wait, max_pending, self.timer,
+        )
+        self.started = time.time()
+
+    def metrics(self):
+        counters = dict(self.timer.counters)
+        uptime = time.time() - self.started
+        return {
+            "uptime_s": uptime,
+            "pending": self.batcher.pending,
+            "counters": counters,
+            "throughput_rps": counters.get("ok", 0) / uptime if uptime else 0.0,
+            "mean_batch_size": counters.get("batched", 0) / max(counters.get("batches", 0), 1),
+            "latency": self.timer.percentiles(),
+        }
+
+    async def route(self, method, path, body):
+        """(status, payload) for one request."""
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, self.metrics()
+        if path != "/detect":
+            return HTTPStatus.NOT_FOUND, {"error": f"no route for {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+
+        self.timer.count("requests")
+        try:
+            snapshot = parse_snapshot(json.loads(body))
+        except (ValueError, TypeError, OverflowError) as exc:
+            self.timer.count("bad_request")
+            return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+        started = time.perf_counter()
+        try:
+            result = await self.batcher.submit(snapshot)
+        except asyncio.QueueFull:
+            self.timer.count("rejected")
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many pending requests, retry later"}
+        except Exception as exc:
+            # The whole batch failed in the handler; the connection stays usable.
+            self.timer.count("errors")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"detection failed: {exc}"}
+        self.timer.record("request", time.perf_counter() - started, started)
+        self.timer.count("ok")
+        return HTTPStatus.OK, result
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                # Without a usable length the body cannot be skipped, so these
+                # errors close the connection.
+                if length < 0:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.route(method, path.split("?", 1)[0], body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode("utf-8")
+                head = [
+                    f"HTTP/1.1 {status.value} {status.phrase}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(data)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    head.append("Retry-After: 1")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000, ready=None):
+        """Run until cancelled; ready, if given, is called with the bound port."""
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def load_model(path):
+    """A FlatForest from a .npz written by FlatForest.save, or a bundle from a registry key."""
+    if path.endswith(".npz"):
+        from deadlock_core.forest import FlatForest
+        return FlatForest.load(path)
+    from deadlock_core.registry import ModelRegistry
+    bundle = ModelRegistry().load(path)
+    if bundle is None:
+        raise ValueError(f"no model {path!r} in the model registry")
+    return bundle["forest"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", help="FlatForest .npz file or model registry key")
+    parser.add_argument("--max-batch", type=int, default=256, help="most snapshots per batch")
+    parser.add_argument("--max-wait", type=float, default=0.002, help="seconds a batch waits to fill up")
+    parser.add_argument("--max-pending", type=int, default=4096, help="queued snapshots before answering 503")
+    args = parser.parse_args(argv)
+
+    model = load_model(args.model) if args.model else None
+    service = DetectionService(model, args.max_batch, args.max_wait, args.max_pending)
+    try:
+        asyncio.run(service.serve(
+            args.host, args.port, ready=lambda port: print(f"listening on http://{args.host}:{port}", flush=True),
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+
+from deadlock_core.detection import _satisfied_range, reduce_demands
+
+
+def is_sparse(mat):
+    """True for scipy.sparse matrices and arrays (anything with tocsr)."""
+    return hasattr(mat, "tocsr")
+
+
+def _csr(mat):
+    """(indptr, indices, data) of mat as int64 CSR, without importing scipy for dense input."""
+    if is_sparse(mat):
+        mat = mat.tocsr()
+        mat.sum_duplicates()
+        return (mat.indptr.astype(np.int64), mat.indices.astype(np.int64), mat.data.astype(np.int64)), mat.shape
+    mat = np.asarray(mat, dtype=np.int64)
+    rows, cols = np.nonzero(mat)
+    indptr = np.zeros(mat.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=mat.shape[0]), out=indptr[1:])
+    return (indptr, cols.astype(np.int64), mat[rows, cols]), mat.shape
+
+
+def csr_release(indptr, cols, vals, m):
+    """
+    release callback for reduce_demands over allocations in CSR form: the
+    units held by the processes in ready, summed per resource.
+    """
+    def release(ready, finish):
+        idx = _satisfied_range(indptr[ready], indptr[ready + 1])
+        return np.bincount(cols[idx], weights=vals[idx], minlength=m).astype(np.int64)
+    return release
+
+
+def sparse_holt_reduction(total_vec, alloc, req):
+    """
+    holt_reduction for CSR/COO allocation and request matrices.
+
+    Only stored entries are ever touched: held units are a bincount over the
+    allocation's non-zeros, the demands are the request non-zeros the initial
+    work cannot cover, and finished processes release their CSR rows.
+    Memory and time scale with the non-zeros, not with n x m.
+
+    returns (order, finish, work) as holt_reduction
+    """
+    total_vec = np.asarray(total_vec, dtype=np.int64)
+    (a_ptr, a_cols, a_vals), shape = _csr(alloc)
+    (r_ptr, r_cols, r_vals), req_shape = _csr(req)
+    if len(shape) != 2 or shape != req_shape:
+        raise ValueError("alloc and req must be (n, m) matrices of the same shape")
+    if total_vec.shape != (shape[1],):
+        raise ValueError("total must be an (m,) vector")
+    return reduce_csr(total_vec, (a_ptr, a_cols, a_vals), (r_ptr, r_cols, r_vals))
+
+
+def reduce_csr(total_vec, alloc_csr, req_csr):
+    """sparse_holt_reduction on raw (indptr, indices, data) int64 triples, unchecked."""
+    a_ptr, a_cols, a_vals = alloc_csr
+    r_ptr, r_cols, r_vals = req_csr
+    n, m = r_ptr.shape[0] - 1, total_vec.shape[0]
+    work = total_vec - np.bincount(a_cols, weights=a_vals, minlength=m).astype(np.int64)
+    r_rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(r_ptr))
+    unmet = r_vals > work[r_cols]
+    return reduce_demands(
+        work, n, r_rows[unmet], r_cols[unmet], r_vals[unmet], csr_release(a_ptr, a_cols, a_vals, m)
+    )
+
+
+def load_sparse_state(source):
+    """
+    (total, alloc, req) with alloc and req as scipy CSR matrices.
+
+    source is a directory of total.npy/alloc.npy/req.npy, a dense .npz
+    snapshot (both read in row chunks through SnapshotReader), or an .npz
+    holding total, shape and COO triples alloc_row/alloc_col/alloc_val and
+    req_row/req_col/req_val.
+    """
+    import scipy.sparse as sp
+
+    from deadlock_core.streaming import SnapshotReader
+
+    if not (isinstance(source, (str, os.PathLike)) and os.path.isdir(source)):
+        with np.load(source, allow_pickle=False) as data:
+            if "alloc_row" in data.files:
+                shape = tuple(int(d) for d in data["shape"])
+                mats = [
+                    sp.csr_matrix((data[f"{k}_val"], (data[f"{k}_row"], data[f"{k}_col"])), shape=shape,
+                                  dtype=np.int64)
+                    for k in ("alloc", "req")
+                ]
+                return np.asarray(data["total"], dtype=np.int64), mats[0], mats[1]
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    with SnapshotReader(source) as snap:
+        mats = []
+        for key in ("alloc", "req"):
+            blocks = [sp.csr_matrix(block) for _, block in snap.rows(key)]
+            mats.append(sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix(snap.shape, dtype=np.int64))
+        return snap.total, mats[0], mats[1]
+
+
+def save_sparse_state(path, total, alloc, req):
+    """Write the COO .npz layout load_sparse_state reads."""
+    arrays = {"total": np.asarray(total, dtype=np.int64)}
+    for key, mat in (("alloc", alloc), ("req", req)):
+        coo = mat.tocoo() if is_sparse(mat) else None
+        if coo is None:
+            mat = np.asarray(mat)
+            rows, cols = np.nonzero(mat)
+            vals, shape = mat[rows, cols], mat.shape
+        else:
+            rows, cols, vals, shape = coo.row, coo.col, coo.data, coo.shape
+        arrays.update({f"{key}_row": rows, f"{key}_col": cols, f"{key}_val": vals})
+    arrays["shape"] = np.asarray(shape, dtype=np.int64)
+    np.savez_compressed(path, **arrays)
+
+
+def block_sums(mat, bins=(100, 100)):
+    """
+    Downsample an (n, m) dense or sparse matrix to at most bins cells by
+    summing blocks, for heatmaps of matrices far larger than the screen.
+    """
+    (indptr, cols, vals), (n, m) = _csr(mat)
+    rb, cb = -(-n // bins[0]) or 1, -(-m // bins[1]) or 1
+    out_shape = (-(-n // rb), -(-m // cb))
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+    flat = (rows // rb) * out_shape[1] + cols // cb
+    return np.bincount(flat, weights=vals, minlength=out_shape[0] * out_shape[1]).reshape(out_shape)
+
+
+# -------------------- single instance, bit-packed --------------------
+
+def pack_bits(mat):
+    """
+    Pack a 0/1 (n, m) matrix, dense or sparse, into (n, ceil(m / 64)) uint64
+    words; bit j of row i is column j.
+    """
+    if is_sparse(mat):
+        (indptr, cols, vals), (n, m) = _csr(mat)
+        if vals.size and (vals.min() < 0 or vals.max() > 1):
+            raise ValueError("single-instance matrices must contain only 0 or 1")
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        rows, cols = rows[vals == 1], cols[vals == 1]
+        packed = np.zeros((n, -(-m // 64)), dtype=np.uint64)
+        np.bitwise_or.at(packed, (rows, cols // 64), np.left_shift(np.uint64(1), (cols % 64).astype(np.uint64)))
+        return packed
+
+    mat = np.asarray(mat)
+    if mat.size and (mat.min() < 0 or mat.max() > 1):
+        raise ValueError("single-instance matrices must contain only 0 or 1")
+    n, m = mat.shape
+    packed = np.zeros((n, 8 * -(-m // 64)), dtype=np.uint8)
+    packed[:, :-(-m // 8)] = np.packbits(mat.astype(bool), axis=1, bitorder="little")
+    return packed.view("<u8").astype(np.uint64)
+
+
+def _set_bits(words):
+    """(rows, cols) of the set bits of pack_bits words, row by row, columns ascending."""
+    rows, w = np.nonzero(words)
+    bytes_ = words[rows, w].astype("<u8").view(np.uint8).reshape(-1, 8)
+    hit, bit = np.nonzero(np.unpackbits(bytes_, axis=1, bitorder="little"))
+    return rows[hit], w[hit] * 64 + bit
+
+
+def packed_single_instance_reduction(alloc_bits, req_bits, n_res):
+    """
+    Reduction of a single-instance state held as pack_bits words.
+
+    A resource is free when no process holds it, so the work vector is the
+    complement of the OR of all allocation rows. Every process keeps a count
+    of the requested resources that are not free, and the requests are
+    indexed by resource. When a round of processes finishes, the resources
+    they free are the new bits of the OR of their allocation rows, and only
+    the processes waiting on those resources are counted down and checked,
+    so the work is proportional to the set bits rather than rounds x n.
+
+    returns (order, finish, work) as holt_reduction, work as an (n_res,) 0/1 vector
+    """
+    n, words = alloc_bits.shape
+    valid = np.full(words, np.uint64(0xFFFFFFFFFFFFFFFF))
+    if n_res % 64:
+        valid[-1] = np.uint64((1 << (n_res % 64)) - 1)
+    held = np.bitwise_or.reduce(alloc_bits, axis=0) if n else np.zeros(words, dtype=np.uint64)
+    work = ~held & valid
+
+    rows, cols = _set_bits(req_bits)
+    _, held_cols = _set_bits(held[None])
+    waiting = np.isin(cols, held_cols)
+    rows, cols = rows[waiting], cols[waiting]
+    blocked = np.bincount(rows, minlength=n)
+    by_res = np.argsort(cols, kind="stable")
+    waiters = rows[by_res]
+    res_ptr = np.searchsorted(cols[by_res], np.arange(n_res + 1))
+
+    finish = np.zeros(n, dtype=bool)
+    rounds = []
+    ready = np.flatnonzero(blocked == 0)
+    while ready.size:
+        finish[ready] = True
+        rounds.append(ready)
+        freed = np.bitwise_or.reduce(alloc_bits[ready], axis=0) & ~work
+        work |= freed
+        _, freed = _set_bits(freed[None])
+        woken = waiters[_satisfied_range(res_ptr[freed], res_ptr[freed + 1])]
+        np.subtract.at(blocked, woken, 1)
+        woken = np.unique(woken)
+        ready = woken[(blocked[woken] == 0) & ~finish[woken]]
+
+    order = np.concatenate(rounds) if rounds else np.empty(0, dtype=np.int64)
+    bits = np.unpackbits(work.astype("<u8").view(np.uint8), bitorder="little")[:n_res]
+    return order, finish, bits.astype(np.int64)
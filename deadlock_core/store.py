@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from deadlock_core.dataset import _save_shard, _shard_paths, build_dataset
+from deadlock_core.generation import GENERATOR_VERSION
+from deadlock_core.registry import config_key
+
+DEFAULT_ROOT = os.environ.get(
+    "DEADLOCK_DATA_DIR", os.path.join(os.path.expanduser("~"), ".cache", "deadlock_core", "datasets")
+)
+SHARD_SIZE = 65_536
+# Rows are drawn in blocks this size, so a small dataset only costs a block.
+BLOCK_ROWS = 256
+
+# Bumped whenever the rows stored under a key change, so stale datasets are
+# regenerated rather than reused.
+STORE_VERSION = 3
+
+
+def _fill_shard(path, index, entropy, first_row, lo, hi, block_rows, n_proc, n_res):
+    """
+    Grow shard index from lo to hi rows; first_row is the dataset row of its row 0.
+
+    Only the lo rows meta.json vouches for are kept from the shard on disk: an
+    extend that crashed after renaming one array but not the other, or before
+    updating meta.json, leaves rows past lo that are dropped here.
+    """
+    xs, ys = [], []
+    if lo:
+        x_path, y_path = _shard_paths(path, index)
+        xs.append(np.load(x_path, mmap_mode="r")[:lo])
+        ys.append(np.load(y_path, mmap_mode="r")[:lo])
+    for b in range((first_row + lo) // block_rows, (first_row + hi) // block_rows):
+        seed_seq = np.random.SeedSequence(entropy, spawn_key=(b,))
+        X, y = build_dataset(block_rows, n_proc, n_res, rng=np.random.default_rng(seed_seq))
+        xs.append(X)
+        ys.append(y)
+    X, y = np.concatenate(xs), np.concatenate(ys)
+    # Let go of the old shard's memory maps before it is replaced.
+    del xs, ys
+    return _save_shard(path, index, X, y)
+
+
+class StoredDataset:
+    """
+    One labeled dataset on disk: shards of flattened states and labels.
+
+    Rows are generated in blocks of block_rows, block b always from the b-th
+    child of SeedSequence([seed, split id]), and stored shard_size rows to a
+    shard, the last one possibly partial. So growing the dataset appends
+    blocks and never changes existing rows, the first N rows are the same no
+    matter how the dataset was grown, a small dataset only writes the blocks
+    it uses, and the train and eval splits of one seed draw different rows.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self._meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.meta = dict(params, n_rows=0)
+            self._write_meta()
+
+    @property
+    def n_samples(self):
+        return self.meta["n_rows"]
+
+    @property
+    def entropy(self):
+        """Seed entropy of the row blocks: the seed plus a stable id of the split."""
+        return [self.params["seed"], int(config_key(self.params["split"])[:16], 16)]
+
+    def _write_meta(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.meta, f, sort_keys=True, indent=2)
+        os.replace(tmp_path, self._meta_path)
+
+    def extend(self, n_samples, n_workers=1):
+        """Generate whole blocks until at least n_samples rows are stored."""
+        shard_size, block_rows = self.params["shard_size"], self.params["block_rows"]
+        have = self.meta["n_rows"]
+        want = -(-n_samples // block_rows) * block_rows
+        if want <= have:
+            return self
+        jobs = [
+            (self.path, k, self.entropy, k * shard_size, max(have - k * shard_size, 0),
+             min(want - k * shard_size, shard_size), block_rows, self.params["n_proc"], self.params["n_res"])
+            for k in range(have // shard_size, -(-want // shard_size))
+        ]
+        if n_workers == 1 or len(jobs) <= 1:
+            for job in jobs:
+                _fill_shard(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as pool:
+                for future in [pool.submit(_fill_shard, *job) for job in jobs]:
+                    future.result()
+        self.meta["n_rows"] = want
+        self._write_meta()
+        return self
+
+    def slice(self, start, stop):
+        """Rows [start, stop) as in-memory (X, y), reading only the shards they span."""
+        shard_size = self.params["shard_size"]
+        stop = min(stop, self.n_samples)
+        xs, ys = [], []
+        for k in range(start // shard_size, -(-stop // shard_size)):
+            x_path, y_path = _shard_paths(self.path, k)
+            lo = max(start - k * shard_size, 0)
+            hi = min(stop - k * shard_size, shard_size)
+            xs.append(np.load(x_path, mmap_mode="r")[lo:hi])
+            ys.append(np.load(y_path, mmap_mode="r")[lo:hi])
+        if not xs:
+            width = self.params["n_res"] * (1 + 2 * self.params["n_proc"])
+            return np.empty((0, width), dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def iter_batches(self, batch_rows, stop=None):
+        """Yield consecutive (X, y) batches, for data sets that do not fit in RAM."""
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        for start in range(0, stop, batch_rows):
+            yield self.slice(start, min(start + batch_rows, stop))
+
+    def load(self, n_samples, n_workers=1):
+        """The first n_samples rows, generating missing shards first."""
+        self.extend(n_samples, n_workers=n_workers)
+        return self.slice(0, n_samples)
+
+
+class DatasetStore:
+    """
+    Directory of StoredDatasets, one per (split, n_proc, n_res, seed, generator) key.
+
+    Each dataset lives in <root>/<key>/ with its shards and a meta.json that
+    doubles as the index entry.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def open(self, n_proc, n_res, seed, split="train", shard_size=SHARD_SIZE):
+        params = {
+            "split": split,
+            "n_proc": int(n_proc),
+            "n_res": int(n_res),
+            "seed": int(seed),
+            "generator_version": GENERATOR_VERSION,
+            "shard_size": int(shard_size),
+            "block_rows": BLOCK_ROWS,
+            "store_version": STORE_VERSION,
+        }
+        if params["shard_size"] % BLOCK_ROWS:
+            raise ValueError(f"shard_size must be a multiple of {BLOCK_ROWS}")
+        return StoredDataset(os.path.join(self.root, config_key(params)), params)
+
+    def index(self):
+        """meta.json contents of every stored dataset."""
+        out = []
+        for name in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, name, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    out.append(dict(json.load(f), key=name))
+        return out
@@ -0,0 +1,246 @@
+import csv
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from deadlock_core.detection import reduce_demands
+from deadlock_core.incremental import IncrementalDetector
+from deadlock_core.sparse import csr_release
+
+EVENT_OPS = ("allocate", "release", "request")
+
+
+def _source_name(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, "name", "")
+
+
+def _open_text(source):
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline="", encoding="utf-8")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, newline="", encoding="utf-8")
+
+
+def _event_int(value, field):
+    # int() would truncate 1.5 and accept True; only whole numbers get through.
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"event {field} must be an integer, got {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"event {field} must be an integer, got {value!r}") from None
+
+
+def _parse_event(op, process, resource, amount):
+    if op not in EVENT_OPS:
+        raise ValueError(f"unknown event op {op!r}, expected one of {EVENT_OPS}")
+    process = _event_int(process, "process")
+    resource = _event_int(resource, "resource")
+    amount = _event_int(amount, "amount") if amount not in (None, "") else 1
+    if process < 0 or resource < 0:
+        raise ValueError(f"event ids must be non-negative, got process {process}, resource {resource}")
+    if amount <= 0:
+        raise ValueError(f"event amount must be positive, got {amount}")
+    return op, process, resource, amount
+
+
+def read_event_log(source, fmt=None, chunk_size=65536):
+    """
+    Stream an allocate/release/request event log in chunks.
+
+    source : path or file object. CSV needs an op,process,resource[,amount]
+             header; JSONL has one {"op", "process", "resource", "amount"}
+             object per line. amount defaults to 1.
+    fmt    : "csv" or "jsonl"; guessed from the file name when omitted
+    yields lists of at most chunk_size (op, process, resource, amount) tuples
+    """
+    if fmt is None:
+        fmt = "jsonl" if _source_name(source).lower().endswith((".jsonl", ".ndjson")) else "csv"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"unsupported event log format {fmt!r}")
+
+    f = _open_text(source)
+    try:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = [h.strip() for h in next(reader, [])]
+            try:
+                idx = [header.index(col) for col in ("op", "process", "resource")]
+            except ValueError:
+                raise ValueError("CSV event log needs an op,process,resource[,amount] header") from None
+            amount_idx = header.index("amount") if "amount" in header else None
+            records = (
+                (row[idx[0]].strip(), row[idx[1]], row[idx[2]],
+                 row[amount_idx] if amount_idx is not None else None)
+                for row in reader if row
+            )
+        else:
+            records = (
+                (obj["op"], obj["process"], obj["resource"], obj.get("amount"))
+                for obj in (json.loads(line) for line in f if line.strip())
+            )
+
+        chunk = []
+        for record in records:
+            chunk.append(_parse_event(*record))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        if f is not source:
+            f.close()
+
+
+def replay_events(chunks, total, report_every=10_000):
+    """
+    Feed event chunks through an IncrementalDetector.
+
+    yields (events_seen, is_deadlock, deadlocked_count) every report_every
+    events and once more after the last event
+    """
+    detector = IncrementalDetector(total)
+    handlers = {
+        "allocate": detector.allocate,
+        "release": detector.release,
+        "request": detector.request,
+    }
+    seen = 0
+    for chunk in chunks:
+        for op, p, r, k in chunk:
+            verdict = handlers[op](p, r, k)
+            seen += 1
+            if seen % report_every == 0:
+                yield seen, verdict, len(detector.deadlocked)
+    if seen % report_every or seen == 0:
+        yield seen, detector.is_deadlock, len(detector.deadlocked)
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+def _npz_member_rows(archive, key, chunk_rows):
+    with archive.open(f"{key}.npy") as f:
+        shape, fortran_order, dtype = _read_npy_header(f)
+        if fortran_order:
+            raise ValueError(f"{key} must be stored in C order to be streamed")
+        row_items = int(np.prod(shape[1:], dtype=np.int64))
+        for start in range(0, shape[0], chunk_rows):
+            rows = min(chunk_rows, shape[0] - start)
+            buf = f.read(rows * row_items * dtype.itemsize)
+            yield np.frombuffer(buf, dtype=dtype).reshape((rows,) + tuple(shape[1:]))
+
+
+class SnapshotReader:
+    """
+    Row-chunked access to a (total, alloc, req) snapshot on disk.
+
+    source is either a directory holding total.npy, alloc.npy and req.npy,
+    which are memory-mapped, or an .npz archive (path or file object) whose
+    members are streamed from the zip without loading them whole.
+    """
+
+    def __init__(self, source, chunk_rows=4096):
+        self.chunk_rows = chunk_rows
+        self._dir = None
+        self._archive = None
+        if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+            self._dir = os.fspath(source)
+            if not all(os.path.exists(os.path.join(self._dir, f"{key}.npy")) for key in ("total", "alloc", "req")):
+                raise ValueError("snapshot directory needs total.npy, alloc.npy and req.npy")
+            self.total = np.load(os.path.join(self._dir, "total.npy"))
+            self.shape = np.load(os.path.join(self._dir, "alloc.npy"), mmap_mode="r").shape
+            req_shape = np.load(os.path.join(self._dir, "req.npy"), mmap_mode="r").shape
+        else:
+            try:
+                self._archive = zipfile.ZipFile(source)
+            except zipfile.BadZipFile:
+                raise ValueError("snapshot is not a valid .npz archive") from None
+            if not {"total.npy", "alloc.npy", "req.npy"} <= set(self._archive.namelist()):
+                self._archive.close()
+                raise ValueError("snapshot archive needs total, alloc and req arrays")
+            self.total = np.concatenate(list(_npz_member_rows(self._archive, "total", chunk_rows)))
+            with self._archive.open("alloc.npy") as f:
+                self.shape = _read_npy_header(f)[0]
+            with self._archive.open("req.npy") as f:
+                req_shape = _read_npy_header(f)[0]
+        self.total = np.asarray(self.total, dtype=np.int64)
+        if len(self.shape) != 2 or req_shape != self.shape or self.total.shape != (self.shape[1],):
+            raise ValueError("snapshot needs total (m,), alloc (n,m) and req (n,m)")
+
+    def rows(self, key):
+        """Yield (start, block) row chunks of alloc or req."""
+        if self._dir is not None:
+            mat = np.load(os.path.join(self._dir, f"{key}.npy"), mmap_mode="r")
+            blocks = (mat[i:i + self.chunk_rows] for i in range(0, mat.shape[0], self.chunk_rows))
+        else:
+            blocks = _npz_member_rows(self._archive, key, self.chunk_rows)
+        start = 0
+        for block in blocks:
+            yield start, np.asarray(block, dtype=np.int64)
+            start += block.shape[0]
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def reduce_snapshot(source, chunk_rows=4096):
+    """
+    Holt reduction of an on-disk snapshot in two streaming passes.
+
+    The first pass sums alloc and keeps its non-zero entries in CSR form; the
+    second keeps only the req entries the initial work cannot cover. Memory is
+    proportional to those non-zeros, never to the dense n x m matrices.
+
+    returns (order, finish, work) as holt_reduction
+    """
+    with SnapshotReader(source, chunk_rows) as snap:
+        n, m = snap.shape
+        held = np.zeros(m, dtype=np.int64)
+        counts = np.zeros(n, dtype=np.int64)
+        alloc_cols, alloc_vals = [], []
+        for start, block in snap.rows("alloc"):
+            held += block.sum(axis=0)
+            r, c = np.nonzero(block)
+            counts[start:start + block.shape[0]] = np.bincount(r, minlength=block.shape[0])
+            alloc_cols.append(c)
+            alloc_vals.append(block[r, c])
+        work = snap.total - held
+
+        rows, cols, demand = [], [], []
+        for start, block in snap.rows("req"):
+            r, c = np.nonzero(block > work)
+            rows.append(r + start)
+            cols.append(c)
+            demand.append(block[r, c])
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    alloc_cols = np.concatenate(alloc_cols) if alloc_cols else np.empty(0, dtype=np.int64)
+    alloc_vals = np.concatenate(alloc_vals) if alloc_vals else np.empty(0, dtype=np.int64)
+
+    return reduce_demands(
+        work, n,
+        np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+        np.concatenate(cols) if cols else np.empty(0, dtype=np.int64),
+        np.concatenate(demand) if demand else np.empty(0, dtype=np.int64),
+        csr_release(indptr, alloc_cols, alloc_vals, m),
+    )
@@ -0,0 +1,90 @@
+import contextlib
+import csv
+import io
+import json
+import time
+from collections import deque
+
+_DISABLED = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start, self.start)
+
+
+class StageTimer:
+    """
+    Wall-clock timers and counters around named pipeline stages.
+
+    with timer.stage("detect"): ...  records one sample per run. A disabled
+    timer hands out one shared no-op context manager and keeps nothing, so
+    instrumented code costs a method call and an attribute check.
+
+    The last max_traces samples are kept as (stage, started_at, seconds)
+    traces, shared by all stages, and percentiles are computed over them.
+    """
+
+    def __init__(self, enabled=True, max_traces=10_000):
+        self.enabled = enabled
+        self.traces = deque(maxlen=max_traces)
+        self.counters = {}
+        # perf_counter has no fixed epoch; anchor it to wall-clock time once
+        # so exported traces carry real timestamps.
+        self._epoch = time.time() - time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name)
+
+    def record(self, name, seconds, started=None):
+        if self.enabled:
+            started = time.perf_counter() - seconds if started is None else started
+            self.traces.append((name, self._epoch + started, seconds))
+
+    def count(self, name, k=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + k
+
+    def clear(self):
+        self.traces.clear()
+        self.counters.clear()
+
+    def percentiles(self, q=(50, 90, 99)):
+        """{stage: {"count", "mean_ms", "p<q>_ms"...}} over the kept traces, stages in first-seen order."""
+        import numpy as np
+
+        samples = {}
+        for name, _, seconds in self.traces:
+            samples.setdefault(name, []).append(seconds)
+        out = {}
+        for name, values in samples.items():
+            ms = np.asarray(values) * 1e3
+            row = {"count": len(values), "mean_ms": float(ms.mean())}
+            row.update({f"p{p}_ms": float(v) for p, v in zip(q, np.percentile(ms, q))})
+            out[name] = row
+        return out
+
+    def export(self, fmt="json"):
+        """Traces (and counters, for JSON) as a str in "json" or "csv" format."""
+        rows = [{"stage": name, "started_at": started, "seconds": seconds} for name, started, seconds in self.traces]
+        if fmt == "json":
+            return json.dumps({"traces": rows, "counters": self.counters}, indent=2)
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=["stage", "started_at", "seconds"])
+            writer.writeheader()
+            writer.writerows(rows)
+            return buf.getvalue()
+        raise ValueError(f"unsupported trace format {fmt!r}")
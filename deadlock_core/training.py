@@ -0,0 +1,171 @@
+import copy
+import time
+
+import numpy as np
+
+from deadlock_core.features import FEATURE_NAMES, extract_features, unflatten_states
+from deadlock_core.forest import FlatForest
+from deadlock_core.generation import GENERATOR_VERSION
+from deadlock_core.registry import config_key
+from deadlock_core.store import SHARD_SIZE, STORE_VERSION, DatasetStore
+
+# Bumped whenever extract_features changes meaning, so cached models retrain.
+FEATURE_VERSION = 1
+
+# Bumped whenever the bundle train_random_forest returns gains or changes a key.
+BUNDLE_VERSION = 2
+
+# System sizes the simulator offers; one model is trained across all of them.
+DEFAULT_SIZES = tuple((p, r) for p in (2, 3, 5, 10) for r in (1, 3, 6, 10))
+
+
+def training_config(n_samples, sizes=DEFAULT_SIZES, seed=42, n_estimators=100, test_size=0.2):
+    """Everything that determines a trained model, as a JSON-serialisable dict."""
+    return {
+        "n_samples": int(n_samples),
+        "sizes": [[int(p), int(r)] for p, r in sizes],
+        "seed": int(seed),
+        "n_estimators": int(n_estimators),
+        "test_size": float(test_size),
+        "generator_version": GENERATOR_VERSION,
+        "feature_version": FEATURE_VERSION,
+        "bundle_version": BUNDLE_VERSION,
+        "shard_size": SHARD_SIZE,
+        "store_version": STORE_VERSION,
+    }
+
+
+def load_features(config, n_total, split="train", store=None, start=0):
+    """
+    Size-agnostic features and labels drawn evenly from every size in config.
+
+    start   : rows already used; only rows past it are returned, so a model
+              grown from n to n' samples sees exactly the n' - n new ones
+    returns (F, y): (N, len(FEATURE_NAMES)) float32 features, (N,) labels,
+    with N about n_total - start
+    """
+    store = store or DatasetStore()
+    sizes = config["sizes"]
+    lo = -(-int(start) // len(sizes))
+    hi = -(-int(n_total) // len(sizes))
+    features, labels = [], []
+    for n_proc, n_res in sizes:
+        dataset = store.open(n_proc, n_res, config["seed"], split=split, shard_size=config["shard_size"])
+        X, y = dataset.extend(hi).slice(lo, hi)
+        features.append(extract_features(*unflatten_states(X, n_proc, n_res)))
+        labels.append(y)
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def train_random_forest(config, store=None):
+    """
+    Fit a RandomForestClassifier on size-agnostic features of the stored
+    training datasets for config, generating rows only if they are missing.
+
+    returns a bundle dict: model, forest (the model as a FlatForest), accuracy,
+    confusion, n_samples, feature_names
+    """
+    # scikit-learn is only needed once a model is actually trained.
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, confusion_matrix
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_features(config, config["n_samples"], store=store)
+    # Stratifying needs two members of each class; skewed sizes can lack them.
+    stratify = y if np.bincount(y, minlength=2).min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=config["test_size"], random_state=config["seed"], stratify=stratify
+    )
+    model = RandomForestClassifier(n_estimators=config["n_estimators"], random_state=config["seed"], n_jobs=-1)
+    model.fit(X_train, y_train)
+    # Predict on one thread so probabilities are summed in tree order.
+    model.set_params(n_jobs=None)
+
+    y_pred = model.predict(X_test)
+    return {
+        "model": model,
+        "forest": FlatForest.from_sklearn(model),
+        "accuracy": accuracy_score(y_test, y_pred),
+        "confusion": confusion_matrix(y_test, y_pred, labels=[0, 1]),
+        "n_samples": len(X),
+        "feature_names": list(FEATURE_NAMES),
+    }
+
+
+def growth_config(n_samples, sizes=DEFAULT_SIZES, seed=42, batch_trees=25, max_trees=500, tol=1e-3, base=None):
+    """
+    Config of a forest grown with warm_start; base is the growth_config of the
+    forest it grows from, or None to start from no trees.
+    """
+    if base is not None and (base.get("mode") != "grow" or base["n_samples"] >= n_samples):
+        raise ValueError("base must be a smaller growth_config")
+    config = training_config(n_samples, sizes=sizes, seed=seed)
+    del config["n_estimators"], config["test_size"]
+    config.update({
+        "mode": "grow",
+        "batch_trees": int(batch_trees),
+        "max_trees": int(max_trees),
+        "tol": float(tol),
+        "grown_from": config_key(base) if base is not None else None,
+        "rows_seen": base["n_samples"] if base is not None else 0,
+    })
+    return config
+
+
+def grow_random_forest(config, base_bundle=None, store=None):
+    """
+    Add trees to base_bundle's forest, fitting them on the rows the base has
+    not seen yet, until the out-of-bag score gains less than config["tol"]
+    per batch of trees or max_trees is reached. Trees are fit on all cores.
+
+    Old trees are never refit, so growing from n to n' samples costs time
+    proportional to n' - n. OOB is measured on the new rows only, which the
+    old trees never saw.
+
+    returns a bundle dict as train_random_forest, with accuracy and confusion
+    taken out of bag, plus fit_seconds, oob_score and n_trees
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import confusion_matrix
+
+    if (base_bundle is None) != (config["grown_from"] is None):
+        raise ValueError("base_bundle must be given exactly when config has grown_from")
+    X, y = load_features(config, config["n_samples"], store=store, start=config["rows_seen"])
+    if base_bundle is None:
+        model = RandomForestClassifier(n_estimators=0, random_state=config["seed"], oob_score=True)
+    else:
+        # Never grow the caller's model in place: it may be shared or cached.
+        model = copy.deepcopy(base_bundle["model"])
+    model.set_params(warm_start=True, oob_score=True, n_jobs=-1)
+
+    start = time.perf_counter()
+    previous = None
+    while model.n_estimators < config["max_trees"]:
+        model.set_params(n_estimators=min(model.n_estimators + config["batch_trees"], config["max_trees"]))
+        model.fit(X, y)
+        if previous is not None and model.oob_score_ - previous < config["tol"]:
+            break
+        previous = model.oob_score_
+    fit_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=None)
+
+    oob_proba = model.oob_decision_function_
+    scored = ~np.isnan(oob_proba).any(axis=1)
+    oob_pred = model.classes_[np.argmax(oob_proba[scored], axis=1)]
+    return {
+        "model": model,
+        "forest": FlatForest.from_sklearn(model),
+        "accuracy": model.oob_score_,
+        "confusion": confusion_matrix(y[scored], oob_pred, labels=[0, 1]),
+        "n_samples": config["n_samples"],
+        "feature_names": list(FEATURE_NAMES),
+        "fit_seconds": fit_seconds,
+        "oob_score": model.oob_score_,
+        "n_trees": len(model.estimators_),
+    }
+
+
+def evaluate_on_store(model, config, n_eval=2000, store=None):
+    """Accuracy of model on about n_eval rows of the held-out evaluation split, spread over every size."""
+    X, y = load_features(config, n_eval, split="eval", store=store)
+    return float((model.predict(X) == y).mean())
@@ -0,0 +1,17 @@
+"""
+Process-wide resources shared by the page scripts.
+
+st.cache_resource keys on the function that defines a resource, so anything
+two pages must share is defined once here and imported by both.
+"""
+
+import streamlit as st
+
+from deadlock_core import VerdictCache
+from deadlock_core.cache import DEFAULT_VERDICT_PATH
+
+
+@st.cache_resource(show_spinner=False)
+def get_verdict_cache():
+    """The one VerdictCache of this process, persisted at DEFAULT_VERDICT_PATH."""
+    return VerdictCache(path=DEFAULT_VERDICT_PATH)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from deadlock_core.avoidance import AdmissionController
+from deadlock_core.detection import holt_reduction
+
+
+def _safe(total, alloc, need):
+    return bool(holt_reduction(total, alloc, need)[1].all())
+
+
+def _assert_safe_order(order, available, alloc, need):
+    assert sorted(order.tolist()) == list(range(len(alloc)))
+    work = available.copy()
+    for p in order:
+        assert (need[p] <= work).all()
+        work += alloc[p]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_decisions_match_grant_then_check(seed):
+    rng = np.random.default_rng(seed)
+    # Up to a few hundred processes, so the certificate spans several blocks.
+    n, m = int(rng.integers(1, 300)), int(rng.integers(1, 6))
+    need = rng.integers(0, 4, (n, m))
+    # Barely more than the largest need, so grants are often refused.
+    total = need.max(axis=0) + rng.integers(1, 4, m)
+    alloc = np.zeros((n, m), dtype=np.int64)
+    ctl = AdmissionController(total, alloc, need)
+
+    for _ in range(300):
+        p, op = int(rng.integers(n)), rng.random()
+        if op < 0.6:
+            units = (rng.random(m) * (need[p] + 1)).astype(np.int64)
+            alloc[p] += units
+            need[p] -= units
+            expected = bool((alloc.sum(axis=0) <= total).all()) and _safe(total, alloc, need)
+            if not expected:
+                alloc[p] -= units
+                need[p] += units
+            assert ctl.can_grant(p, units) == expected
+            assert ctl.evaluate([p, p], [units, units]).tolist() == [expected, expected]
+            assert ctl.request(p, units) == expected
+        elif op < 0.75:
+            units = (rng.random(m) * (alloc[p] + 1)).astype(np.int64)
+            ctl.release(p, units)
+            alloc[p] -= units
+        elif op < 0.85:
+            ctl.finish(p)
+            alloc[p] = 0
+            need[p] = 0
+        else:
+            units = rng.integers(0, 3, m)
+            need[p] += units
+            expected = _safe(total, alloc, need)
+            if not expected:
+                need[p] -= units
+            assert ctl.claim(p, units) == expected
+
+        assert np.array_equal(ctl.available, total - alloc.sum(axis=0))
+        _assert_safe_order(ctl.safe_sequence, ctl.available, alloc, need)
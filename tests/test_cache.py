@@ -0,0 +1,62 @@
+import numpy as np
+
+from deadlock_core.cache import VerdictCache, canonical_state
+from deadlock_core.detection import bankers_deadlock
+from deadlock_core.generation import generate_states
+
+
+def _states(count, seed):
+    totals, allocs, reqs = generate_states(count, 6, 3, rng=seed)
+    return list(zip(totals, allocs, reqs))
+
+
+def _assert_safe_order(safe_seq, total, alloc, req):
+    work = total - alloc.sum(axis=0)
+    for p in (int(name[1:]) for name in safe_seq):
+        assert (req[p] <= work).all()
+        work = work + alloc[p]
+
+
+def test_permuted_copies_share_one_entry():
+    rng = np.random.default_rng(0)
+    cache = VerdictCache()
+    for total, alloc, req in _states(20, 1):
+        perm = rng.permutation(len(alloc))
+        assert canonical_state(total, alloc, req)[0] == canonical_state(total, alloc[perm], req[perm])[0]
+        cache.bankers_deadlock(total, alloc, req)
+        cache.bankers_deadlock(total, alloc[perm], req[perm])
+    assert len(cache) == 20
+    assert cache.counters["verdict_hits"] == 20 and cache.counters["verdict_misses"] == 20
+
+
+def test_hits_answer_in_the_callers_process_ids():
+    rng = np.random.default_rng(2)
+    cache = VerdictCache()
+    for total, alloc, req in _states(200, 3):
+        cache.bankers_deadlock(total, alloc, req)
+        perm = rng.permutation(len(alloc))
+        alloc, req = alloc[perm], req[perm]
+        is_dead, safe_seq, deadlocked, work = cache.bankers_deadlock(total, alloc, req)
+        expected = bankers_deadlock(total, alloc, req)
+        assert is_dead == expected[0]
+        assert deadlocked == expected[2]
+        assert sorted(safe_seq) == sorted(expected[1])
+        _assert_safe_order(safe_seq, total, alloc, req)
+        assert np.array_equal(work, expected[3])
+    assert cache.counters["verdict_hits"] == 200
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "verdicts.json")
+    states = _states(30, 4)
+    cache = VerdictCache(path=path)
+    before = [cache.bankers_deadlock(*state) for state in states]
+    cache.save()
+
+    loaded = VerdictCache(path=path)
+    assert len(loaded) == 30
+    for state, (is_dead, safe_seq, deadlocked, work) in zip(states, before):
+        again = loaded.bankers_deadlock(*state)
+        assert again[:3] == (is_dead, safe_seq, deadlocked)
+        assert np.array_equal(again[3], work)
+    assert loaded.counters["verdict_hits"] == 30 and loaded.counters["verdict_misses"] == 0
@@ -0,0 +1,15 @@
+import numpy as np
+
+from deadlock_core.dataset import build_dataset_parallel, load_dataset_shards
+
+
+def test_parallel_dataset_does_not_depend_on_worker_count(tmp_path):
+    kwargs = dict(n_samples=2500, n_proc=4, n_res=3, seed=11, shard_size=600)
+    serial = build_dataset_parallel(str(tmp_path / "serial"), n_workers=1, **kwargs)
+    pooled = build_dataset_parallel(str(tmp_path / "pooled"), n_workers=3, **kwargs)
+    assert len(serial) == len(pooled) == 5
+    X_serial, y_serial = load_dataset_shards(serial)
+    X_pooled, y_pooled = load_dataset_shards(pooled)
+    assert X_serial.shape == (2500, 3 * (1 + 2 * 4)) and y_serial.shape == (2500,)
+    assert X_serial.dtype == X_pooled.dtype and y_serial.dtype == y_pooled.dtype
+    assert np.array_equal(X_serial, X_pooled) and np.array_equal(y_serial, y_pooled)
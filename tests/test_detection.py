@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from deadlock_core.detection import (
+    bankers_deadlock, detect_deadlock_batch, holt_reduction, reduce_batch, scan_reduction,
+)
+from deadlock_core.generation import generate_states
+from deadlock_core.partition import partitioned_deadlock, partitioned_reduction
+from deadlock_core.distributed import random_wait_for_state
+from deadlock_core.sparse import (
+    load_sparse_state, pack_bits, packed_single_instance_reduction, save_sparse_state, sparse_holt_reduction,
+)
+from deadlock_core.streaming import reduce_snapshot
+
+
+def _scan(total_vec, alloc_mat, req_mat):
+    """The original while-changed safety scan, as the reference; returns (finish, work, order)."""
+    n = alloc_mat.shape[0]
+    work = total_vec - alloc_mat.sum(axis=0)
+    finish = np.zeros(n, dtype=bool)
+    order = []
+    changed = True
+    while changed:
+        changed = False
+        for i in range(n):
+            if not finish[i] and np.all(req_mat[i] <= work):
+                work = work + alloc_mat[i]
+                finish[i] = True
+                order.append(i)
+                changed = True
+    return finish, work, order
+
+
+def _assert_safe_order(order, total_vec, alloc_mat, req_mat):
+    work = total_vec - alloc_mat.sum(axis=0)
+    for p in order:
+        assert (req_mat[p] <= work).all()
+        work = work + alloc_mat[p]
+
+
+def _sparse_states(count, rng):
+    """Sparse states with several independent components and tight capacities."""
+    for _ in range(count):
+        n, m = rng.integers(1, 40), rng.integers(1, 40)
+        alloc = rng.integers(0, 3, (n, m)) * (rng.random((n, m)) < 0.1)
+        req = rng.integers(0, 4, (n, m)) * (rng.random((n, m)) < 0.1)
+        total = alloc.sum(axis=0) + rng.integers(0, 2, m)
+        yield total, alloc, req
+
+
+def _states(rng):
+    totals, allocs, reqs = generate_states(200, 6, 4, rng=rng)
+    yield from zip(totals, allocs, reqs)
+    yield from _sparse_states(200, rng)
+
+
+def test_bankers_deadlock_matches_scan():
+    for total, alloc, req in _states(np.random.default_rng(0)):
+        finish, work, order = _scan(total, alloc, req)
+        is_dead, safe_seq, deadlocked, final = bankers_deadlock(total, alloc, req)
+        assert is_dead == (not finish.all())
+        assert deadlocked == [f"P{i}" for i in np.flatnonzero(~finish)]
+        assert np.array_equal(final, work)
+        assert safe_seq == [f"P{i}" for i in order]
+
+
+def test_bankers_deadlock_keeps_scan_order_across_passes():
+    # P0 and P2 both fit once P1 has finished. The scan takes P2 later in the
+    # same pass and P0 on the next one; reduction rounds would put P0 first.
+    total = np.array([3, 1])
+    alloc = np.array([[1, 0], [1, 0], [0, 1]])
+    req = np.array([[2, 0], [1, 0], [2, 0]])
+    assert bankers_deadlock(total, alloc, req)[1] == ["P1", "P2", "P0"]
+
+
+@pytest.mark.parametrize("m", [4, 20])
+def test_detect_deadlock_batch_matches_scan(m):
+    # m <= 16 reduces with states on the last axis, larger m with states first.
+    totals, allocs, reqs = generate_states(500, 7, m, rng=m)
+    mask, finish = detect_deadlock_batch(totals, allocs, reqs, chunk_size=128)
+    _, rounds = reduce_batch(totals, allocs, reqs)
+    for b in range(len(totals)):
+        expected, _, _ = _scan(totals[b], allocs[b], reqs[b])
+        assert np.array_equal(finish[b], expected)
+        assert mask[b] == (not expected.all())
+        finished = np.flatnonzero(rounds[b] >= 0)
+        _assert_safe_order(finished[np.argsort(rounds[b][finished], kind="stable")], totals[b], allocs[b], reqs[b])
+
+
+def test_sparse_and_partitioned_match_scan():
+    import scipy.sparse as sp
+
+    for total, alloc, req in _sparse_states(200, np.random.default_rng(1)):
+        expected, work, scan_order = _scan(total, alloc, req)
+        for reduce in (holt_reduction, sparse_holt_reduction):
+            order, finish, final = reduce(total, sp.csr_matrix(alloc), sp.csr_matrix(req))
+            assert np.array_equal(finish, expected) and np.array_equal(final, work)
+            _assert_safe_order(order, total, alloc, req)
+        order, finish, final = scan_reduction(total, sp.csr_matrix(alloc), sp.csr_matrix(req))
+        assert order.tolist() == scan_order and np.array_equal(final, work)
+        order, finish, final = partitioned_reduction(total, alloc, req, n_workers=1)
+        assert np.array_equal(finish, expected) and np.array_equal(final, work)
+        _assert_safe_order(order, total, alloc, req)
+
+
+def test_partitioned_pool_matches_scan():
+    rng = np.random.default_rng(2)
+    # Block-diagonal state: four components big enough for the process pool.
+    blocks = list(_sparse_states(4, rng))
+    total = np.concatenate([b[0] for b in blocks])
+    alloc = np.zeros((sum(len(b[1]) for b in blocks), total.size), dtype=np.int64)
+    req = np.zeros_like(alloc)
+    r0 = c0 = 0
+    for t, a, q in blocks:
+        alloc[r0:r0 + len(a), c0:c0 + t.size] = a
+        req[r0:r0 + len(a), c0:c0 + t.size] = q
+        r0, c0 = r0 + len(a), c0 + t.size
+    expected, work, _ = _scan(total, alloc, req)
+    is_dead, safe_seq, deadlocked, final = partitioned_deadlock(total, alloc, req, n_workers=2, min_parallel_nnz=1)
+    assert is_dead == (not expected.all())
+    assert deadlocked == [f"P{i}" for i in np.flatnonzero(~expected)]
+    assert np.array_equal(final, work)
+    _assert_safe_order([int(p[1:]) for p in safe_seq], total, alloc, req)
+
+
+def test_snapshots_on_disk_match_scan(tmp_path):
+    for k, (total, alloc, req) in enumerate(_sparse_states(20, np.random.default_rng(3))):
+        expected, work, _ = _scan(total, alloc, req)
+        directory = tmp_path / f"dir{k}"
+        directory.mkdir()
+        for name, arr in (("total", total), ("alloc", alloc), ("req", req)):
+            np.save(directory / f"{name}.npy", arr)
+        archive = tmp_path / f"dense{k}.npz"
+        np.savez(archive, total=total, alloc=alloc, req=req)
+        for source in (str(directory), str(archive)):
+            order, finish, final = reduce_snapshot(source, chunk_rows=7)
+            assert np.array_equal(finish, expected) and np.array_equal(final, work)
+            _assert_safe_order(order, total, alloc, req)
+
+        coo = tmp_path / f"coo{k}.npz"
+        save_sparse_state(coo, total, alloc, req)
+        _, finish, final = sparse_holt_reduction(*load_sparse_state(str(coo)))
+        assert np.array_equal(finish, expected) and np.array_equal(final, work)
+
+
+def test_packed_single_instance_matches_scan():
+    rng = np.random.default_rng(4)
+    for _ in range(200):
+        n, m = int(rng.integers(1, 60)), int(rng.integers(1, 150))
+        total, alloc, req = random_wait_for_state(n, m, rng, held=rng.random(), waits=3 * rng.random())
+        expected, work, _ = _scan(total, alloc, req)
+        order, finish, final = packed_single_instance_reduction(pack_bits(alloc), pack_bits(req), m)
+        assert np.array_equal(finish, expected) and np.array_equal(final, work)
+        _assert_safe_order(order, total, alloc, req)
+
+
+def test_packed_wait_chain_unwinds_one_process_per_round():
+    # P_i holds R_i and waits for R_{i+1}: n rounds of one process each.
+    n = 3000
+    alloc = np.eye(n, dtype=np.int64)
+    req = np.eye(n, k=1, dtype=np.int64)
+    order, finish, _ = packed_single_instance_reduction(pack_bits(alloc), pack_bits(req), n)
+    assert finish.all()
+    assert np.array_equal(order, np.arange(n)[::-1])
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from deadlock_core.distributed import (
+    EdgeChasingShard, LocalTransport, QueueTransport, edge_chasing_deadlock, random_wait_for_state,
+    shard_wait_for_graph,
+)
+from deadlock_core.waitfor import strongly_connected_components, wait_for_graph
+
+
+def _cycle_members(alloc, req):
+    """Processes on a wait-for cycle: members of the non-trivial SCCs."""
+    indptr, targets = wait_for_graph(alloc, req)
+    members = set()
+    for component in strongly_connected_components(indptr, targets):
+        v = component[0]
+        if len(component) > 1 or v in targets[indptr[v]:indptr[v + 1]]:
+            members.update(component)
+    return [f"P{p}" for p in sorted(members)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_edge_chasing_finds_the_cycle_members(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 60))
+    _, alloc, req = random_wait_for_state(n, int(rng.integers(5, 60)), rng)
+    expected = _cycle_members(alloc, req)
+    for n_shards in (1, 3, 8):
+        is_dead, deadlocked, _ = edge_chasing_deadlock(alloc, req, n_shards, LocalTransport())
+        assert deadlocked == expected and is_dead == bool(expected)
+
+
+def test_queue_transport_matches_local_transport():
+    for seed in range(3):
+        _, alloc, req = random_wait_for_state(80, 80, seed)
+        expected = _cycle_members(alloc, req)
+        for transport in (LocalTransport(), QueueTransport()):
+            _, deadlocked, _ = edge_chasing_deadlock(alloc, req, 4, transport)
+            assert deadlocked == expected
+
+
+class _DyingShard(EdgeChasingShard):
+    def handle(self, message):
+        os._exit(3)
+
+
+def test_queue_transport_raises_when_a_worker_dies():
+    _, alloc, req = random_wait_for_state(40, 40, 0)
+    shards = shard_wait_for_graph(alloc, req, 2)
+    shards[1] = _DyingShard(1, 2, shards[1].edges, shards[1].waits_at)
+    initiators = [p for shard in shards for p in shard.waits_at]
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        QueueTransport(context="fork", timeout=30).run(shards, initiators)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from deadlock_core.dataset import flatten_states
+from deadlock_core.features import FEATURE_NAMES, extract_features, unflatten_states
+from deadlock_core.generation import generate_states
+
+
+@pytest.mark.parametrize("n, m", [(2, 1), (5, 6), (10, 3)])
+def test_rows_do_not_depend_on_process_or_resource_order(n, m):
+    rng = np.random.default_rng(n * m)
+    totals, allocs, reqs = generate_states(300, n, m, rng=rng)
+    expected = extract_features(totals, allocs, reqs)
+    procs, res = rng.permutation(n), rng.permutation(m)
+    shuffled = extract_features(totals[:, res], allocs[:, procs][:, :, res], reqs[:, procs][:, :, res])
+    np.testing.assert_allclose(shuffled, expected, rtol=1e-6, atol=1e-7)
+
+
+def test_width_is_the_same_for_every_size():
+    for n, m in [(1, 1), (2, 10), (10, 1), (40, 25)]:
+        features = extract_features(*generate_states(7, n, m, rng=0))
+        assert features.shape == (7, len(FEATURE_NAMES)) and features.dtype == np.float32
+        assert np.isfinite(features).all()
+
+
+def test_rows_do_not_depend_on_the_batch():
+    states = generate_states(50, 4, 3, rng=1)
+    batch = extract_features(*states)
+    for b in (0, 17, 49):
+        np.testing.assert_array_equal(extract_features(*(a[b:b + 1] for a in states)), batch[b:b + 1])
+
+
+def test_unflatten_inverts_flatten():
+    totals, allocs, reqs = generate_states(20, 4, 3, rng=2)
+    back = unflatten_states(flatten_states(totals, allocs, reqs), 4, 3)
+    for a, b in zip(back, (totals, allocs, reqs)):
+        np.testing.assert_array_equal(a, b)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from deadlock_core.dataset import build_dataset
+from deadlock_core.features import extract_features, unflatten_states
+from deadlock_core.forest import FlatForest
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+@pytest.mark.parametrize("n_estimators, max_depth", [(1, None), (25, 4), (60, None)])
+def test_flat_forest_matches_sklearn_exactly(tmp_path, n_estimators, max_depth):
+    X, y = build_dataset(3000, 4, 3, rng=0)
+    F = extract_features(*unflatten_states(X, 4, 3))
+    model = ensemble.RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=0)
+    model.fit(F[:2000], y[:2000])
+
+    forest = FlatForest.from_sklearn(model)
+    expected = model.predict_proba(F)
+    assert np.array_equal(forest.predict_proba(F), expected)
+    assert np.array_equal(forest.predict(F), model.predict(F))
+
+    forest.save(tmp_path / "forest.npz")
+    loaded = FlatForest.load(tmp_path / "forest.npz")
+    assert np.array_equal(loaded.predict_proba(F), expected)
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import cost of the bare package, in microseconds. The package
+# only defines a lazy attribute table, so this leaves plenty of headroom.
+PACKAGE_IMPORT_BUDGET_US = 20_000
+
+HEAVY_MODULES = ("streamlit", "pandas", "sklearn")
+
+
+def _run(code):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return out.stdout, out.stderr
+
+
+def _cumulative_us(importtime_log, module):
+    for line in importtime_log.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_package_import_within_budget():
+    _, log = _run("import deadlock_core")
+    assert _cumulative_us(log, "deadlock_core") < PACKAGE_IMPORT_BUDGET_US
+
+
+def test_package_import_is_lazy():
+    stdout, _ = _run("import sys, json, deadlock_core; print(json.dumps(sorted(sys.modules)))")
+    loaded = json.loads(stdout)
+    assert "numpy" not in loaded
+    assert "deadlock_core.detection" not in loaded
+
+
+def test_core_never_pulls_heavy_dependencies():
+    code = (
+        "import sys, json, deadlock_core\n"
+        "for name in deadlock_core.__all__: getattr(deadlock_core, name)\n"
+        "print(json.dumps(sorted(sys.modules)))"
+    )
+    stdout, _ = _run(code)
+    loaded = {name.split(".")[0] for name in json.loads(stdout)}
+    assert not loaded.intersection(HEAVY_MODULES)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from deadlock_core.detection import holt_reduction
+from deadlock_core.generation import generate_states
+from deadlock_core.incremental import IncrementalDetector
+
+
+@pytest.mark.parametrize("event, args", [
+    ("allocate", (0, 0, 0)),
+    ("allocate", (0, -1, 1)),
+    ("release", (0, 0, -5)),
+    ("release", (0, 2, 1)),
+    ("request", (0, 0, 0)),
+    ("request", (0, -1, 1)),
+])
+def test_bad_events_are_rejected(event, args):
+    detector = IncrementalDetector([2, 2])
+    with pytest.raises(ValueError):
+        getattr(detector, event)(*args)
+    assert list(detector.available) == [2, 2]
+
+
+def _reference(total, alloc, need):
+    _, finish, _ = holt_reduction(total, alloc, need)
+    return bool((~finish).any()), np.flatnonzero(~finish).tolist()
+
+
+def _run_stream(detector, total, alloc, need, rng, n_events):
+    n, m = alloc.shape
+    for _ in range(n_events):
+        p, r = int(rng.integers(n)), int(rng.integers(m))
+        op = rng.choice(["allocate", "release", "request"])
+        # Steer towards events that change something, so the states keep
+        # flipping between safe and deadlocked.
+        if op == "allocate" and (need > 0).any():
+            p, r = (int(i) for i in rng.choice(np.argwhere(need > 0)))
+        elif op == "release" and alloc.any():
+            p, r = (int(i) for i in rng.choice(np.argwhere(alloc > 0)))
+        available = total[r] - alloc[:, r].sum()
+        if op == "allocate" and available:
+            k = int(rng.integers(1, available + 1))
+            detector.allocate(p, r, k)
+            alloc[p, r] += k
+            need[p, r] = max(need[p, r] - k, 0)
+        elif op == "release" and alloc[p, r]:
+            k = int(rng.integers(1, alloc[p, r] + 1))
+            detector.release(p, r, k)
+            alloc[p, r] -= k
+        elif need[p, r] + alloc[p, r] < total[r]:
+            k = int(rng.integers(1, total[r] - need[p, r] - alloc[p, r] + 1))
+            detector.request(p, r, k)
+            need[p, r] += k
+        else:
+            continue
+        is_dead, deadlocked = _reference(total, alloc, need)
+        assert detector.is_deadlock == is_dead
+        assert detector.deadlocked == deadlocked
+        assert np.array_equal(detector.available, total - alloc.sum(axis=0))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_event_stream_matches_holt_reduction(seed):
+    rng = np.random.default_rng(seed)
+    n, m = int(rng.integers(2, 8)), int(rng.integers(1, 5))
+    total = rng.integers(1, 6, m)
+    alloc = np.zeros((n, m), dtype=np.int64)
+    need = np.zeros((n, m), dtype=np.int64)
+    # Every process is touched once up front so ids 0..n-1 all exist.
+    detector = IncrementalDetector(total)
+    for p in range(n):
+        detector.request(p, 0, 1)
+        need[p, 0] += 1
+    _run_stream(detector, total, alloc, need, rng, 400)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_contended_stream_matches_holt_reduction(seed):
+    # Many processes on few, narrow resources: most of them wait, the
+    # reduction runs several rounds deep and deadlocks come and go.
+    rng = np.random.default_rng(50 + seed)
+    n, m = 40, 6
+    total = rng.integers(1, 3, m)
+    alloc = np.zeros((n, m), dtype=np.int64)
+    need = np.zeros((n, m), dtype=np.int64)
+    detector = IncrementalDetector(total)
+    for p in range(n):
+        detector.request(p, p % m, 1)
+        need[p, p % m] += 1
+    _run_stream(detector, total, alloc, need, rng, 2000)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_stream_from_state_matches_holt_reduction(seed):
+    rng = np.random.default_rng(100 + seed)
+    totals, allocs, reqs = generate_states(1, int(rng.integers(2, 8)), int(rng.integers(1, 5)), rng=rng)
+    total, alloc, need = totals[0], allocs[0].copy(), reqs[0].copy()
+    detector = IncrementalDetector.from_state(total, alloc, need)
+    is_dead, deadlocked = _reference(total, alloc, need)
+    assert detector.is_deadlock == is_dead and detector.deadlocked == deadlocked
+    _run_stream(detector, total, alloc, need, rng, 400)
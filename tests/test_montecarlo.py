@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from deadlock_core.montecarlo import simulate_workload, summarize_deadlock_times
+
+WORKLOAD = dict(n_replicas=500, n_steps=60, n_proc=4, capacity=(3, 3), arrival_rate=0.3, hold_time=4.0,
+                request_size=2, chunk_size=200)
+
+
+def test_same_seed_same_report():
+    a = simulate_workload(seed=7, history=True, **WORKLOAD)
+    b = simulate_workload(seed=7, history=True, **WORKLOAD)
+    for key in ("time_histogram", "survival", "mean_utilization", "deadlock_step", "utilization"):
+        assert np.array_equal(a[key], b[key])
+    assert a["deadlocks"] > 0
+    c = simulate_workload(seed=8, **WORKLOAD)
+    assert not np.array_equal(a["time_histogram"], c["time_histogram"])
+
+
+def test_history_agrees_with_the_histogram():
+    report = simulate_workload(seed=1, history=True, **WORKLOAD)
+    assert np.array_equal(np.bincount(report["deadlock_step"], minlength=61), report["time_histogram"])
+    assert report["utilization"].shape == (60, 500)
+
+
+def test_workload_that_always_fits_never_deadlocks():
+    # Two processes asking for at most 2 of 4 units each can always both be served.
+    report = simulate_workload(n_replicas=300, n_steps=50, n_proc=2, capacity=(4, 4), request_size=2, seed=0)
+    assert report["deadlocks"] == 0 and report["deadlock_probability"] == 0.0
+    assert (report["survival"] == 1).all()
+    assert np.isnan(report["mean_time_to_deadlock"])
+    assert report["time_quantiles"] == {50: None, 90: None, 99: None}
+    assert report["replica_steps"] == 300 * 50
+
+
+def test_summary_matches_numpy():
+    rng = np.random.default_rng(0)
+    n_replicas, n_steps = 1000, 40
+    steps = rng.integers(1, n_steps + 1, 370)
+    histogram = np.bincount(steps, minlength=n_steps + 1)
+    histogram[0] = n_replicas - steps.size
+    report = summarize_deadlock_times(histogram, n_replicas)
+
+    assert report["deadlocks"] == steps.size
+    assert report["deadlock_probability"] == pytest.approx(steps.size / n_replicas)
+    assert report["mean_time_to_deadlock"] == pytest.approx(steps.mean())
+    half = 1.96 * steps.std(ddof=1) / np.sqrt(steps.size)
+    assert report["mean_time_ci"] == pytest.approx((steps.mean() - half, steps.mean() + half))
+    for q, t in report["time_quantiles"].items():
+        assert t == np.percentile(steps, q, method="inverted_cdf")
+    survived = n_replicas - np.array([(steps <= t).sum() for t in range(1, n_steps + 1)])
+    assert np.allclose(report["survival"], survived / n_replicas)
+
+    # Wilson score interval, written out.
+    p, z = steps.size / n_replicas, 1.96
+    center = (p + z**2 / (2 * n_replicas)) / (1 + z**2 / n_replicas)
+    spread = z * np.sqrt(p * (1 - p) / n_replicas + z**2 / (4 * n_replicas**2)) / (1 + z**2 / n_replicas)
+    assert report["probability_ci"] == pytest.approx((center - spread, center + spread))
+    assert (report["survival_ci"][0] <= report["survival"]).all()
+    assert (report["survival"] <= report["survival_ci"][1]).all()
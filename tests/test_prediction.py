@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from deadlock_core.generation import generate_states
+from deadlock_core.prediction import predict_states
+from deadlock_core.timing import StageTimer
+
+
+class _Model:
+    """predict_proba from a fixed mix of features; counts its calls."""
+
+    def __init__(self, classes=(0, 1)):
+        self.classes_ = np.array(classes)
+        self.calls = []
+
+    def predict_proba(self, features):
+        self.calls.append(len(features))
+        p = 1 / (1 + np.exp(-(4 * features[:, 17] - 3 * features[:, 2] - 1)))
+        return np.stack([1 - p, p], axis=1)[:, :len(self.classes_)]
+
+
+def test_chunked_prediction_matches_one_pass():
+    states = generate_states(500, 5, 4, rng=0)
+    one, chunked = _Model(), _Model()
+    labels, proba, _ = predict_states(one, *states)
+    labels_c, proba_c, _ = predict_states(chunked, *states, chunk_size=64)
+    assert one.calls == [500] and chunked.calls == [64] * 7 + [52]
+    np.testing.assert_array_equal(proba_c, proba)
+    np.testing.assert_array_equal(labels_c, labels)
+    assert 0 < labels.sum() < 500
+
+
+def test_single_snapshot_and_threshold():
+    totals, allocs, reqs = generate_states(40, 3, 3, rng=1)
+    _, proba, _ = predict_states(_Model(), totals, allocs, reqs)
+    for b in (0, 39):
+        _, single, _ = predict_states(_Model(), totals[b], allocs[b], reqs[b])
+        assert single.shape == (1,) and single[0] == proba[b]
+    labels, _, _ = predict_states(_Model(), totals, allocs, reqs, threshold=0.3)
+    np.testing.assert_array_equal(labels, (proba >= 0.3).astype(np.int64))
+    with pytest.raises(ValueError):
+        predict_states(_Model(), totals, allocs, reqs, threshold=1.5)
+
+
+def test_model_that_never_saw_a_deadlock_scores_zero():
+    labels, proba, _ = predict_states(_Model(classes=(0,)), *generate_states(10, 3, 3, rng=2))
+    assert (proba == 0).all() and (labels == 0).all()
+
+
+def test_stages_are_timed_per_chunk():
+    timer = StageTimer()
+    predict_states(_Model(), *generate_states(100, 3, 3, rng=3), chunk_size=30, timer=timer)
+    stats = timer.percentiles()
+    assert stats["features"]["count"] == stats["inference"]["count"] == 4
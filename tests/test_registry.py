@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+from deadlock_core.registry import ModelRegistry, config_key
+
+
+def test_config_key_is_canonical():
+    a = {"n_samples": 300, "sizes": [[2, 3]], "seed": 42}
+    b = {"seed": 42, "sizes": [[2, 3]], "n_samples": 300}
+    assert config_key(a) == config_key(b)
+    assert config_key(a) == hashlib.sha256(b'{"n_samples":300,"seed":42,"sizes":[[2,3]]}').hexdigest()
+    assert config_key(a) != config_key(dict(a, seed=43))
+
+
+def _trainer(calls):
+    def train(config):
+        calls.append(config)
+        return {"seed": config["seed"], "weights": list(range(100))}
+    return train
+
+
+def test_get_or_train_hits_after_the_first_call(tmp_path):
+    calls = []
+    registry = ModelRegistry(str(tmp_path))
+    bundle, hit = registry.get_or_train({"seed": 1}, _trainer(calls))
+    assert not hit and len(calls) == 1
+    again, hit = ModelRegistry(str(tmp_path)).get_or_train({"seed": 1}, _trainer(calls))
+    assert hit and again == bundle and len(calls) == 1
+    _, hit = registry.get_or_train({"seed": 2}, _trainer(calls))
+    assert not hit and len(calls) == 2
+
+
+def test_least_recently_used_models_are_evicted(tmp_path):
+    registry = ModelRegistry(str(tmp_path), max_bytes=10**9)
+    keys = [config_key({"seed": seed}) for seed in range(3)]
+    for seed, key in enumerate(keys):
+        registry.get_or_train({"seed": seed}, _trainer([]))
+        os.utime(registry._path(key, "pkl"), (1000 + seed, 1000 + seed))
+    # Reading the oldest one makes it the most recently used.
+    assert registry.load(keys[0]) is not None
+    size = registry.entries()[0][1]
+    registry.max_bytes = 2 * size
+    registry.evict()
+    assert sorted(key for key, _, _ in registry.entries()) == sorted([keys[0], keys[2]])
+    assert not os.path.exists(registry._path(keys[1], "json"))
+
+    # The most recent model stays even when it alone is over budget.
+    registry.max_bytes = 1
+    registry.evict()
+    assert [key for key, _, _ in registry.entries()] == [keys[0]]
+
+
+def test_corrupt_entry_is_a_miss_and_gets_retrained(tmp_path):
+    calls = []
+    registry = ModelRegistry(str(tmp_path))
+    key = config_key({"seed": 5})
+    for payload in (b"", b"not a pickle", b"\x80\x05\x95garbage", b"cno_such_module\nThing\n."):
+        with open(registry._path(key, "pkl"), "wb") as f:
+            f.write(payload)
+        assert registry.load(key) is None
+    bundle, hit = registry.get_or_train({"seed": 5}, _trainer(calls))
+    assert not hit and len(calls) == 1
+    assert registry.load(key) == bundle
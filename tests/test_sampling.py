@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from deadlock_core.detection import detect_deadlock_batch
+from deadlock_core.generation import generate_states
+from deadlock_core.prediction import predict_states
+from deadlock_core.sampling import boundary_states, uncertain_states
+
+
+class _Model:
+    """P(deadlock) from the share of runnable processes."""
+
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, features):
+        p = 1 - features[:, 17]
+        return np.stack([1 - p, p], axis=1)
+
+
+def _one_unit_flips(total, alloc, req, dead):
+    """True if moving one request unit (down if dead, up if safe) flips the verdict."""
+    n, m = alloc.shape
+    step = -1 if dead else 1
+    for i in range(n):
+        for j in range(m):
+            moved = req.copy()
+            moved[i, j] += step
+            if moved[i, j] < 0 or moved[i, j] > total[j] - alloc[i, j] + 1:
+                continue
+            if detect_deadlock_batch(total[None], alloc[None], moved[None])[0][0] != dead:
+                return True
+    return False
+
+
+@pytest.mark.parametrize("n_proc, n_res", [(2, 2), (3, 3), (4, 2)])
+def test_boundary_states_sit_next_to_a_flip(n_proc, n_res):
+    totals, allocs, reqs, y = boundary_states(60, n_proc, n_res, rng=5)
+    assert y.sum() == 30 and reqs.min() >= 0
+    assert (allocs.sum(axis=1) <= totals).all()
+    dead, _ = detect_deadlock_batch(totals, allocs, reqs)
+    np.testing.assert_array_equal(dead, y.astype(bool))
+    for b in range(len(y)):
+        assert _one_unit_flips(totals[b], allocs[b], reqs[b], bool(y[b]))
+
+
+def test_boundary_states_are_seeded():
+    a = boundary_states(100, 3, 3, rng=9)
+    b = boundary_states(100, 3, 3, rng=9)
+    c = boundary_states(100, 3, 3, rng=10)
+    for x, z in zip(a, b):
+        np.testing.assert_array_equal(x, z)
+    assert not np.array_equal(a[2], c[2])
+
+
+def test_uncertain_states_keep_the_closest_calls_of_each_class():
+    totals, allocs, reqs, y = uncertain_states(_Model(), 40, 3, 3, rng=4, pool_factor=10)
+    assert len(y) == 40 and y.sum() == 20
+    np.testing.assert_array_equal(detect_deadlock_batch(totals, allocs, reqs)[0], y.astype(bool))
+
+    # The same seed draws the same pool; nothing left out of a class is closer to 0.5.
+    pool = generate_states(400, 3, 3, rng=np.random.default_rng(4))
+    pool_y, _ = detect_deadlock_batch(*pool)
+    margin = np.abs(predict_states(_Model(), *pool)[1] - 0.5)
+    kept_margin = np.abs(predict_states(_Model(), totals, allocs, reqs)[1] - 0.5)
+    for label in (0, 1):
+        assert kept_margin[y == label].max() <= np.sort(margin[pool_y == label])[20 - 1]
+
+    again = uncertain_states(_Model(), 40, 3, 3, rng=4, pool_factor=10)
+    for x, z in zip(again, (totals, allocs, reqs, y)):
+        np.testing.assert_array_equal(x, z)
@@ -0,0 +1,128 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from deadlock_core.service import DetectionService
+
+
+SNAPSHOT = {"total": [3, 3], "alloc": [[1, 1], [1, 1]], "req": [[2, 2], [0, 0]]}
+
+
+def _detect(payload, service=None):
+    service = service or DetectionService()
+
+    async def go():
+        service.batcher.start()
+        try:
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            return await service.route("POST", "/detect", body)
+        finally:
+            await service.batcher.stop()
+
+    return asyncio.run(go())
+
+
+def test_detect_answers_verdict_and_safe_sequence():
+    status, result = _detect(SNAPSHOT)
+    assert status == HTTPStatus.OK
+    assert result["deadlock"] is False
+    assert result["safe_sequence"] == ["P1", "P0"]
+
+
+@pytest.mark.parametrize("payload", [
+    b"{not json",
+    [1, 2],
+    {"total": [1]},
+    {"total": [99999999999999999999999], "alloc": [[0]], "req": [[0]]},
+    {"total": [2 ** 63], "alloc": [[0]], "req": [[0]]},
+    {"total": [2], "alloc": [[1.7]], "req": [[0]]},
+    {"total": [2], "alloc": [[True]], "req": [[0]]},
+    {"total": [2], "alloc": [[1], [1, 2]], "req": [[0]]},
+    {"total": [1], "alloc": [[2]], "req": [[0]]},
+    {"total": [], "alloc": [[]], "req": [[]]},
+    {"total": [1], "alloc": [], "req": []},
+])
+def test_bad_payloads_get_400(payload):
+    status, result = _detect(payload)
+    assert status == HTTPStatus.BAD_REQUEST
+    assert "error" in result
+
+
+def test_bad_content_length_gets_400():
+    service = DetectionService()
+
+    async def go():
+        service.batcher.start()
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /detect HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            server.close()
+            await service.batcher.stop()
+
+    assert asyncio.run(go()).startswith(b"HTTP/1.1 400 ")
+
+
+def test_failed_batch_gets_500():
+    # Scoring with something that is not a model raises inside the handler.
+    status, result = _detect(SNAPSHOT, DetectionService(model=object()))
+    assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert "error" in result
+
+
+def test_concurrent_requests_are_coalesced():
+    service = DetectionService(max_wait=0.05)
+    body = json.dumps(SNAPSHOT).encode()
+
+    async def go():
+        service.batcher.start()
+        try:
+            return await asyncio.gather(*(service.route("POST", "/detect", body) for _ in range(32)))
+        finally:
+            await service.batcher.stop()
+
+    assert all(status == HTTPStatus.OK for status, _ in asyncio.run(go()))
+    metrics = service.metrics()
+    assert metrics["counters"]["ok"] == 32
+    assert metrics["mean_batch_size"] > 1
+
+
+def test_full_queue_gets_503_with_retry_after():
+    service = DetectionService(max_pending=2)
+    body = json.dumps(SNAPSHOT).encode()
+
+    async def go():
+        # With the batcher not yet running, two requests fill the queue.
+        queued = [asyncio.create_task(service.route("POST", "/detect", body)) for _ in range(2)]
+        await asyncio.sleep(0)
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                f"POST /detect HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            service.batcher.start()
+            return response, await asyncio.gather(*queued)
+        finally:
+            server.close()
+            await service.batcher.stop()
+
+    response, queued = asyncio.run(go())
+    head = response.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+    assert head[0].startswith(b"HTTP/1.1 503 ")
+    assert b"Retry-After: 1" in head
+    assert all(status == HTTPStatus.OK for status, _ in queued)
+    assert service.metrics()["counters"]["rejected"] == 1
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from deadlock_core.store import BLOCK_ROWS, DatasetStore
+
+
+def _row_set(X):
+    return {row.tobytes() for row in np.ascontiguousarray(X)}
+
+
+def test_train_and_eval_splits_are_disjoint(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    X_train, _ = store.open(5, 6, 42, "train", shard_size=1024).load(1024)
+    X_eval, _ = store.open(5, 6, 42, "eval", shard_size=1024).load(1024)
+    assert not _row_set(X_train) & _row_set(X_eval)
+
+
+def test_growing_keeps_existing_rows(tmp_path):
+    grown = DatasetStore(str(tmp_path / "grown")).open(3, 3, 7, shard_size=512)
+    grown.load(300)
+    grown.load(700)
+    X_grown, y_grown = grown.load(1300)
+    X_once, y_once = DatasetStore(str(tmp_path / "once")).open(3, 3, 7, shard_size=512).load(1300)
+    assert len(X_grown) == 1300
+    assert np.array_equal(X_grown, X_once) and np.array_equal(y_grown, y_once)
+
+
+def test_small_dataset_writes_only_what_it_uses(tmp_path):
+    dataset = DatasetStore(str(tmp_path)).open(3, 3, 7)
+    X, _ = dataset.load(100)
+    assert len(X) == 100
+    assert dataset.n_samples == BLOCK_ROWS
+    assert sorted(os.listdir(dataset.path)) == ["X_00000.npy", "meta.json", "y_00000.npy"]
+
+
+def test_rows_past_meta_are_dropped_when_growing(tmp_path):
+    # An extend that died after renaming X but before y and meta.json.
+    dataset = DatasetStore(str(tmp_path / "crashed")).open(3, 3, 7, shard_size=1024)
+    dataset.load(BLOCK_ROWS)
+    x_path = os.path.join(dataset.path, "X_00000.npy")
+    np.save(x_path, np.concatenate([np.load(x_path)] * 2))
+    X, y = dataset.load(700)
+    X_once, y_once = DatasetStore(str(tmp_path / "once")).open(3, 3, 7, shard_size=1024).load(700)
+    assert np.array_equal(X, X_once) and np.array_equal(y, y_once)
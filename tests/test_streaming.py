@@ -0,0 +1,36 @@
+import io
+
+import numpy as np
+import pytest
+
+from deadlock_core.streaming import read_event_log, reduce_snapshot, replay_events
+
+
+@pytest.mark.parametrize("line", [
+    '{"op": "request", "process": 0, "resource": 0, "amount": 1.5}',
+    '{"op": "request", "process": 0, "resource": 0, "amount": true}',
+    '{"op": "request", "process": 0, "resource": -1}',
+    '{"op": "release", "process": 0, "resource": 0, "amount": -5}',
+    '{"op": "request", "process": "x", "resource": 0}',
+])
+def test_bad_events_are_rejected(line):
+    with pytest.raises(ValueError):
+        list(read_event_log(io.StringIO(line), fmt="jsonl"))
+
+
+def test_out_of_range_resource_is_rejected_on_replay():
+    chunks = read_event_log(io.StringIO("op,process,resource\nrequest,0,3\n"))
+    with pytest.raises(ValueError):
+        list(replay_events(chunks, [1, 1]))
+
+
+@pytest.mark.parametrize("arrays", [
+    {"total": np.array([1])},
+    {"total": np.array([1]), "alloc": np.zeros((2, 1)), "req": np.zeros((3, 1))},
+])
+def test_incomplete_snapshots_are_rejected(arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    buf.seek(0)
+    with pytest.raises(ValueError):
+        reduce_snapshot(buf)
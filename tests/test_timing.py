@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from deadlock_core.timing import StageTimer
+
+
+def test_percentiles_match_numpy():
+    timer = StageTimer()
+    rng = np.random.default_rng(0)
+    samples = {"features": rng.random(200), "inference": rng.random(50) * 3}
+    for name, values in samples.items():
+        for seconds in values:
+            timer.record(name, float(seconds))
+    stats = timer.percentiles(q=(50, 90, 99))
+    assert list(stats) == ["features", "inference"]
+    for name, values in samples.items():
+        ms = values * 1e3
+        assert stats[name]["count"] == len(values)
+        assert stats[name]["mean_ms"] == pytest.approx(ms.mean())
+        for q in (50, 90, 99):
+            assert stats[name][f"p{q}_ms"] == pytest.approx(np.percentile(ms, q))
+
+
+def test_only_the_last_traces_are_kept():
+    timer = StageTimer(max_traces=10)
+    for k in range(25):
+        timer.record("detect", k / 1000)
+    stats = timer.percentiles(q=(50,))["detect"]
+    assert stats["count"] == 10 and stats["mean_ms"] == pytest.approx(np.arange(15, 25).mean())
+
+
+def test_stage_and_counters():
+    timer = StageTimer()
+    with timer.stage("detect"):
+        pass
+    timer.count("requests")
+    timer.count("requests", 4)
+    timer.count("rejected")
+    assert timer.counters == {"requests": 5, "rejected": 1}
+    assert timer.percentiles()["detect"]["count"] == 1
+    timer.clear()
+    assert timer.counters == {} and timer.percentiles() == {}
+
+
+def test_disabled_timer_keeps_nothing():
+    timer = StageTimer(enabled=False)
+    with timer.stage("detect"):
+        pass
+    timer.record("detect", 1.0)
+    timer.count("requests")
+    assert timer.percentiles() == {} and timer.counters == {}
+
+
+def test_export():
+    timer = StageTimer()
+    timer.record("load", 0.5, started=10.0)
+    timer.count("rows", 3)
+    exported = json.loads(timer.export("json"))
+    assert exported["counters"] == {"rows": 3}
+    assert [(t["stage"], t["seconds"]) for t in exported["traces"]] == [("load", 0.5)]
+    rows = list(csv.DictReader(io.StringIO(timer.export("csv"))))
+    assert rows[0]["stage"] == "load" and float(rows[0]["seconds"]) == 0.5
+    with pytest.raises(ValueError):
+        timer.export("xml")
@@ -0,0 +1,36 @@
+import pytest
+
+from deadlock_core.store import DatasetStore
+from deadlock_core.training import grow_random_forest, growth_config
+
+pytest.importorskip("sklearn.ensemble")
+# The first small batches leave some rows without out-of-bag trees.
+pytestmark = pytest.mark.filterwarnings("ignore:Some inputs do not have OOB scores")
+
+SIZES = ((3, 3), (5, 6))
+
+
+def _trees(model):
+    return [(tree.tree_.feature.tolist(), tree.tree_.threshold.tolist()) for tree in model.estimators_]
+
+
+def test_growing_keeps_the_base_trees(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    # A negative tol never stops early, so every forest reaches max_trees.
+    base_config = growth_config(400, sizes=SIZES, seed=3, batch_trees=4, max_trees=8, tol=-1)
+    base = grow_random_forest(base_config, store=store)
+    assert base["n_trees"] == 8 and base["model"].n_estimators == 8
+
+    config = growth_config(800, sizes=SIZES, seed=3, batch_trees=4, max_trees=20, tol=-1, base=base_config)
+    grown = grow_random_forest(config, base, store=store)
+    assert grown["n_trees"] == 20 and grown["model"].n_estimators == 20
+    assert _trees(grown["model"])[:8] == _trees(base["model"])
+    # The base bundle's model is left as it was.
+    assert base["model"].n_estimators == 8 and len(base["model"].estimators_) == 8
+
+
+def test_growth_needs_its_base(tmp_path):
+    base_config = growth_config(400, sizes=SIZES, seed=3)
+    config = growth_config(800, sizes=SIZES, seed=3, base=base_config)
+    with pytest.raises(ValueError):
+        grow_random_forest(config, None, store=DatasetStore(str(tmp_path)))
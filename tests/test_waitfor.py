@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from deadlock_core.detection import bankers_deadlock
+from deadlock_core.waitfor import single_instance_deadlock, strongly_connected_components
+
+
+def _single_instance_state(rng):
+    n, m = int(rng.integers(1, 30)), int(rng.integers(1, 30))
+    alloc = np.zeros((n, m), dtype=np.int64)
+    held = np.flatnonzero(rng.random(m) < 0.7)
+    alloc[rng.integers(0, n, held.size), held] = 1
+    req = (rng.random((n, m)) < rng.uniform(0.02, 0.2)).astype(np.int64)
+    return np.ones(m, dtype=np.int64), alloc, req
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_single_instance_matches_bankers(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(100):
+        total, alloc, req = _single_instance_state(rng)
+        is_dead, safe_seq, deadlocked, work, cycles = single_instance_deadlock(total, alloc, req)
+        expected = bankers_deadlock(total, alloc, req)
+        assert is_dead == expected[0]
+        assert deadlocked == expected[2]
+        assert np.array_equal(work, expected[3])
+        assert sorted(safe_seq) == sorted(expected[1])
+        free = total - alloc.sum(axis=0)
+        for p in (int(name[1:]) for name in safe_seq):
+            assert (req[p] <= free).all()
+            free = free + alloc[p]
+        assert bool(cycles) == is_dead
+
+
+def _chain(n, closed):
+    """CSR graph 0 -> 1 -> ... -> n-1, and back to 0 if closed."""
+    targets = np.arange(1, n + 1) % n
+    counts = np.ones(n, dtype=np.int64)
+    if not closed:
+        counts[-1] = 0
+        targets = targets[:-1]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, targets
+
+
+def test_scc_handles_chains_deeper_than_the_recursion_limit():
+    n = 100_000
+    components = strongly_connected_components(*_chain(n, closed=True))
+    assert len(components) == 1 and sorted(components[0]) == list(range(n))
+    components = strongly_connected_components(*_chain(n, closed=False))
+    # Every component comes after the ones it has edges into.
+    assert components == [[v] for v in range(n - 1, -1, -1)]
+
+
+def test_single_instance_on_a_deep_wait_chain():
+    # P_i waits on resource i + 1, held by P_{i+1}; closing the chain deadlocks all of it.
+    n = 2000
+    alloc = np.eye(n, dtype=np.int64)
+    req = np.roll(alloc, 1, axis=1)
+    req[-1] = 0
+    is_dead, safe_seq, _, _, _ = single_instance_deadlock(np.ones(n), alloc, req)
+    assert not is_dead and safe_seq == [f"P{i}" for i in range(n - 1, -1, -1)]
+    req[-1, 0] = 1
+    is_dead, _, deadlocked, _, cycles = single_instance_deadlock(np.ones(n), alloc, req)
+    assert is_dead and len(deadlocked) == n
+    assert len(cycles) == 1 and len(cycles[0]) == n + 1